@@ -0,0 +1,128 @@
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from typing import Any, Optional
+
+from benchmarks.common import make_class, measure
+from benchmarks.suite import BENCHMARKS, SIZES
+from hyperparameters import HP, Hyperparams
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+class BenchmarkHyperparams(Hyperparams):
+    filter: str = HP(
+        "Only run the benchmarks matching this glob pattern",
+        default="*",
+    )
+    repeat: int = HP(
+        "Number of repetitions, the best time is reported",
+        default=5,
+    )
+    save: Optional[str] = HP(
+        "Save the results as baselines to this JSON file",
+        default=None,
+    )
+    compare: Optional[str] = HP(
+        "Compare the results against the baselines in this JSON file",
+        default=None,
+    )
+    threshold: float = HP(
+        "Fail when a benchmark is slower than its baseline by this factor",
+        default=1.3,
+    )
+
+
+def instance_memory(fields_num: int, instances_num: int = 100) -> float:
+    cls = make_class(fields_num)
+    cls()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        instances = [cls() for _ in range(instances_num)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del instances
+    return (after - before) / instances_num
+
+
+def run(params: BenchmarkHyperparams) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for name, setup in BENCHMARKS.items():
+        if not fnmatch.fnmatch(name, params.filter):
+            continue
+        for size in SIZES:
+            key = f"{name}[{size}]"
+            try:
+                func = setup(size)
+            except ImportError as e:
+                print(f"{key:<36} skipped: {e}")
+                continue
+            results[key] = measure(func, repeat=params.repeat, number=None)
+            print(f"{key:<36} {results[key] * 1e6:>14.2f} us")
+    if fnmatch.fnmatch("instance_memory", params.filter):
+        for size in SIZES:
+            key = f"instance_memory[{size}]"
+            results[key] = instance_memory(size)
+            print(f"{key:<36} {results[key]:>14.0f} B")
+    return results
+
+
+def compare(
+    results: dict[str, float], baselines: dict[str, float], threshold: float
+) -> list[str]:
+    regressions = []
+    print(f"\n{'benchmark':<36} {'baseline':>14} {'current':>14} {'ratio':>8}")
+    for key, value in results.items():
+        baseline = baselines.get(key)
+        if not baseline:
+            continue
+        ratio = value / baseline
+        marker = ""
+        if ratio > threshold:
+            regressions.append(key)
+            marker = " REGRESSION"
+        print(f"{key:<36} {baseline:>14.6g} {value:>14.6g} {ratio:>8.2f}{marker}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Hyperparams benchmark suite"
+    )
+    BenchmarkHyperparams.add_arguments(parser)
+    params = BenchmarkHyperparams.from_arguments(parser.parse_args())
+
+    results = run(params)
+
+    if params.save is not None:
+        with open(params.save, "w") as f:
+            json.dump(
+                {
+                    "machine": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "processor": platform.processor(),
+                    },
+                    "results": results,
+                },
+                f,
+                indent=4,
+                sort_keys=True,
+            )
+            f.write("\n")
+
+    if params.compare is not None:
+        with open(params.compare) as f:
+            baselines = json.load(f)["results"]
+        if compare(results, baselines, params.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import copyreg
+import io
+import pickle
+from typing import Any
+
+from benchmarks.common import make_class, measure
+from hyperparameters import HP, Hyperparams
+
+
+class _LegacyPickler(pickle.Pickler):
+    # Pickles instances the way pydantic does: __dict__, __fields_set__ and
+    # the private attributes, restored through __setstate__
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, Hyperparams):
+            return copyreg.__newobj__, (type(obj),), obj.__getstate__()
+        return NotImplemented
+
+
+def legacy_dumps(obj: Any) -> bytes:
+    buffer = io.BytesIO()
+    _LegacyPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buffer.getvalue()
+
+
+def dumps(obj: Any) -> bytes:
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def bench(label: str, obj: Any, repeat: int) -> None:
+    for name, dump in (("pydantic", legacy_dumps), ("compact", dumps)):
+        data = dump(obj)
+        round_trip = measure(lambda: pickle.loads(dump(obj)), repeat=repeat)
+        print(f"{label:<28} {name:<10} {len(data):>14,} B {round_trip * 1e3:>12.3f} ms")
+
+
+class BenchPickleHyperparams(Hyperparams):
+    fields_num: int = HP(
+        "Number of fields of the large class",
+        default=1000,
+    )
+    batch_size: int = HP(
+        "Number of instances in the batch",
+        default=100_000,
+    )
+    batch_fields_num: int = HP(
+        "Number of fields of the batched class",
+        default=10,
+    )
+    repeat: int = HP(
+        "Number of repetitions, the best time is reported",
+        default=3,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pickle size and round-trip time")
+    BenchPickleHyperparams.add_arguments(parser)
+    params = BenchPickleHyperparams.from_arguments(parser.parse_args())
+
+    print(f"{'case':<28} {'pickler':<10} {'size':>16} {'round-trip':>15}")
+    large_cls = make_class(params.fields_num)
+    bench(f"1 x {params.fields_num} fields", large_cls(), params.repeat)
+
+    batch_cls = make_class(params.batch_fields_num)
+    batch = [batch_cls(field0=index) for index in range(params.batch_size)]
+    bench(
+        f"{params.batch_size} x {params.batch_fields_num} fields", batch, params.repeat
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import sys
+import time
+import timeit
+from typing import Any, Callable, Optional
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.hyperparams import HyperparamsMeta
+
+_FIELD_KINDS = ("int", "float", "choice", "bool", "optional")
+
+
+def make_namespace(fields_num: int) -> dict[str, Any]:
+    annotations: dict[str, Any] = {}
+    namespace: dict[str, Any] = {"__annotations__": annotations}
+    for index in range(fields_num):
+        name = f"field{index}"
+        kind = _FIELD_KINDS[index % len(_FIELD_KINDS)]
+        if kind == "int":
+            annotations[name] = int
+            namespace[name] = HP(f"Int field {index}", default=index)
+        elif kind == "float":
+            annotations[name] = float
+            namespace[name] = HP(f"Float field {index}", default=index / 10)
+        elif kind == "choice":
+            annotations[name] = str
+            namespace[name] = HP(
+                f"Choice field {index}",
+                default="b",
+                tunable=True,
+                choices=["a", "b", "c"],
+            )
+        elif kind == "bool":
+            annotations[name] = bool
+            namespace[name] = HP(
+                f"Bool field {index}",
+                default=True,
+                tunable=True,
+            )
+        else:
+            annotations[name] = Optional[str]
+            namespace[name] = HP(f"Optional field {index}", default=None)
+    return namespace
+
+
+def make_class(
+    fields_num: int,
+    name: str | None = None,
+    bases: tuple[type, ...] = (Hyperparams,),
+) -> type[Hyperparams]:
+    name = name or f"Hyperparams{fields_num}"
+    namespace = make_namespace(fields_num)
+    namespace["__module__"] = __name__
+    namespace["__qualname__"] = name
+    cls = HyperparamsMeta(name, bases, namespace)
+    # Register the class so that its instances can be pickled by reference
+    setattr(sys.modules[__name__], name, cls)
+    return cls
+
+
+def measure(
+    func: Callable[[], Any], *, repeat: int = 5, number: int | None = 1
+) -> float:
+    if number is None:
+        # Calibrate the number of calls so that a repetition takes >= 0.2 s
+        number, _ = timeit.Timer(func).autorange()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
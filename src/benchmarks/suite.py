@@ -0,0 +1,247 @@
+import argparse
+import pickle
+import threading
+from typing import Any, Callable
+
+from benchmarks.common import make_class, make_namespace
+from hyperparameters import Hyperparams
+from hyperparameters.hyperparams import HyperparamsMeta
+from hyperparameters.lightweight import make_lightweight
+
+SIZES = (10, 100, 1000)
+
+# benchmark name -> setup(fields_num) returning the callable to time
+BENCHMARKS: dict[str, Callable[[int], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(
+        setup: Callable[[int], Callable[[], Any]]
+    ) -> Callable[[int], Callable[[], Any]]:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def _changes(cls: type[Hyperparams], changes_num: int = 5) -> dict[str, Any]:
+    # Only int fields, the generated classes have one every 5 fields
+    return {
+        name: -index
+        for index, name in enumerate(list(cls.__fields__)[::5][:changes_num])
+    }
+
+
+@benchmark("define_class")
+def define_class(fields_num: int) -> Callable[[], Any]:
+    def run() -> Any:
+        return HyperparamsMeta(
+            "Defined", (Hyperparams,), {**make_namespace(fields_num)}
+        )
+
+    return run
+
+
+@benchmark("define_class_deferred")
+def define_class_deferred(fields_num: int) -> Callable[[], Any]:
+    class Config:
+        defer_finalization = True
+
+    def run() -> Any:
+        return HyperparamsMeta(
+            "Defined", (Hyperparams,), {**make_namespace(fields_num), "Config": Config}
+        )
+
+    return run
+
+
+@benchmark("define_small_classes")
+def define_small_classes(classes_num: int) -> Callable[[], Any]:
+    # Here the size is the number of classes, each one has 5 fields
+    def run() -> Any:
+        return [
+            HyperparamsMeta(f"Defined{index}", (Hyperparams,), make_namespace(5))
+            for index in range(classes_num)
+        ]
+
+    return run
+
+
+@benchmark("init")
+def init(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    return cls
+
+
+@benchmark("init_with_values")
+def init_with_values(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    values = cls().dict()
+    return lambda: cls(**values)
+
+
+@benchmark("setattr")
+def setattr_(fields_num: int) -> Callable[[], Any]:
+    params = make_class(fields_num)()
+
+    def run() -> None:
+        params.field0 = 1
+        params.field2 = "c"
+
+    return run
+
+
+@benchmark("lightweight_init")
+def lightweight_init(fields_num: int) -> Callable[[], Any]:
+    return make_lightweight(make_class(fields_num))
+
+
+@benchmark("lightweight_setattr")
+def lightweight_setattr(fields_num: int) -> Callable[[], Any]:
+    params = make_lightweight(make_class(fields_num))()
+
+    def run() -> None:
+        params.field0 = 1
+        params.field2 = "c"
+
+    return run
+
+
+@benchmark("update")
+def update(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    params = cls()
+    changes = _changes(cls)
+    return lambda: params.update(changes)
+
+
+@benchmark("update_validate")
+def update_validate(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    params = cls()
+    changes = _changes(cls)
+    return lambda: params.update(changes, validate=True)
+
+
+@benchmark("update_inplace")
+def update_inplace(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    params = cls()
+    changes = _changes(cls)
+    return lambda: params.update(changes, inplace=True)
+
+
+@benchmark("update_inplace_validate")
+def update_inplace_validate(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    params = cls()
+    changes = _changes(cls)
+    return lambda: params.update(changes, inplace=True, validate=True)
+
+
+@benchmark("diff")
+def diff(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    params = cls()
+    other = params.update(_changes(cls))
+    return lambda: params.diff(other)
+
+
+@benchmark("diff_many")
+def diff_many(fields_num: int) -> Callable[[], Any]:
+    from hyperparameters.columnar import diff_many as diff_many_
+
+    cls = make_class(fields_num)
+    params = cls()
+    others = [params.update({**_changes(cls), "field0": index}) for index in range(100)]
+    return lambda: diff_many_(params, others)
+
+
+@benchmark("json")
+def json(fields_num: int) -> Callable[[], Any]:
+    params = make_class(fields_num)()
+    return params.json
+
+
+@benchmark("pickle")
+def pickle_(fields_num: int) -> Callable[[], Any]:
+    params = make_class(fields_num)()
+    return lambda: pickle.loads(pickle.dumps(params))
+
+
+@benchmark("add_arguments")
+def add_arguments(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    return lambda: cls.add_arguments(argparse.ArgumentParser())
+
+
+@benchmark("from_arguments")
+def from_arguments(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    parser = argparse.ArgumentParser()
+    cls.add_arguments(parser)
+    args = parser.parse_args([])
+    return lambda: cls.from_arguments(args)
+
+
+@benchmark("tunable_params")
+def tunable_params(fields_num: int) -> Callable[[], Any]:
+    cls = make_class(fields_num)
+    return lambda: list(cls._tunable_params())
+
+
+@benchmark("ray_tune_param_space")
+def ray_tune_param_space(fields_num: int) -> Callable[[], Any]:
+    from hyperparameters.ray_tune_hyperparams import RayTuneHyperparamsMixin
+
+    cls = make_class(
+        fields_num,
+        f"RayTuneHyperparams{fields_num}",
+        (Hyperparams, RayTuneHyperparamsMixin),
+    )
+    return cls().ray_tune_param_space
+
+
+@benchmark("versioned_get")
+def versioned_get(fields_num: int) -> Callable[[], Any]:
+    from hyperparameters.versioned import VersionedHyperparams
+
+    shared = VersionedHyperparams(make_class(fields_num)())
+    return lambda: shared.get().field0
+
+
+@benchmark("versioned_update")
+def versioned_update(fields_num: int) -> Callable[[], Any]:
+    from hyperparameters.versioned import VersionedHyperparams
+
+    cls = make_class(fields_num)
+    shared = VersionedHyperparams(cls())
+    changes = _changes(cls)
+    return lambda: shared.update(changes)
+
+
+@benchmark("versioned_concurrent_reads")
+def versioned_concurrent_reads(fields_num: int) -> Callable[[], Any]:
+    # 8 threads read 10000 consistent configs each while 20 updates are
+    # published, a fixed amount of work rather than updates until they finish
+    from hyperparameters.versioned import VersionedHyperparams
+
+    cls = make_class(fields_num)
+    shared = VersionedHyperparams(cls())
+    changes = _changes(cls)
+
+    def read() -> None:
+        for _ in range(10_000):
+            params = shared.get()
+            params.field0, params.field1
+
+    def run() -> None:
+        readers = [threading.Thread(target=read) for _ in range(8)]
+        for thread in readers:
+            thread.start()
+        for _ in range(20):
+            shared.update(changes)
+        for thread in readers:
+            thread.join()
+
+    return run
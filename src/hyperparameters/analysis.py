@@ -0,0 +1,162 @@
+import math
+from typing import Any, NamedTuple, Sequence
+
+import numpy as np
+
+from hyperparameters.columnar import Columns, column
+from hyperparameters.hyperparams import Hyperparams
+from hyperparameters.search import SearchSpace, _codes, _rows_count
+from hyperparameters.spaces import LogUniform
+
+
+class FieldCoverage(NamedTuple):
+    # Values of a discrete field, or bin edges of a continuous one
+    values: list[Any] | np.ndarray
+    # Trials per value or bin, among the trials in which the field is active
+    counts: np.ndarray
+    # Fraction of the values or bins tried at least once
+    coverage: float
+    # Active trials with values outside of the space
+    outside: int
+
+
+def history_columns(
+    space: SearchSpace, history: Columns | Sequence[Hyperparams]
+) -> Columns:
+    if isinstance(history, dict):
+        missing = space.domains.keys() - history.keys()
+        if missing:
+            raise ValueError(f"History misses fields: {' '.join(sorted(missing))}")
+        return {name: np.asarray(history[name]) for name in space.order}
+    return {
+        name: column(
+            [params.get_path(name) for params in history],
+            len(history),
+            space.infos[name],
+        )
+        for name in space.order
+    }
+
+
+def codes(space: SearchSpace, name: str, values: np.ndarray) -> np.ndarray:
+    # Index of each value in the domain of a discrete field, -1 when outside
+    return _codes(space.domains[name], space._values.get(name), values)
+
+
+def _discrete_fields(space: SearchSpace) -> list[str]:
+    return [name for name in space.order if space.domains[name].discrete]
+
+
+def cardinality(space: SearchSpace, *, feasible: bool = True) -> int:
+    # Exact number of configs of the discrete part of the space, continuous
+    # fields are not counted. Only the fields coupled by conditions or
+    # constraints are enumerated, the others multiply the count.
+    discrete = _discrete_fields(space)
+    constraints = space.constraints if feasible else []
+    if any(getattr(func, "fields", None) is None for func in constraints):
+        # The fields read by the constraint are unknown
+        coupled = set(discrete)
+    else:
+        coupled = set()
+        for name, parents in space.conditions.items():
+            coupled.add(name)
+            coupled.update(parents)
+        for func in constraints:
+            coupled.update(func.fields)  # type: ignore
+        unknown = coupled - space.domains.keys()
+        if unknown:
+            raise ValueError(
+                f"Constraints read fields outside of the space: {' '.join(unknown)}"
+            )
+        parents = {
+            parent for condition in space.conditions.values() for parent in condition
+        }
+        for name in coupled:
+            if not space.domains[name].discrete and (
+                name in parents
+                or any(name in func.fields for func in constraints)  # type: ignore
+            ):
+                raise ValueError(
+                    f"Field {name} is continuous and constrains other fields, "
+                    "the configs cannot be counted"
+                )
+        coupled = {name for name in coupled if space.domains[name].discrete}
+
+    count = math.prod(
+        space.domains[name].size() for name in discrete if name not in coupled
+    )
+    if coupled:
+        names = [name for name in space.order if name in coupled]
+        count *= _rows_count(space._grid(names, list(constraints)))
+    return count
+
+
+def explored_cells(space: SearchSpace, history: Columns | Sequence[Hyperparams]) -> int:
+    # Number of distinct feasible cells of the discrete grid tried in the history,
+    # the values of inactive fields are ignored
+    columns = history_columns(space, history)
+    count = _rows_count(columns)
+    if not count:
+        return 0
+    actives = space.actives(columns)
+    valid = space.feasible(columns)
+    discrete = _discrete_fields(space)
+    radixes = [space.domains[name].size() + 1 for name in discrete]
+    field_codes = []
+    for name, radix in zip(discrete, radixes):
+        # The extra last code marks inactive fields
+        field_codes.append(
+            np.where(actives[name], codes(space, name, columns[name]), radix - 1)
+        )
+        valid &= field_codes[-1] >= 0
+    if not discrete:
+        return int(valid.any())
+    if math.prod(radixes) < 1 << 63:
+        keys = np.zeros(count, dtype=np.int64)
+        for radix, values in zip(radixes, field_codes):
+            keys = keys * radix + values
+        return len(np.unique(keys[valid]))
+    rows = np.stack(field_codes, axis=1)[valid]
+    return len(np.unique(rows, axis=0))
+
+
+def unexplored_cells(
+    space: SearchSpace, history: Columns | Sequence[Hyperparams]
+) -> int:
+    return cardinality(space) - explored_cells(space, history)
+
+
+def marginal_coverage(
+    space: SearchSpace,
+    history: Columns | Sequence[Hyperparams],
+    *,
+    bins: int = 10,
+) -> dict[str, FieldCoverage]:
+    # Continuous fields are split into bins, logarithmic for LogUniform
+    columns = history_columns(space, history)
+    actives = space.actives(columns)
+    report = {}
+    for name in space.order:
+        domain = space.domains[name]
+        values = columns[name][actives[name]]
+        if domain.discrete:
+            field_codes = codes(space, name, values)
+            inside = field_codes >= 0
+            counts = np.bincount(field_codes[inside], minlength=domain.size())
+            edges: Any = domain.values()
+        else:
+            edges = (
+                np.geomspace(domain.low, domain.high, bins + 1)
+                if isinstance(domain, LogUniform)
+                else np.linspace(domain.low, domain.high, bins + 1)
+            )
+            numbers = values.astype(np.float64)
+            inside = (numbers >= domain.low) & (numbers <= domain.high)
+            counts, _ = np.histogram(numbers[inside], bins=edges)
+        report[name] = FieldCoverage(
+            values=edges,
+            counts=counts,
+            coverage=float((counts > 0).mean()) if len(counts) else 0.0,
+            outside=int((~inside).sum()),
+        )
+    return report
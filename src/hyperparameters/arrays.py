@@ -0,0 +1,106 @@
+from typing import Any, Callable
+
+import numpy as np
+from pydantic.fields import SHAPE_SINGLETON, ModelField
+from pydantic.validators import bool_validator
+
+from hyperparameters.hyperparams import HyperparamInfo
+
+DTYPES = {bool: np.bool_, int: np.int64, float: np.float64}
+
+
+def _parse_bools(value: Any, field_name: str) -> list[bool]:
+    # Element-wise like list[bool] fields, np.array() takes any truthy value
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    try:
+        return [bool_validator(element) for element in value]
+    except TypeError:
+        raise ValueError(f"Param {field_name}: value is not a valid sequence of bool")
+
+
+def readonly_array(
+    value: Any, dtype: Any, *, field_name: str, length: int | None = None
+) -> np.ndarray:
+    if (
+        isinstance(value, np.ndarray)
+        and value.dtype == dtype
+        and not value.flags.writeable
+    ):
+        # Already validated, share it without a copy
+        array = value
+    else:
+        if isinstance(value, (str, bytes)):
+            raise ValueError(f"Param {field_name}: value is not a valid sequence")
+        if dtype is np.bool_:
+            value = _parse_bools(value, field_name)
+        try:
+            # Copies, the caller keeps a writable array
+            array = np.array(value, dtype=dtype)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(
+                f"Param {field_name}: value is not a valid sequence of "
+                f"{np.dtype(dtype).name}"
+            )
+        # np.array() turns None into NaN, elements of list[float] cannot be None
+        if dtype is np.float64 and np.isnan(array).any():
+            elements = value.tolist() if isinstance(value, np.ndarray) else value
+            if array.ndim == 1 and any(element is None for element in elements):
+                raise ValueError(f"Param {field_name}: none is not an allowed value")
+        array.setflags(write=False)
+    if array.ndim != 1:
+        raise ValueError(
+            f"Param {field_name}: expected a 1-dimensional sequence, "
+            f"got {array.ndim} dimensions"
+        )
+    if length is not None and len(array) != length:
+        raise ValueError(
+            f"Param {field_name} has {len(array)} elements but must have {length}"
+        )
+    return array
+
+
+def _make_array_validator(
+    field_name: str, dtype: Any, length: int | None
+) -> Callable[..., Any]:
+    def validator(cls, value, values, field, config) -> np.ndarray:
+        return readonly_array(value, dtype, field_name=field_name, length=length)
+
+    return validator
+
+
+def prepare_array_field(
+    field_name: str, field: ModelField, info: HyperparamInfo
+) -> None:
+    dtype = DTYPES.get(info.type_)
+    if dtype is None:
+        raise ValueError(
+            f"Field {field_name} of type {info.annotation} cannot be stored as an "
+            "array, only sequences of int, float, and bool can"
+        )
+    # The array validator replaces the element-wise list validation of pydantic
+    field.shape = SHAPE_SINGLETON
+    field.sub_fields = None
+    field.validators = [_make_array_validator(field_name, dtype, info.length)]
+    if not info.required and info.default is not None:
+        default = readonly_array(
+            info.default, dtype, field_name=field_name, length=info.length
+        )
+        info.default = default
+        # Read-only, every instance shares it
+        field.default = None
+        field.default_factory = lambda: default
+
+
+def array_equal(value: Any, other: Any) -> bool:
+    if value is other:
+        return True
+    if value is None or other is None:
+        return False
+    return np.array_equal(value, other)
+
+
+def set_readonly(value: Any) -> None:
+    # Arrays are writable after unpickling and deep copies
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
@@ -0,0 +1,83 @@
+import pickle
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Generic, TypeVar
+
+from hyperparameters.hyperparams import Hyperparams
+
+SelfHyperparams = TypeVar("SelfHyperparams", bound=Hyperparams)
+
+# The segment starts with the length of the pickled payload
+_HEADER = struct.Struct("<Q")
+
+
+class SharedHyperparams(Generic[SelfHyperparams]):
+    def __init__(
+        self,
+        shm: shared_memory.SharedMemory,
+        *,
+        owner: bool,
+        base: SelfHyperparams | None = None,
+    ) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._base = base
+
+    @classmethod
+    def publish(
+        cls, params: SelfHyperparams, name: str | None = None
+    ) -> "SharedHyperparams[SelfHyperparams]":
+        if not params.is_frozen():
+            # The caller keeps its instance mutable
+            params = params.copy().freeze()
+        payload = pickle.dumps(params, protocol=pickle.HIGHEST_PROTOCOL)
+        shm = shared_memory.SharedMemory(
+            name=name, create=True, size=_HEADER.size + len(payload)
+        )
+        _HEADER.pack_into(shm.buf, 0, len(payload))
+        shm.buf[_HEADER.size : _HEADER.size + len(payload)] = payload
+        return cls(shm, owner=True, base=params)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedHyperparams[Any]":
+        shm = shared_memory.SharedMemory(name=name)
+        # Attaching registers the segment with the resource tracker, which
+        # would unlink it when this process exits. Only the owner unlinks it.
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def get(self) -> SelfHyperparams:
+        if self._base is None:
+            (size,) = _HEADER.unpack_from(self._shm.buf, 0)
+            payload = self._shm.buf[_HEADER.size : _HEADER.size + size]
+            try:
+                # Unpickled straight from the shared buffer, without validation
+                self._base = pickle.loads(payload).freeze()
+            finally:
+                payload.release()
+        return self._base
+
+    def with_overrides(
+        self, overrides: dict[str, Any], *, validate: bool = True
+    ) -> SelfHyperparams:
+        return self.get().update(overrides, validate=validate)
+
+    def close(self) -> None:
+        self._shm.close()
+
+    def unlink(self) -> None:
+        if not self._owner:
+            raise RuntimeError("Only the publishing process can unlink the config")
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedHyperparams[SelfHyperparams]":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        if self._owner:
+            self.unlink()
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from datetime import time as day_time
+from decimal import Decimal
+from enum import Enum
+from functools import wraps
+from pathlib import PurePath
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from hyperparameters.hyperparams import Hyperparams
+
+
+_MISSING = object()
+
+T = TypeVar("T")
+
+
+def _encode_default(value: Any) -> Any:
+    # Only types with an encoding that is the same in every process, repr() of
+    # other objects may contain memory addresses
+    if isinstance(value, PurePath):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=_encode_element)
+    if isinstance(value, (date, day_time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    if type(value).__module__ == "numpy" and hasattr(value, "tolist"):
+        # Arrays and scalars, numpy is optional
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(
+        f"Cannot encode a value of type {type(value).__qualname__} for a config key"
+    )
+
+
+def _encode_element(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=_encode_default)
+
+
+def encode_values(values: Mapping[str, Any]) -> str:
+    return json.dumps(
+        dict(values),
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_encode_default,
+    )
+
+
+def hash_encoded(encoded: str) -> str:
+    # Key of values already encoded with encode_values()
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def hash_values(values: Mapping[str, Any]) -> str:
+    return hash_encoded(encode_values(values))
+
+
+def config_key(params: "Hyperparams", fields: Iterable[str] | None = None) -> str:
+    values = params.view()
+    if fields is None:
+        return hash_values(values)
+    fields = set(fields)
+    unknown_fields = fields - params.__fields__.keys()
+    if unknown_fields:
+        raise ValueError(
+            f"Unknown fields for the config key: {' '.join(sorted(unknown_fields))}"
+        )
+    return hash_values({name: values[name] for name in fields})
+
+
+class ResultCache:
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        *,
+        namespace: str = "default",
+        max_memory_entries: int = 1024,
+        max_disk_entries: int | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        if max_memory_entries < 0:
+            raise ValueError("max_memory_entries must be non-negative")
+        if max_disk_entries is not None and max_disk_entries <= 0:
+            raise ValueError("max_disk_entries must be positive")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+
+        self.namespace = namespace
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+
+        # key -> (created_at, value)
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._db: sqlite3.Connection | None = None
+        if path is not None:
+            self._db = sqlite3.connect(
+                os.fspath(path), timeout=30.0, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value BLOB NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS results_accessed_at "
+                "ON results (namespace, accessed_at)"
+            )
+            self._db.commit()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        if self.max_memory_entries == 0:
+            return
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            if self._db is None:
+                return default
+            row = self._db.execute(
+                "SELECT value, created_at FROM results WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return default
+            blob, created_at = row
+            if self._expired(created_at, now):
+                self._db.execute(
+                    "DELETE FROM results WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._db.commit()
+                return default
+            self._db.execute(
+                "UPDATE results SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._db.commit()
+            value = pickle.loads(blob)
+            self._remember(key, created_at, value)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO results "
+                "(namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    key,
+                    pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                    now,
+                    now,
+                ),
+            )
+            if self.max_disk_entries is not None:
+                self._db.execute(
+                    "DELETE FROM results WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM results WHERE namespace = ? "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_disk_entries),
+                )
+            self._db.commit()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def purge_expired(self) -> None:
+        if self.ttl is None:
+            return
+        now = time.time()
+        with self._lock:
+            for key in [
+                key
+                for key, (created_at, _) in self._memory.items()
+                if self._expired(created_at, now)
+            ]:
+                del self._memory[key]
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM results WHERE namespace = ? AND created_at < ?",
+                    (self.namespace, now - self.ttl),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM results WHERE namespace = ?", (self.namespace,)
+                )
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def memoize(
+    cache: ResultCache,
+    *,
+    fields: Iterable[str] | None = None,
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    if fields is not None:
+        fields = list(fields)
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        prefix = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(params: "Hyperparams", *args, **kwargs) -> T:
+            key = ":".join(
+                (
+                    prefix,
+                    f"{type(params).__module__}.{type(params).__qualname__}",
+                    config_key(params, fields),
+                )
+            )
+            if args or kwargs:
+                key += ":" + hash_values({"args": args, "kwargs": kwargs})
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(params, *args, **kwargs)
+                cache.set(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
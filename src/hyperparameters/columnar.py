@@ -0,0 +1,222 @@
+from typing import Any, Iterable, NamedTuple, Sequence, TypeVar
+
+import numpy as np
+
+from hyperparameters.arrays import array_equal
+from hyperparameters.hyperparams import HyperparamInfo, Hyperparams
+
+SelfHyperparams = TypeVar("SelfHyperparams", bound=Hyperparams)
+
+# field name -> 1-D array with one value per instance
+Columns = dict[str, np.ndarray]
+
+_DTYPES = {bool: np.bool_, int: np.int64, float: np.float64}
+
+
+def _dtype(info: HyperparamInfo) -> Any:
+    if info.can_be_none():
+        return object
+    return _DTYPES.get(info.type_, object)
+
+
+def _object_array(values: Iterable[Any], count: int) -> np.ndarray:
+    # np.array() would turn sequence values into extra dimensions
+    array = np.empty(count, dtype=object)
+    for index, value in enumerate(values):
+        array[index] = value
+    return array
+
+
+def column(
+    values: Iterable[Any], count: int, info: HyperparamInfo | None = None
+) -> np.ndarray:
+    dtype = _dtype(info) if info is not None else object
+    if dtype is not object:
+        values = list(values)
+        try:
+            return np.fromiter(values, dtype=dtype, count=count)
+        except (TypeError, ValueError, OverflowError):
+            # Values written by update(validate=False) may not match the type
+            pass
+    return _object_array(values, count)
+
+
+def to_columns(
+    instances: Sequence[Hyperparams], fields: Iterable[str] | None = None
+) -> Columns:
+    if not instances:
+        raise ValueError("At least one instance is required")
+    cls = type(instances[0])
+    infos = cls.parameters()
+    fields = list(fields) if fields is not None else list(infos)
+    unknown_fields = set(fields) - infos.keys()
+    if unknown_fields:
+        raise ValueError(f"Unknown fields: {' '.join(sorted(unknown_fields))}")
+    # Read the raw values, bypassing attribute access and dict() copies
+    dicts = [instance.__dict__ for instance in instances]
+    return {
+        name: column((d[name] for d in dicts), len(dicts), infos[name])
+        for name in fields
+    }
+
+
+def from_columns(
+    cls: type[SelfHyperparams],
+    columns: Columns,
+    rows: Iterable[int] | None = None,
+    *,
+    base: Hyperparams | None = None,
+    validate: bool = False,
+) -> list[SelfHyperparams]:
+    lists = {name: values.tolist() for name, values in columns.items()}
+    if rows is None:
+        rows = range(len(next(iter(lists.values()), ())))
+    base_values = dict(base.view()) if base is not None else {}
+    instances = []
+    for row in rows:
+        values = {**base_values, **{name: lists[name][row] for name in lists}}
+        if validate:
+            instances.append(cls(**values))
+        elif base is not None:
+            instances.append(base.copy(update=values))
+        else:
+            instances.append(cls.construct(**values))
+    return instances
+
+
+def factorize(values: np.ndarray, known: Sequence[Any] | None = None) -> np.ndarray:
+    # Integer code per value. The known values, e.g. the choices of a field,
+    # get codes 0..len(known)-1 in their order.
+    codes: dict[Any, int] = {}
+    for value in known or ():
+        codes.setdefault(_hashable(value), len(codes))
+    if values.dtype != object and not codes:
+        _, inverse = np.unique(values, return_inverse=True)
+        return inverse.astype(np.int64)
+    return np.fromiter(
+        (codes.setdefault(_hashable(value), len(codes)) for value in values.tolist()),
+        dtype=np.int64,
+        count=len(values),
+    )
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        # The repr of large arrays is abbreviated
+        return (np.ndarray, value.dtype.str, value.shape, value.tobytes())
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value).__name__, repr(value))
+    # 1 == True and 1.0 == 1, keep them apart like distinct configs
+    return (type(value), value)
+
+
+def codes(cls: type[Hyperparams], columns: Columns) -> np.ndarray:
+    # (instances, fields) matrix of codes, choice fields use the choice indices
+    infos = cls.parameters()
+    return np.stack(
+        [
+            factorize(values, infos[name].choices if name in infos else None)
+            for name, values in columns.items()
+        ],
+        axis=1,
+    )
+
+
+class ColumnsDiff(NamedTuple):
+    fields: list[str]
+    # (instances, fields) bool matrix, True where the value differs from base
+    mask: np.ndarray
+    base: dict[str, Any]
+    columns: Columns
+
+    def changed_fields(self, row: int) -> list[str]:
+        return [self.fields[i] for i in np.flatnonzero(self.mask[row])]
+
+    def diff(self, row: int) -> dict[str, tuple[Any, Any]]:
+        # Same format as Hyperparams.diff(), base on the left
+        return {
+            name: (self.base[name], self.columns[name][row].item())
+            if self.columns[name].dtype != object
+            else (self.base[name], self.columns[name][row])
+            for name in self.changed_fields(row)
+        }
+
+
+def _not_equal(values: np.ndarray, value: Any, arrays: bool = False) -> np.ndarray:
+    if values.dtype != object:
+        return values != value
+    if arrays:
+        return np.fromiter(
+            (not array_equal(v, value) for v in values.tolist()),
+            dtype=np.bool_,
+            count=len(values),
+        )
+    return np.fromiter(
+        (v != value for v in values.tolist()), dtype=np.bool_, count=len(values)
+    )
+
+
+def diff_many(
+    base: Hyperparams,
+    instances: Sequence[Hyperparams] | Columns,
+    fields: Iterable[str] | None = None,
+) -> ColumnsDiff:
+    if isinstance(instances, dict):
+        columns = instances
+        if fields is not None:
+            columns = {name: columns[name] for name in fields}
+    else:
+        columns = to_columns(instances, fields)
+    base_values = base.view()
+    names = list(columns)
+    mask = np.stack(
+        [
+            _not_equal(columns[name], base_values[name], name in base.__array_fields__)
+            for name in names
+        ],
+        axis=1,
+    )
+    return ColumnsDiff(
+        fields=names,
+        mask=mask,
+        base={name: base_values[name] for name in names},
+        columns=columns,
+    )
+
+
+def _codes_matrix(
+    instances: Sequence[Hyperparams] | np.ndarray, fields: Iterable[str] | None
+) -> np.ndarray:
+    if isinstance(instances, np.ndarray):
+        return instances
+    return codes(type(instances[0]), to_columns(instances, fields))
+
+
+def pairwise_changed(
+    instances: Sequence[Hyperparams] | np.ndarray,
+    fields: Iterable[str] | None = None,
+) -> np.ndarray:
+    # (instances, instances, fields) bool tensor of the changed fields
+    matrix = _codes_matrix(instances, fields)
+    return matrix[:, None, :] != matrix[None, :, :]
+
+
+def pairwise_hamming(
+    instances: Sequence[Hyperparams] | np.ndarray,
+    fields: Iterable[str] | None = None,
+    *,
+    block_size: int = 256,
+) -> np.ndarray:
+    # Number of differing fields for each pair of instances, computed in
+    # blocks of rows to bound the memory of the broadcast comparison
+    matrix = _codes_matrix(instances, fields)
+    count = len(matrix)
+    distances = np.empty((count, count), dtype=np.int64)
+    for start in range(0, count, block_size):
+        block = matrix[start : start + block_size]
+        distances[start : start + block_size] = (
+            block[:, None, :] != matrix[None, :, :]
+        ).sum(axis=2)
+    return distances
@@ -0,0 +1,315 @@
+import math
+from typing import Any, Iterator, Literal, Sequence
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from hyperparameters.columnar import Columns, column
+from hyperparameters.hyperparams import HyperparamInfo, Hyperparams
+from hyperparameters.search import SearchSpace, _codes, _rows_count
+from hyperparameters.spaces import Choice, Domain, IntUniform, LogUniform, Uniform
+
+Categorical = Literal["onehot", "ordinal"]
+
+# class -> categorical encoding -> encoder of the tunable fields
+_encoders: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _leaf_infos(
+    cls: type[Hyperparams], prefix: str = ""
+) -> Iterator[tuple[str, HyperparamInfo]]:
+    infos = cls.parameters()
+    sections = cls.__sections__  # type: ignore
+    for name, info in infos.items():
+        if name in sections:
+            yield from _leaf_infos(sections[name], f"{prefix}{name}.")
+        else:
+            yield prefix + name, info
+
+
+def _is_none(values: np.ndarray) -> np.ndarray:
+    if values.dtype != object:
+        return np.zeros(len(values), dtype=np.bool_)
+    return np.fromiter(
+        (value is None for value in values.tolist()),
+        dtype=np.bool_,
+        count=len(values),
+    )
+
+
+class _Feature:
+    # How a field maps to the columns of the matrix. Bounded numbers are scaled
+    # to [0, 1], logarithmically for LogUniform, categories are one-hot columns
+    # or their index scaled to [0, 1], and Optional fields get a null indicator
+    # as their last column.
+    __slots__ = (
+        "name",
+        "kind",
+        "domain",
+        "choices",
+        "integer",
+        "log",
+        "low",
+        "high",
+        "nullable",
+        "fill",
+        "width",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        info: HyperparamInfo,
+        domain: Domain | None,
+        categorical: Categorical,
+    ) -> None:
+        self.name = name
+        self.domain = domain
+        self.choices: np.ndarray | None = None
+        self.integer = False
+        self.log = False
+        self.low: float | None = None
+        self.high: float | None = None
+        if info.sequence:
+            raise ValueError(f"Sequence field {name} cannot be encoded")
+        if info.type_ is bool and (domain is None or domain == Choice([False, True])):
+            self.kind = "bool"
+            width = 1
+            self.fill: Any = False
+        elif isinstance(domain, Choice):
+            self.kind = categorical
+            self.choices = column(domain.values(), domain.size(), info)
+            width = domain.size() if categorical == "onehot" else 1
+            self.fill = domain.values()[0]
+        elif domain is None or isinstance(domain, (IntUniform, Uniform, LogUniform)):
+            if info.type_ not in (int, float):
+                raise ValueError(
+                    f"Field {name} of type {info.annotation} needs choices "
+                    "to be encoded"
+                )
+            self.kind = "number"
+            self.integer = info.type_ is int or isinstance(domain, IntUniform)
+            if domain is not None:
+                self.log = isinstance(domain, LogUniform)
+                transform = math.log if self.log else float
+                self.low = transform(domain.low)
+                self.high = transform(domain.high)
+            width = 1
+            self.fill = domain.low if domain is not None else 0
+        else:
+            raise ValueError(f"Search space {domain!r} of {name} is not supported")
+        self.nullable = info.can_be_none() and (
+            self.choices is None or None not in domain.values()  # type: ignore
+        )
+        self.width = width + self.nullable
+
+    def names(self) -> list[str]:
+        if self.kind == "onehot":
+            names = [f"{self.name}={value}" for value in self.domain.values()]  # type: ignore
+        else:
+            names = [self.name]
+        if self.nullable:
+            names.append(f"{self.name}:null")
+        return names
+
+    def encode(self, values: np.ndarray, out: np.ndarray) -> None:
+        if self.nullable:
+            null = _is_none(values)
+            out[:, -1] = null
+            if null.any():
+                values = values.copy()
+                values[null] = self.fill
+            out = out[:, :-1]
+        if self.kind == "bool":
+            out[:, 0] = values.astype(np.bool_)
+            return
+        if self.kind in ("onehot", "ordinal"):
+            codes = _codes(self.domain, self.choices, values)  # type: ignore
+            if (codes < 0).any():
+                value = values[np.argmin(codes)]
+                raise ValueError(f"Value {value!r} of {self.name} is not a choice")
+            if self.kind == "onehot":
+                out[np.arange(len(codes)), codes] = 1.0
+            elif len(self.choices) > 1:  # type: ignore
+                out[:, 0] = codes / (len(self.choices) - 1)  # type: ignore
+            return
+        try:
+            numbers = values.astype(np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Values of {self.name} are not numbers")
+        if self.log:
+            if (numbers <= 0).any():
+                raise ValueError(f"Values of {self.name} must be positive")
+            numbers = np.log(numbers)
+        if self.low is not None and self.high > self.low:  # type: ignore
+            numbers = (numbers - self.low) / (self.high - self.low)  # type: ignore
+        elif self.low is not None:
+            numbers = np.zeros_like(numbers)
+        out[:, 0] = numbers
+
+    def decode(self, block: np.ndarray) -> np.ndarray:
+        # Rounds to the nearest valid value, proposals of optimizers
+        # may fall between the values or outside of the bounds
+        if self.kind == "bool":
+            values = block[:, 0] > 0.5
+        elif self.kind in ("onehot", "ordinal"):
+            size = len(self.choices)  # type: ignore
+            if self.kind == "onehot":
+                codes = block[:, :size].argmax(axis=1)
+            else:
+                codes = np.rint(block[:, 0] * (size - 1)).clip(0, size - 1)
+            values = self.choices[codes.astype(np.int64)]  # type: ignore
+        else:
+            numbers = block[:, 0]
+            if self.low is not None:
+                numbers = self.low + numbers.clip(0.0, 1.0) * (self.high - self.low)  # type: ignore
+            if self.log:
+                numbers = np.exp(numbers)
+            if self.domain is not None:
+                numbers = numbers.clip(self.domain.low, self.domain.high)  # type: ignore
+            values = np.rint(numbers).astype(np.int64) if self.integer else numbers
+        if self.nullable:
+            null = block[:, -1] > 0.5
+            if null.any():
+                values = values.astype(object)
+                values[null] = None
+        return values
+
+
+class ConfigEncoder:
+    # Maps configs to dense float matrices for model-based optimizers and back.
+    # Compiled once per class, encode() and decode() work on whole batches.
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        fields: Sequence[str] | None = None,
+        categorical: Categorical = "onehot",
+    ) -> None:
+        if categorical not in ("onehot", "ordinal"):
+            raise ValueError(f"Unknown categorical encoding {categorical!r}")
+        self.cls = cls
+        if fields is None:
+            infos = dict(cls._tunable_params())
+        else:
+            leaf_infos = dict(_leaf_infos(cls))
+            unknown = set(fields) - leaf_infos.keys()
+            if unknown:
+                raise ValueError(f"Unknown fields: {' '.join(sorted(unknown))}")
+            infos = {name: leaf_infos[name] for name in fields}
+        self.infos = infos
+        self.features = [
+            _Feature(name, info, SearchSpace._domain(name, info), categorical)
+            for name, info in infos.items()
+        ]
+        self.slices: dict[str, slice] = {}
+        offset = 0
+        for feature in self.features:
+            self.slices[feature.name] = slice(offset, offset + feature.width)
+            offset += feature.width
+        self.width = offset
+        self.names = [name for feature in self.features for name in feature.names()]
+
+        # Inactive fields are encoded as zeros and decoded to their defaults
+        self.space: SearchSpace | None = None
+        if any(info.active_if for info in infos.values()):
+            self.space = SearchSpace(cls)
+            for name in infos:
+                for parent in self.space.conditions.get(name, ()):
+                    if parent not in infos:
+                        raise ValueError(
+                            f"Field {name} is conditioned on {parent} "
+                            "that is not encoded"
+                        )
+
+    @classmethod
+    def for_class(
+        cls, hyperparams_cls: type[Hyperparams], categorical: Categorical = "onehot"
+    ) -> "ConfigEncoder":
+        encoders = _encoders.setdefault(hyperparams_cls, {})
+        encoder = encoders.get(categorical)
+        if encoder is None:
+            encoder = encoders[categorical] = cls(
+                hyperparams_cls, categorical=categorical
+            )
+        return encoder
+
+    def bounds(self) -> np.ndarray:
+        # (width, 2) array of the lowest and highest value of each column,
+        # unbounded numbers are -inf and inf
+        bounds = np.zeros((self.width, 2))
+        bounds[:, 1] = 1.0
+        for feature in self.features:
+            if feature.kind == "number" and feature.low is None:
+                bounds[self.slices[feature.name].start] = (-np.inf, np.inf)
+        return bounds
+
+    def _actives(self, columns: Columns) -> dict[str, np.ndarray]:
+        if self.space is None:
+            return {}
+        count = _rows_count(columns)
+        actives: dict[str, np.ndarray] = {}
+        for name in self.space.order:
+            if name in self.infos:
+                actives[name] = self.space._active(name, columns, actives, count)
+        return actives
+
+    def encode(self, configs: Columns | Sequence[Hyperparams]) -> np.ndarray:
+        if isinstance(configs, dict):
+            missing = self.infos.keys() - configs.keys()
+            if missing:
+                raise ValueError(f"Configs miss fields: {' '.join(sorted(missing))}")
+            columns = {name: np.asarray(configs[name]) for name in self.infos}
+        else:
+            columns = {
+                name: column(
+                    [params.get_path(name) for params in configs], len(configs), info
+                )
+                for name, info in self.infos.items()
+            }
+        matrix = np.zeros((_rows_count(columns), self.width))
+        actives = self._actives(columns)
+        for feature in self.features:
+            values = columns[feature.name]
+            block = matrix[:, self.slices[feature.name]]
+            active = actives.get(feature.name)
+            if active is None or active.all():
+                feature.encode(values, block)
+                continue
+            values = values.copy()
+            try:
+                values[~active] = feature.fill
+            except (TypeError, ValueError):
+                values = values.astype(object)
+                values[~active] = feature.fill
+            feature.encode(values, block)
+            block[~active] = 0.0
+        return matrix
+
+    def decode(self, matrix: np.ndarray) -> Columns:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != self.width:
+            raise ValueError(
+                f"Expected a matrix with {self.width} columns, got shape {matrix.shape}"
+            )
+        columns = {
+            feature.name: feature.decode(matrix[:, self.slices[feature.name]])
+            for feature in self.features
+        }
+        for name, active in self._actives(columns).items():
+            columns[name] = self.space._apply_inactive(  # type: ignore
+                name, columns[name], active
+            )
+        return columns
+
+    def instances(
+        self, matrix: np.ndarray, base: Hyperparams | None = None
+    ) -> list[Hyperparams]:
+        if base is None:
+            base = self.cls()
+        columns = self.decode(matrix)
+        names = list(columns)
+        lists = [columns[name].tolist() for name in names]
+        return [
+            base.update(dict(zip(names, row)), validate=True) for row in zip(*lists)
+        ]
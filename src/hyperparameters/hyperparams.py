@@ -1,11 +1,34 @@
 import argparse
 import os
-from functools import partial, wraps
-from typing import Any, Iterator, Optional, Protocol, TypeVar, _ProtocolMeta
+import zlib
+from collections.abc import Mapping
+from functools import wraps
+from pathlib import PurePath
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Protocol,
+    Sequence,
+    TypeVar,
+    _ProtocolMeta,
+)
 
-from pydantic.fields import Field, Undefined, Validator
+from pydantic.fields import (
+    SHAPE_LIST,
+    SHAPE_TUPLE_ELLIPSIS,
+    Field,
+    PrivateAttr,
+    Undefined,
+)
 from pydantic.main import BaseModel, ModelField, ModelMetaclass
 
+from hyperparameters import instrumentation
+from hyperparameters.cache import config_key
+
 
 class HyperparamInfo(BaseModel):
     class Config:
@@ -18,7 +41,13 @@ class HyperparamInfo(BaseModel):
     search_space: Any = None
     choices: list[Any] | None = None
     adjust_relative_path: bool = False
+    cache_groups: list[str] | None = None
+    length: int | None = None
+    as_array: bool = False
+    # field name -> value or list of values of it that make this field active
+    active_if: dict[str, Any] | None = None
 
+    sequence: bool = False
     annotation: Any = None
     type_: Any = None
     required: bool = False
@@ -37,30 +66,117 @@ def HP(
     search_space: Any = None,
     choices: list[Any] | None = None,
     adjust_relative_path: bool = False,
+    cache_group: str | Iterable[str] | None = None,
+    length: int | None = None,
+    as_array: bool = False,
+    active_if: dict[str, Any] | None = None,
 ):
+    if isinstance(cache_group, str):
+        cache_group = [cache_group]
     field = Field(
         default=default,
         description=description,
     )
-    field.extra["info"] = HyperparamInfo(
+    # The arguments are checked when the class is finalized, skip validation
+    field.extra["info"] = HyperparamInfo.construct(
         description=description,
         default=default if default is not Undefined else None,
         tunable=tunable if tunable is not None else search_space is not None,
         search_space=search_space,
-        choices=choices,
+        choices=list(choices) if choices is not None else None,
         adjust_relative_path=adjust_relative_path,
+        cache_groups=list(cache_group) if cache_group is not None else None,
+        length=length,
+        as_array=as_array,
+        active_if=dict(active_if) if active_if is not None else None,
     )
     return field
 
 
-def _choices_validator(value: Any, *, field_name: str, choices: list[Any]) -> None:
+def _choices_validator(
+    value: Any, *, field_name: str, choices: list[Any], owner: type
+) -> None:
+    recorder = instrumentation.recorder
+    if recorder is not None:
+        start = perf_counter()
     if value not in choices:
         raise ValueError(
             f"Param {field_name} is {value} but must be one of [{', '.join(choices)}]"
         )
+    if recorder is not None:
+        recorder.record(owner, "choices", perf_counter() - start, field_name)
     return value
 
 
+_MISSING = object()
+
+# Resolved paths kept per class, the cache is cleared when it gets this large
+_PATH_CACHE_SIZE = 4096
+
+
+def _resolve_path(value: Any, relative_paths_root: str) -> Any:
+    # Normalized absolute path of the same type as the value, str or Path.
+    # Other values are left to the validation of the field.
+    if not isinstance(value, (str, os.PathLike)):
+        return value
+    path = os.fspath(value)
+    if not os.path.isabs(path):
+        path = os.path.join(relative_paths_root, path)
+    path = os.path.normpath(path)
+    return type(value)(path) if isinstance(value, PurePath) else path
+
+
+def _adjust_relative_path(
+    value: Any,
+    relative_paths_root: str,
+    *,
+    field_name: str,
+    owner: type,
+    cache: dict[Any, Any] | None = None,
+) -> Any:
+    recorder = instrumentation.recorder
+    if recorder is not None:
+        start = perf_counter()
+    if cache is None or not isinstance(value, (str, PurePath)):
+        resolved = _resolve_path(value, relative_paths_root)
+    else:
+        # Equal str and Path values resolve to different types, and the root
+        # differs between subclasses and can change at runtime
+        key = (relative_paths_root, type(value), value)
+        resolved = cache.get(key)
+        if resolved is None:
+            resolved = _resolve_path(value, relative_paths_root)
+            if len(cache) >= _PATH_CACHE_SIZE:
+                cache.clear()
+            cache[key] = resolved
+    if recorder is not None:
+        recorder.record(owner, "adjust_path", perf_counter() - start, field_name)
+    return resolved
+
+
+def _adjust_field_path(cls: type, name: str, value: Any) -> Any:
+    # The path fields and the root are read from the class of the instance at
+    # call time: subclasses add path fields and the root can change at runtime
+    if name not in cls.__path_fields__:  # type: ignore
+        return value
+    relative_paths_root = _get_relative_paths_root(cls)
+    if not relative_paths_root:
+        return value
+    return _adjust_relative_path(
+        value,
+        relative_paths_root,
+        field_name=name,
+        owner=cls,
+        cache=cls.__path_cache__,  # type: ignore
+    )
+
+
+def _adjust_paths(cls: type, data: dict[str, Any]) -> None:
+    for name in cls.__path_fields__:  # type: ignore
+        if name in data:
+            data[name] = _adjust_field_path(cls, name, data[name])
+
+
 def _load_info(field_name: str, field: ModelField) -> HyperparamInfo:
     info: HyperparamInfo | None = field.field_info.extra.get("info")
     if info is None:
@@ -83,76 +199,580 @@ def _get_relative_paths_root(cls: type) -> Optional[str]:
     return _get_config_value(cls, "relative_paths_root", None)
 
 
-class HyperparamsMeta(ModelMetaclass, _ProtocolMeta):
-    def __new__(mcs, name, bases, namespace, **kwargs) -> type[BaseModel]:
-        cls: type[BaseModel] = super().__new__(mcs, name, bases, namespace, **kwargs)
-        relative_paths_root = _get_relative_paths_root(cls)
-        field: ModelField
-        for field_name, field in cls.__fields__.items():
-            info = _load_info(field_name, field)
+_validate_field = ModelField.validate
 
-            info.type_ = field.type_
-            info.annotation = field.annotation
-            info.required = field.required is True
 
-            if (
-                relative_paths_root
-                and info.adjust_relative_path
-                and info.default is not None
-                and not os.path.isabs(info.default)
-            ):
-                value = os.path.join(relative_paths_root, info.default)
-                info.default = value
-                field.default = value
+class _TimedField(ModelField):
+    # Records the validation of each field, on construction and assignment
+    __slots__ = ()
 
-            if not info.required:
-                if info.default is None and not info.can_be_none():
-                    raise ValueError(
-                        f"Field {field_name} is of type {info.annotation} but is None by default. Use Optional."
-                    )
+    def validate(
+        self, v: Any, values: dict[str, Any], *, loc: Any, cls: Any = None
+    ) -> tuple[Any, Any]:
+        recorder = instrumentation.recorder
+        if recorder is None or cls is None:
+            return _validate_field(self, v, values, loc=loc, cls=cls)
+        start = perf_counter()
+        result = _validate_field(self, v, values, loc=loc, cls=cls)
+        recorder.record(cls, "validate", perf_counter() - start, self.name)
+        return result
 
-                if info.default is not None and not isinstance(
-                    info.default, info.type_
-                ):
-                    raise ValueError(
-                        f"Field {field_name} is of type {info.annotation} but has "
-                        f"default value '{info.default}' of type {type(info.default)}"
-                    )
 
-            if info.type_ is bool:
-                if info.choices is not None and info.choices != [False, True]:
-                    raise ValueError(
-                        f"Field {field_name} is bool and cannot have choices set. "
-                        "False and True are the only possible choices."
-                    )
-                info.choices = [False, True]
-            if info.choices is not None:
-                for choice in info.choices:
-                    if not isinstance(choice, info.type_):
-                        raise ValueError(
-                            f"Field {field_name} is of type {info.annotation} but contains "
-                            f"choice '{choice}' of type {type(choice)}"
-                        )
-                if not info.required and info.default not in info.choices:
+def _make_choices_validator(
+    field_name: str, choices: list[Any], owner: type
+) -> Callable[..., Any]:
+    # Has the signature pydantic calls prepared validators with, this
+    # avoids inspecting and wrapping the validator for every field
+    def validator(cls, value, values, field, config) -> Any:
+        return _choices_validator(
+            value, field_name=field_name, choices=choices, owner=owner
+        )
+
+    validator.__hyperparams_choices__ = True  # type: ignore
+    return validator
+
+
+def _make_length_validator(field_name: str, length: int) -> Callable[..., Any]:
+    def validator(cls, value, values, field, config) -> Any:
+        if value is not None and len(value) != length:
+            raise ValueError(
+                f"Param {field_name} has {len(value)} elements but must have {length}"
+            )
+        return value
+
+    validator.__hyperparams_length__ = True  # type: ignore
+    return validator
+
+
+def _is_sequence_field(field: ModelField, info: HyperparamInfo) -> bool:
+    return (
+        info.sequence
+        or info.as_array
+        or info.length is not None
+        or field.shape in (SHAPE_LIST, SHAPE_TUPLE_ELLIPSIS)
+    )
+
+
+def _prepare_sequence(field_name: str, field: ModelField, info: HyperparamInfo) -> None:
+    # Inherited fields were prepared already, array fields are singletons then
+    if not info.sequence and field.shape not in (SHAPE_LIST, SHAPE_TUPLE_ELLIPSIS):
+        raise ValueError(
+            f"Field {field_name} is of type {info.annotation}, length and as_array "
+            "require a list type"
+        )
+    info.sequence = True
+    if info.choices is not None or info.adjust_relative_path:
+        raise ValueError(
+            f"Field {field_name} is a sequence and cannot have choices "
+            "or adjust relative paths"
+        )
+    if not info.required and info.default is None and not info.can_be_none():
+        raise ValueError(
+            f"Field {field_name} is of type {info.annotation} but is None by default. Use Optional."
+        )
+
+    if info.as_array:
+        from hyperparameters import arrays
+
+        arrays.prepare_array_field(field_name, field, info)
+        return
+
+    if not info.required and info.default is not None:
+        if not isinstance(info.default, (list, tuple)) or not all(
+            isinstance(value, info.type_) for value in info.default
+        ):
+            raise ValueError(
+                f"Field {field_name} is of type {info.annotation} but has "
+                f"default value '{info.default}'"
+            )
+        if info.length is not None and len(info.default) != info.length:
+            raise ValueError(
+                f"Field {field_name} has {len(info.default)} elements by default "
+                f"but must have {info.length}"
+            )
+    # Inherited fields carry the validator of the base class
+    field.post_validators = [
+        validator
+        for validator in field.post_validators or ()
+        if not getattr(validator, "__hyperparams_length__", False)
+    ]
+    if info.length is not None:
+        field.post_validators.append(_make_length_validator(field_name, info.length))
+
+
+def _copy_section(cls, value, values, field, config) -> Any:
+    # Sections are frozen and shared, keep the caller's instance mutable
+    if isinstance(value, Hyperparams) and not value._frozen:
+        value = value.copy()
+    return value
+
+
+def _make_section_validator(
+    section_cls: type["Hyperparams"],
+) -> Callable[..., Any]:
+    # Replaces the model validation of pydantic, which copies instances of the
+    # section class. Frozen sections are shared, the others were copied already.
+    def validator(cls, value, values, field, config) -> Any:
+        if isinstance(value, section_cls):
+            return value
+        return section_cls.validate(value)
+
+    return validator
+
+
+def _freeze_section(cls, value, values, field, config) -> Any:
+    if isinstance(value, Hyperparams):
+        value.freeze()
+    return value
+
+
+_copy_section.__hyperparams_section__ = True  # type: ignore
+_freeze_section.__hyperparams_section__ = True  # type: ignore
+
+
+def _make_section_factory(
+    section_cls: type["Hyperparams"], default: Optional["Hyperparams"]
+) -> Callable[[], "Hyperparams"]:
+    # The default section is created on first use and shared by all instances
+    def factory() -> "Hyperparams":
+        nonlocal default
+        if default is None:
+            default = section_cls().freeze()
+        return default
+
+    if default is not None:
+        default.freeze()
+    return factory
+
+
+def _is_path_type(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, PurePath)
+
+
+def _is_section_type(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, Hyperparams)
+
+
+def _prepare_section(field_name: str, field: ModelField, info: HyperparamInfo) -> None:
+    if info.can_be_none():
+        raise ValueError(f"Sub-config field {field_name} cannot be Optional")
+    if (
+        info.tunable
+        or info.active_if
+        or info.choices is not None
+        or info.adjust_relative_path
+        or info.cache_groups
+    ):
+        raise ValueError(
+            f"Sub-config field {field_name} cannot be tunable, conditional, have "
+            "choices, adjust relative paths, or belong to cache groups, set them on "
+            "its fields"
+        )
+    default = None
+    if not info.required:
+        if not isinstance(info.default, info.type_):
+            raise ValueError(
+                f"Field {field_name} is of type {info.annotation} but has "
+                f"default value '{info.default}' of type {type(info.default)}"
+            )
+        default = info.default
+    field.default = None
+    field.default_factory = _make_section_factory(info.type_, default)
+    field.required = False
+    info.required = False
+    field.validators = [_make_section_validator(info.type_)]
+    # Inherited fields carry the validators of the base class
+    field.pre_validators = [
+        validator
+        for validator in field.pre_validators or ()
+        if not getattr(validator, "__hyperparams_section__", False)
+    ] + [_copy_section]
+    field.post_validators = [
+        validator
+        for validator in field.post_validators or ()
+        if not getattr(validator, "__hyperparams_section__", False)
+    ] + [_freeze_section]
+
+
+def _flatten_values(params: "Hyperparams", prefix: str = "") -> dict[str, Any]:
+    values: dict[str, Any] = {}
+    sections = params.__sections__  # type: ignore
+    for name, value in params.view().items():
+        if name in sections:
+            values.update(_flatten_values(value, f"{prefix}{name}."))
+        else:
+            values[prefix + name] = value
+    return values
+
+
+def _is_field_path(cls: type["Hyperparams"], path: str) -> bool:
+    # "optim.lr" is a field path when optim is a section with an lr field
+    *names, field_name = path.split(".")
+    for name in names:
+        cls = cls.__sections__.get(name)  # type: ignore
+        if cls is None:
+            return False
+    return field_name in cls.__fields__
+
+
+def _split_paths(
+    data: dict[str, Any]
+) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    # "optim.lr" -> ("optim", {"lr": ...})
+    values: dict[str, Any] = {}
+    sections: dict[str, dict[str, Any]] = {}
+    for key, value in data.items():
+        section, dot, rest = key.partition(".")
+        if dot:
+            sections.setdefault(section, {})[rest] = value
+        else:
+            values[key] = value
+    return values, sections
+
+
+def _finalize_class(cls: type[BaseModel]) -> None:
+    relative_paths_root = _get_relative_paths_root(cls)
+    cache_groups: dict[str, list[str]] = {}
+    sections: dict[str, type[Hyperparams]] = {}
+    array_fields: list[str] = []
+    field: ModelField
+    for field_name, field in cls.__fields__.items():
+        field.__class__ = _TimedField
+        info = _load_info(field_name, field)
+        for group in info.cache_groups or ():
+            cache_groups.setdefault(group, []).append(field_name)
+
+        info.type_ = field.type_
+        info.annotation = field.annotation
+        info.required = field.required is True
+        for name in info.active_if or ():
+            if name not in cls.__fields__ or name == field_name:
+                raise ValueError(
+                    f"Field {field_name} is conditioned on unknown field {name}"
+                )
+
+        if _is_section_type(info.type_):
+            _prepare_section(field_name, field, info)
+            sections[field_name] = info.type_
+            continue
+
+        if _is_sequence_field(field, info):
+            _prepare_sequence(field_name, field, info)
+            if info.as_array:
+                array_fields.append(field_name)
+            continue
+
+        if _is_path_type(info.type_) and isinstance(info.default, str):
+            info.default = info.type_(info.default)
+            field.default = info.default
+        if relative_paths_root and info.adjust_relative_path and not info.required:
+            value = _resolve_path(info.default, relative_paths_root)
+            info.default = value
+            field.default = value
+
+        if not info.required:
+            if info.default is None and not info.can_be_none():
+                raise ValueError(
+                    f"Field {field_name} is of type {info.annotation} but is None by default. Use Optional."
+                )
+
+            if info.default is not None and not isinstance(info.default, info.type_):
+                raise ValueError(
+                    f"Field {field_name} is of type {info.annotation} but has "
+                    f"default value '{info.default}' of type {type(info.default)}"
+                )
+
+        if info.type_ is bool:
+            if info.choices is not None and info.choices != [False, True]:
+                raise ValueError(
+                    f"Field {field_name} is bool and cannot have choices set. "
+                    "False and True are the only possible choices."
+                )
+            info.choices = [False, True]
+        if info.choices is not None:
+            # Check every distinct type of the choices once
+            for choice_type in {type(choice) for choice in info.choices}:
+                if not issubclass(choice_type, info.type_):
+                    choice = next(c for c in info.choices if type(c) is choice_type)
                     raise ValueError(
-                        f"Field {field_name} has invalid default '{info.default}' "
-                        "that is not one of the choices"
+                        f"Field {field_name} is of type {info.annotation} but contains "
+                        f"choice '{choice}' of type {choice_type}"
                     )
-
-                validator = Validator(
-                    func=partial(
-                        _choices_validator, field_name=field_name, choices=info.choices
-                    ),
-                    always=True,
-                    check_fields=True,
+            if not info.required and info.default not in info.choices:
+                raise ValueError(
+                    f"Field {field_name} has invalid default '{info.default}' "
+                    "that is not one of the choices"
                 )
-                field.class_validators[field_name] = validator
-                field.populate_validators()
-                # Note: cls.__validators__ is a dict[str, list[Callable]]
-                cls.__validators__.setdefault(field_name, []).append(validator)  # type: ignore
+
+            # Inherited fields carry the validator of the base class
+            field.post_validators = [
+                validator
+                for validator in field.post_validators or ()
+                if not getattr(validator, "__hyperparams_choices__", False)
+            ]
+            field.post_validators.append(
+                _make_choices_validator(field_name, info.choices, cls)
+            )
+            field.validate_always = True
+
+    # group name -> names of the fields in the group
+    cls.__cache_groups__ = {  # type: ignore
+        group: tuple(names) for group, names in cache_groups.items()
+    }
+    # field name -> names of the groups the field belongs to
+    cls.__field_cache_groups__ = {  # type: ignore
+        field_name: tuple(
+            group for group, names in cache_groups.items() if field_name in names
+        )
+        for field_name in cls.__fields__
+    }
+    # field name -> class of the sub-config
+    cls.__sections__ = sections  # type: ignore
+    # fields with adjust_relative_path
+    cls.__path_fields__ = frozenset(  # type: ignore
+        field_name
+        for field_name, field in cls.__fields__.items()
+        if _load_info(field_name, field).adjust_relative_path
+    )
+    # (root, type, value) -> resolved path, of the adjust_relative_path fields
+    cls.__path_cache__ = {}  # type: ignore
+    # checked when unpickling, see _restore_hyperparams()
+    cls.__fields_hash__ = _fields_hash(cls)  # type: ignore
+    # fields stored as read-only NumPy arrays
+    cls.__array_fields__ = frozenset(array_fields)  # type: ignore
+    # == on arrays is element-wise, such classes are compared with diff()
+    cls.__compare_by_diff__ = bool(array_fields) or any(  # type: ignore
+        section_cls.__compare_by_diff__ for section_cls in sections.values()
+    )
+    _generate_methods(cls, bool(cache_groups))
+    cls.__hyperparams_finalized__ = True  # type: ignore
+
+
+def _resolve_method(cls: type, name: str) -> Any:
+    for curr_cls in cls.__mro__:
+        if name in curr_cls.__dict__:
+            return curr_cls.__dict__[name]
+    return None
+
+
+def _is_generic_method(cls: type, name: str) -> bool:
+    method = _resolve_method(cls, name)
+    if getattr(method, "__hyperparams_generic__", False):
+        # Keep the generic method on the class defining it
+        return name not in cls.__dict__
+    return getattr(method, "__hyperparams_generated__", False)
+
+
+def _create_method(
+    cls: type, name: str, lines: list[str], namespace: dict[str, Any]
+) -> None:
+    exec("\n".join(lines), namespace)
+    method = namespace[name]
+    method.__qualname__ = f"{cls.__qualname__}.{name}"
+    method.__hyperparams_generated__ = True
+    setattr(cls, name, method)
+
+
+def _generate_methods(cls: type[BaseModel], has_cache_groups: bool) -> None:
+    # Emits __init__ and __setattr__ that only touch the fields which need
+    # extra work, like dataclasses do. User-defined methods are kept, and a
+    # subclass defining them reaches these through super() with its own fields.
+    path_fields = sorted(cls.__path_fields__)  # type: ignore
+    namespace = {
+        "cls": cls,
+        "instrumentation": instrumentation,
+        "perf_counter": perf_counter,
+        "path_fields": cls.__path_fields__,  # type: ignore
+        "_get_relative_paths_root": _get_relative_paths_root,
+        "_adjust_relative_path": _adjust_relative_path,
+        "_adjust_field_path": _adjust_field_path,
+        "_adjust_paths": _adjust_paths,
+        "_ensure_finalized": _ensure_finalized,
+        "path_cache": cls.__path_cache__,  # type: ignore
+        "_base_init": BaseModel.__init__,
+        "_base_setattr": BaseModel.__setattr__,
+    }
+
+    if _is_generic_method(cls, "__init__"):
+        lines = [
+            "def __init__(__pydantic_self__, **data):",
+            "    recorder = instrumentation.recorder",
+            "    if recorder is not None:",
+            "        start = perf_counter()",
+            "    owner = type(__pydantic_self__)",
+            "    if owner is not cls:",
+            "        _ensure_finalized(owner)",
+            "        _adjust_paths(owner, data)",
+        ]
+        if path_fields:
+            # The root is read at call time, it can change at runtime
+            lines += [
+                "    else:",
+                "        relative_paths_root = _get_relative_paths_root(cls)",
+                "        if relative_paths_root:",
+            ]
+        for field_name in path_fields:
+            lines += [
+                f"            if {field_name!r} in data:",
+                f"                data[{field_name!r}] = _adjust_relative_path(",
+                f"                    data[{field_name!r}], relative_paths_root,",
+                f"                    field_name={field_name!r}, owner=cls,",
+                "                    cache=path_cache)",
+            ]
+        lines += [
+            "    _base_init(__pydantic_self__, **data)",
+            "    if recorder is not None:",
+            "        recorder.record(owner, 'construct', perf_counter() - start)",
+        ]
+        _create_method(cls, "__init__", lines, namespace)
+
+    if _is_generic_method(cls, "__setattr__"):
+        lines = [
+            "def __setattr__(self, name, value):",
+            "    recorder = instrumentation.recorder",
+            "    if recorder is not None:",
+            "        start = perf_counter()",
+            "    if self._frozen:",
+            "        self._raise_frozen()",
+            "    owner = type(self)",
+            "    if owner is not cls:",
+            "        value = _adjust_field_path(owner, name, value)",
+        ]
+        if path_fields:
+            lines += [
+                "    elif name in path_fields:",
+                "        relative_paths_root = _get_relative_paths_root(cls)",
+                "        if relative_paths_root:",
+                "            value = _adjust_relative_path(",
+                "                value, relative_paths_root, field_name=name, owner=cls,",
+                "                cache=path_cache)",
+            ]
+        lines.append("    _base_setattr(self, name, value)")
+        if has_cache_groups:
+            lines += [
+                "    if self._cache_keys:",
+                "        self._invalidate_cache_keys((name,))",
+            ]
+        else:
+            # Subclasses may add cache groups
+            lines += [
+                "    if owner is not cls and self._cache_keys:",
+                "        self._invalidate_cache_keys((name,))",
+            ]
+        lines += [
+            "    if recorder is not None:",
+            "        recorder.record(owner, 'assign', perf_counter() - start, name)",
+        ]
+        _create_method(cls, "__setattr__", lines, namespace)
+
+
+def _ensure_finalized(cls: type[BaseModel]) -> None:
+    # Looked up in the class' own namespace, subclasses are finalized separately
+    if not cls.__dict__.get("__hyperparams_finalized__", False):
+        _finalize_class(cls)
+
+
+def finalize_classes(*classes: type[BaseModel]) -> None:
+    for cls in classes:
+        _ensure_finalized(cls)
+
+
+class HyperparamsMeta(ModelMetaclass, _ProtocolMeta):
+    def __new__(mcs, name, bases, namespace, **kwargs) -> type[BaseModel]:
+        cls: type[BaseModel] = super().__new__(mcs, name, bases, namespace, **kwargs)
+        cls.__hyperparams_finalized__ = False  # type: ignore
+        if not _get_config_value(cls, "defer_finalization", False):
+            _finalize_class(cls)
+        elif getattr(
+            _resolve_method(cls, "__init__"), "__hyperparams_generated__", False
+        ):
+            # The __init__ generated for a base class would skip finalization
+            for curr_cls in cls.__mro__:
+                init = curr_cls.__dict__.get("__init__")
+                if getattr(init, "__hyperparams_generic__", False):
+                    cls.__init__ = init  # type: ignore
+                    break
         return cls
 
 
+def _fields_hash(cls: type[BaseModel]) -> int:
+    # Identifies the field names and their order, a few bytes per pickle
+    return zlib.crc32("\0".join(cls.__fields__).encode("utf-8"))
+
+
+def _restore_hyperparams(
+    cls: type["Hyperparams"],
+    values: tuple[Any, ...],
+    fields_set_mask: int,
+    fields_hash: int | None = None,
+    frozen: bool = False,
+) -> "Hyperparams":
+    # Trusted path: the values were validated before the instance was reduced
+    _ensure_finalized(cls)
+    if len(values) != len(cls.__fields__) or (
+        fields_hash is not None and fields_hash != cls.__fields_hash__  # type: ignore
+    ):
+        # Values are stored by position, never assign them to other fields
+        raise ValueError(
+            f"Cannot unpickle {cls.__qualname__}, its fields changed since the "
+            "instance was pickled"
+        )
+    params = cls.__new__(cls)
+    object.__setattr__(params, "__dict__", dict(zip(cls.__fields__, values)))
+    if fields_set_mask == 0:
+        fields_set = set()
+    elif fields_set_mask == -1:
+        fields_set = set(cls.__fields__)
+    else:
+        fields_set = {
+            name
+            for index, name in enumerate(cls.__fields__)
+            if fields_set_mask >> index & 1
+        }
+    object.__setattr__(params, "__fields_set__", fields_set)
+    params._init_private_attributes()
+    for name in cls.__sections__:  # type: ignore
+        params.__dict__[name].freeze()
+    if cls.__array_fields__:  # type: ignore
+        _set_arrays_readonly(params)
+    if frozen:
+        params.freeze()
+    return params
+
+
+def _set_arrays_readonly(params: "Hyperparams") -> None:
+    from hyperparameters.arrays import set_readonly
+
+    for name in params.__array_fields__:  # type: ignore
+        set_readonly(params.__dict__[name])
+
+
+class HyperparamsView(Mapping):
+    # Live read-only view of the fields of an instance, in schema order
+    __slots__ = ("_params",)
+
+    def __init__(self, params: "Hyperparams") -> None:
+        self._params = params
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._params.__fields__:
+            raise KeyError(name)
+        # __dict__ is replaced on validated assignment, never cache it
+        return self._params.__dict__[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._params.__fields__)
+
+    def __len__(self) -> int:
+        return len(self._params.__fields__)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._params.__fields__
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self)!r})"
+
+
 SelfHyperparamsProtocol = TypeVar(
     "SelfHyperparamsProtocol", bound="HyperparamsProtocol"
 )
@@ -165,7 +785,9 @@ class HyperparamsProtocol(Protocol):
 
     @classmethod
     def add_arguments(
-        cls: type[SelfHyperparamsProtocol], parser: argparse.ArgumentParser
+        cls: type[SelfHyperparamsProtocol],
+        parser: argparse.ArgumentParser,
+        prefix: str = "",
     ) -> None:
         ...
 
@@ -181,6 +803,12 @@ class HyperparamsProtocol(Protocol):
     def _tunable_params(cls) -> Iterator[tuple[str, HyperparamInfo]]:
         ...
 
+    def view(self) -> HyperparamsView:
+        ...
+
+    def get_path(self, path: str) -> Any:
+        ...
+
 
 SelfHyperparams = TypeVar("SelfHyperparams", bound="Hyperparams")
 
@@ -193,61 +821,190 @@ class Hyperparams(BaseModel, HyperparamsProtocol, metaclass=HyperparamsMeta):
 
         # Hyperparams config
         relative_paths_root: str = os.getcwd()
+        # Postpone checking the fields until the class is first used
+        defer_finalization: bool = False
+
+    # group name -> cached key of the group, see cache_key()
+    _cache_keys: dict[str, str] = PrivateAttr(default_factory=dict)
+    # set by freeze(), frozen instances reject any assignment
+    _frozen: bool = PrivateAttr(default=False)
 
     def __init__(self, **data: Any) -> None:
-        relative_paths_root = _get_relative_paths_root(self.__class__)
-        if relative_paths_root:
-            for name in data:
-                if name not in self.__fields__:
-                    continue
-                info: HyperparamInfo = _load_info(name, self.__fields__[name])
-                if info.adjust_relative_path and not os.path.isabs(data[name]):
-                    data[name] = os.path.join(relative_paths_root, data[name])
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
+        _ensure_finalized(self.__class__)
+        _adjust_paths(self.__class__, data)
         super().__init__(**data)
+        if recorder is not None:
+            recorder.record(self.__class__, "construct", perf_counter() - start)
 
     def __setattr__(self, name, value) -> None:
-        relative_paths_root = _get_relative_paths_root(self.__class__)
-        if relative_paths_root:
-            info: HyperparamInfo = _load_info(name, self.__fields__[name])
-            if info.adjust_relative_path and not os.path.isabs(value):
-                value = os.path.join(relative_paths_root, value)
-        return super().__setattr__(name, value)
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
+        if self._frozen:
+            self._raise_frozen()
+        value = _adjust_field_path(self.__class__, name, value)
+        super().__setattr__(name, value)
+        self._invalidate_cache_keys((name,))
+        if recorder is not None:
+            recorder.record(self.__class__, "assign", perf_counter() - start, name)
+
+    # Replaced by the specialized methods generated for each class
+    __init__.__hyperparams_generic__ = True  # type: ignore
+    __setattr__.__hyperparams_generic__ = True  # type: ignore
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
+        fields = self.__fields__
+        fields_set = self.__fields_set__
+        # Bit i is set when the i-th field was set explicitly, -1 means all
+        if not fields_set:
+            fields_set_mask = 0
+        elif len(fields_set) == len(fields) and fields_set.issuperset(fields):
+            fields_set_mask = -1
+        else:
+            fields_set_mask = sum(
+                1 << index for index, name in enumerate(fields) if name in fields_set
+            )
+        reduced = (
+            _restore_hyperparams,
+            (
+                self.__class__,
+                tuple(map(self.__dict__.__getitem__, fields)),
+                fields_set_mask,
+                self.__fields_hash__,  # type: ignore
+                self._frozen,
+            ),
+        )
+        if recorder is not None:
+            recorder.record(self.__class__, "pickle", perf_counter() - start)
+        return reduced
+
+    def _invalidate_cache_keys(self, names: Iterable[str]) -> None:
+        if not self._cache_keys:
+            return
+        field_cache_groups = self.__field_cache_groups__  # type: ignore
+        for name in names:
+            for group in field_cache_groups.get(name, ()):
+                self._cache_keys.pop(group, None)
+
+    def _copy_and_set_values(
+        self: SelfHyperparams,
+        values: dict[str, Any],
+        fields_set: set[str],
+        *,
+        deep: bool,
+    ) -> SelfHyperparams:
+        copied = super()._copy_and_set_values(values, fields_set, deep=deep)
+        # The copy may hold different values, never share the cached keys
+        object.__setattr__(copied, "_cache_keys", {})
+        object.__setattr__(copied, "_frozen", False)
+        if deep and self.__array_fields__:  # type: ignore
+            _set_arrays_readonly(copied)
+        return copied
+
+    def __eq__(self, other: Any) -> bool:
+        if self.__compare_by_diff__ and isinstance(other, Hyperparams):  # type: ignore
+            return self.__fields__.keys() == other.__fields__.keys() and not self.diff(
+                other
+            )
+        return super().__eq__(other)
+
+    def freeze(self: SelfHyperparams) -> SelfHyperparams:
+        object.__setattr__(self, "_frozen", True)
+        return self
+
+    def is_frozen(self) -> bool:
+        return self._frozen
+
+    def _raise_frozen(self) -> None:
+        raise TypeError(
+            f'"{self.__class__.__name__}" instance is frozen, use update() to get '
+            "an updated copy"
+        )
+
+    def cache_key(self, group: str) -> str:
+        key = self._cache_keys.get(group)
+        if key is None:
+            fields = self.__cache_groups__.get(group)  # type: ignore
+            if fields is None:
+                raise ValueError(f"Unknown cache group {group}")
+            key = config_key(self, fields)
+            self._cache_keys[group] = key
+        return key
+
+    @classmethod
+    def construct(
+        cls: type[SelfHyperparams], _fields_set: set[str] | None = None, **values: Any
+    ) -> SelfHyperparams:
+        _ensure_finalized(cls)
+        return super().construct(_fields_set, **values)
 
     @classmethod
     def parameters(cls: type[SelfHyperparams]) -> dict[str, HyperparamInfo]:
+        _ensure_finalized(cls)
         return {
             field_name: _load_info(field_name, field)
             for field_name, field in cls.__fields__.items()
         }
 
-    # TODO: add nargs support
     @classmethod
     def add_arguments(
-        cls: type[SelfHyperparams], parser: argparse.ArgumentParser
+        cls: type[SelfHyperparams],
+        parser: argparse.ArgumentParser,
+        prefix: str = "",
     ) -> None:
+        # The fields of sub-configs get prefixed flags: --optim-lr sets optim.lr
+        _ensure_finalized(cls)
+        sections = cls.__sections__  # type: ignore
         for field_name, field in cls.__fields__.items():
             info = _load_info(field_name, field)
-            option_name = "--" + field_name.replace("_", "-")
+            dest = prefix + field_name
+            if field_name in sections:
+                sections[field_name].add_arguments(parser, prefix=dest + ".")
+                if field.field_info.default is not Undefined:
+                    # The default of the field overrides the class defaults
+                    parser.set_defaults(
+                        **_flatten_values(field.get_default(), dest + ".")
+                    )
+                continue
+            option_name = dest.replace(".", "-").replace("_", "-")
 
-            if info.type_ is bool:
+            if info.sequence:
+                parser.add_argument(
+                    "--" + option_name,
+                    dest=dest,
+                    help=info.description,
+                    # Pydantic parses the bools
+                    type=str if info.type_ is bool else info.type_,
+                    nargs=info.length if info.length is not None else "*",
+                    default=info.default,
+                    required=info.required,
+                )
+            elif info.type_ is bool:
                 group = parser.add_mutually_exclusive_group(required=info.required)
                 group.add_argument(
-                    option_name,
+                    "--" + option_name,
                     action="store_true",
-                    dest=field_name,
+                    dest=dest,
                     help=info.description,
                 )
                 group.add_argument(
-                    "--no-" + field_name.replace("_", "-"),
+                    "--no-" + option_name,
                     action="store_false",
-                    dest=field_name,
+                    dest=dest,
                     help="Disable: " + info.description,
                 )
                 if info.default is not None:
-                    parser.set_defaults(**{field_name: bool(info.default)})
+                    parser.set_defaults(**{dest: bool(info.default)})
             else:
                 parser.add_argument(
-                    option_name,
+                    "--" + option_name,
+                    dest=dest,
                     help=info.description,
                     type=info.type_,
                     default=info.default,
@@ -261,15 +1018,64 @@ class Hyperparams(BaseModel, HyperparamsProtocol, metaclass=HyperparamsMeta):
         args: argparse.Namespace,
         **overrides,
     ) -> SelfHyperparams:
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
+        overrides, section_overrides = _split_paths(overrides)
         fields = {
-            **{f: args.__dict__[f] for f in cls.__fields__},
+            **cls._arguments_values(args.__dict__, ""),
             **overrides,
         }
-        return cls(**fields)
+        params = cls(**fields)
+        if section_overrides:
+            params.update(
+                {
+                    f"{section}.{name}": value
+                    for section, values in section_overrides.items()
+                    for name, value in values.items()
+                },
+                inplace=True,
+                validate=True,
+            )
+        if recorder is not None:
+            recorder.record(cls, "from_arguments", perf_counter() - start)
+        return params
+
+    @classmethod
+    def _arguments_values(
+        cls, arguments: dict[str, Any], prefix: str
+    ) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        sections = cls.__sections__  # type: ignore
+        for field_name in cls.__fields__:
+            section_cls = sections.get(field_name)
+            if section_cls is None:
+                values[field_name] = arguments[prefix + field_name]
+                continue
+            section_values = section_cls._arguments_values(
+                arguments, f"{prefix}{field_name}."
+            )
+            # Sections left at their defaults share the default instance
+            default = cls.__fields__[field_name].get_default().__dict__
+            array_fields = section_cls.__array_fields__  # type: ignore
+            if array_fields:
+                from hyperparameters.arrays import array_equal
+            if any(
+                not array_equal(default[k], v) if k in array_fields else default[k] != v
+                for k, v in section_values.items()
+            ):
+                values[field_name] = section_values
+        return values
 
     @classmethod
     def _tunable_params(cls) -> Iterator[tuple[str, HyperparamInfo]]:
+        _ensure_finalized(cls)
+        sections = cls.__sections__  # type: ignore
         for field_name, field in cls.__fields__.items():
+            if field_name in sections:
+                for name, info in sections[field_name]._tunable_params():
+                    yield f"{field_name}.{name}", info
+                continue
             info = _load_info(field_name, field)
             if info.tunable:
                 if (
@@ -285,21 +1091,58 @@ class Hyperparams(BaseModel, HyperparamsProtocol, metaclass=HyperparamsMeta):
 
     @wraps(BaseModel.json)
     def json(self, **kwargs) -> str:
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
         if "indent" not in kwargs:
             kwargs["indent"] = 4
         elif kwargs["indent"] == 0:
             del kwargs["indent"]
-        return super().json(**kwargs)
+        encoder = kwargs.get("encoder") or self.__json_encoder__
+        # Arrays are encoded as lists
+        kwargs["encoder"] = lambda value: (
+            value.tolist() if hasattr(value, "tolist") else encoder(value)
+        )
+        result = super().json(**kwargs)
+        if recorder is not None:
+            recorder.record(self.__class__, "json", perf_counter() - start)
+        return result
+
+    def view(self) -> HyperparamsView:
+        return HyperparamsView(self)
+
+    def get_path(self, path: str) -> Any:
+        # "optim.lr" reads the lr field of the optim sub-config
+        value: Any = self
+        for name in path.split("."):
+            value = value.view()[name]
+        return value
 
     def diff(self: SelfHyperparams, other: SelfHyperparams) -> dict:
-        my_dict = self.dict()
-        other_dict = other.dict()
-        all_keys = set(my_dict) | set(other_dict)
-        return {
-            k: (my_dict.get(k), other_dict.get(k))
-            for k in all_keys
-            if my_dict.get(k) != other_dict.get(k)
-        }
+        my_values = self.view()
+        other_values = other.view()
+        sections = self.__sections__  # type: ignore
+        array_fields = self.__array_fields__  # type: ignore
+        if array_fields:
+            from hyperparameters.arrays import array_equal
+        result = {}
+        for k in my_values:
+            my_value = my_values[k]
+            other_value = other_values.get(k)
+            if k in sections and isinstance(other_value, Hyperparams):
+                # Shared sections are unchanged, others are compared field by field
+                if my_value is not other_value:
+                    for name, values in my_value.diff(other_value).items():
+                        result[f"{k}.{name}"] = values
+            elif k in array_fields:
+                if not array_equal(my_value, other_value):
+                    result[k] = (my_value, other_value)
+            elif my_value != other_value:
+                result[k] = (my_value, other_value)
+        for k in other_values:
+            if k not in my_values and other_values[k] is not None:
+                result[k] = (None, other_values[k])
+        return result
 
     def update(
         self: SelfHyperparams,
@@ -308,6 +1151,10 @@ class Hyperparams(BaseModel, HyperparamsProtocol, metaclass=HyperparamsMeta):
         inplace: bool = False,
         validate: bool = False,
     ) -> SelfHyperparams:
+        if inplace and self._frozen:
+            self._raise_frozen()
+        if any("." in key for key in data):
+            data = self._update_sections(data, validate=validate)
         if validate:
             unknown_keys = data.keys() - self.__dict__.keys()
             if unknown_keys:
@@ -324,6 +1171,136 @@ class Hyperparams(BaseModel, HyperparamsProtocol, metaclass=HyperparamsMeta):
         else:
             if inplace:
                 self.__dict__.update(data)
+                self._invalidate_cache_keys(data)
                 return self
             else:
                 return self.copy(update=data)
+
+    def _update_sections(
+        self, data: dict[str, Any], *, validate: bool
+    ) -> dict[str, Any]:
+        # Updated copies replace the changed sections, the others stay shared
+        if validate:
+            # Reported with the whole path, before any section is updated
+            unknown_keys = [
+                key
+                for key in data
+                if "." in key and not _is_field_path(self.__class__, key)
+            ]
+            if unknown_keys:
+                raise ValueError(
+                    f"Update data contains unknown keys: {' '.join(unknown_keys)}"
+                )
+        data, section_data = _split_paths(data)
+        sections = self.__sections__  # type: ignore
+        for name, values in section_data.items():
+            if name not in sections:
+                data.update({f"{name}.{key}": value for key, value in values.items()})
+                continue
+            section = data.get(name, self.__dict__[name])
+            if isinstance(section, dict):
+                section = sections[name](**section)
+            data[name] = section.update(values, validate=validate).freeze()
+        return data
+
+    # Defined last, the name shadows the builtin in the class body
+    @wraps(BaseModel.dict)
+    def dict(self, **kwargs) -> dict[str, Any]:
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
+        result = super().dict(**kwargs)
+        if recorder is not None:
+            recorder.record(self.__class__, "dict", perf_counter() - start)
+        return result
+
+
+def _rebase_path(value: Any, old_root: str, new_root: str) -> Any:
+    if not isinstance(value, (str, os.PathLike)):
+        return value
+    path = os.path.normpath(os.fspath(value))
+    if path == old_root:
+        path = new_root
+    elif path.startswith(old_root.rstrip(os.sep) + os.sep):
+        path = os.path.join(new_root, path[len(old_root) :].lstrip(os.sep))
+    else:
+        return value
+    return type(value)(path) if isinstance(value, PurePath) else path
+
+
+def rebase_paths(
+    instances: Sequence[SelfHyperparams],
+    old_root: str | os.PathLike,
+    new_root: str | os.PathLike,
+    *,
+    inplace: bool = False,
+) -> list[SelfHyperparams]:
+    # Moves the path fields under old_root to new_root, e.g. when a sweep moves
+    # to another mount. Each distinct path and each distinct sub-config is
+    # rebased once, and the other fields are not validated again.
+    return _rebase_instances(
+        list(instances),
+        os.path.normpath(os.fspath(old_root)),
+        os.path.normpath(os.fspath(new_root)),
+        inplace,
+        {},
+    )
+
+
+def _rebase_instances(
+    instances: list[Any],
+    old_root: str,
+    new_root: str,
+    inplace: bool,
+    rebased: dict[Any, Any],
+) -> list[Any]:
+    classes: dict[type, list[int]] = {}
+    for row, params in enumerate(instances):
+        classes.setdefault(type(params), []).append(row)
+    result = list(instances)
+    for cls, rows in classes.items():
+        changes: list[dict[str, Any]] = [{} for _ in rows]
+        for name, info in cls.parameters().items():
+            if not (info.adjust_relative_path or _is_path_type(info.type_)):
+                continue
+            for change, row in zip(changes, rows):
+                value = instances[row].__dict__[name]
+                new_value = rebased.get(value, _MISSING)
+                if new_value is _MISSING:
+                    new_value = _rebase_path(value, old_root, new_root)
+                    rebased[value] = new_value
+                if new_value is not value:
+                    change[name] = new_value
+        for name in cls.__sections__:  # type: ignore
+            values = [instances[row].__dict__[name] for row in rows]
+            # Shared sub-configs are rebased once and stay shared
+            distinct = {id(value): value for value in values if value is not None}
+            sections = _rebase_instances(
+                list(distinct.values()), old_root, new_root, False, rebased
+            )
+            new_sections = {
+                key: section
+                for key, section in zip(distinct, sections)
+                if section is not distinct[key]
+            }
+            for change, value in zip(changes, values):
+                if id(value) in new_sections:
+                    change[name] = new_sections[id(value)]
+        for change, row in zip(changes, rows):
+            if not change:
+                continue
+            params = instances[row]
+            if inplace:
+                params.update(change, inplace=True)
+            else:
+                # A shallow copy like copy(update=...), without its overhead
+                copied = cls.__new__(cls)
+                object.__setattr__(copied, "__dict__", {**params.__dict__, **change})
+                object.__setattr__(
+                    copied, "__fields_set__", params.__fields_set__.union(change)
+                )
+                copied._init_private_attributes()
+                if params.is_frozen():
+                    copied.freeze()
+                result[row] = copied
+    return result
@@ -0,0 +1,140 @@
+import math
+import os
+import random
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any
+
+# The active recorder, None when instrumentation is disabled.
+# Call sites check it before taking any timings, so a disabled
+# instrumentation costs a single global lookup.
+recorder: "Recorder | None" = None
+
+_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class _Stats:
+    __slots__ = ("count", "total", "min", "max", "samples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.samples: list[float] = []
+
+    def add(self, duration: float, max_samples: int, rng: random.Random) -> None:
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        # Reservoir sampling keeps the memory bounded for the percentiles
+        if len(self.samples) < max_samples:
+            self.samples.append(duration)
+        else:
+            index = rng.randrange(self.count)
+            if index < max_samples:
+                self.samples[index] = duration
+
+    def quantiles(self) -> dict[float, float]:
+        samples = sorted(self.samples)
+        return {
+            q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in _QUANTILES
+        }
+
+    def to_dict(self) -> dict[str, float]:
+        quantiles = self.quantiles()
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+            **{f"p{round(q * 100)}": value for q, value in quantiles.items()},
+        }
+
+
+class Recorder:
+    def __init__(self, max_samples: int = 10_000, seed: int | None = None) -> None:
+        self.max_samples = max_samples
+        # (module.qualname of the class, operation, field name) -> stats, field
+        # name is "" for the operations on whole instances
+        self._stats: defaultdict[tuple[str, str, str], _Stats] = defaultdict(_Stats)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def record(
+        self, cls: type, operation: str, duration: float, field: str = ""
+    ) -> None:
+        with self._lock:
+            self._stats[f"{cls.__module__}.{cls.__qualname__}", operation, field].add(
+                duration, self.max_samples, self._rng
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        result: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            for (cls_name, operation, field), stats in sorted(self._stats.items()):
+                operations = result.setdefault(cls_name, {})
+                if field:
+                    operations.setdefault(operation, {})[field] = stats.to_dict()
+                else:
+                    operations[operation] = stats.to_dict()
+        return result
+
+    def to_prometheus(self, prefix: str = "hyperparams") -> str:
+        metric = f"{prefix}_operation_seconds"
+        lines = [
+            f"# HELP {metric} Time spent in Hyperparams operations.",
+            f"# TYPE {metric} summary",
+        ]
+        with self._lock:
+            for (cls_name, operation, field), stats in sorted(self._stats.items()):
+                labels = (
+                    f'class="{_escape(cls_name)}",'
+                    f'operation="{_escape(operation)}",'
+                    f'field="{_escape(field)}"'
+                )
+                for q, value in stats.quantiles().items():
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {value!r}')
+                lines.append(f"{metric}_sum{{{labels}}} {stats.total!r}")
+                lines.append(f"{metric}_count{{{labels}}} {stats.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump_prometheus(
+        self, path: str | os.PathLike, prefix: str = "hyperparams"
+    ) -> None:
+        text = self.to_prometheus(prefix)
+        # Write atomically, scrapers must never see a partial file
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def enable(recorder_: Recorder | None = None) -> Recorder:
+    global recorder
+    recorder = recorder_ if recorder_ is not None else Recorder()
+    return recorder
+
+
+def disable() -> Recorder | None:
+    global recorder
+    previous, recorder = recorder, None
+    return previous
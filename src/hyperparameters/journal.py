@@ -0,0 +1,326 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Iterable, Iterator, Literal, Sequence
+
+import numpy as np
+
+from hyperparameters.cache import _encode_default, encode_values, hash_encoded
+from hyperparameters.columnar import Columns, column
+from hyperparameters.hyperparams import Hyperparams
+from hyperparameters.search import SearchSpace
+
+Status = Literal["proposed", "running", "done", "failed"]
+
+SNAPSHOT_FORMAT = 1
+
+
+class JournalEntry:
+    __slots__ = ("key", "values", "status", "score", "info")
+
+    def __init__(
+        self,
+        key: str,
+        values: dict[str, Any],
+        status: Status = "proposed",
+        score: float | None = None,
+        info: Any = None,
+    ) -> None:
+        self.key = key
+        # JSON values of the fields, sub-configs are nested dicts
+        self.values = values
+        self.status = status
+        self.score = score
+        self.info = info
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(key={self.key[:12]!r}, "
+            f"status={self.status!r}, score={self.score!r})"
+        )
+
+
+def _get_path(values: dict[str, Any], path: str) -> Any:
+    for name in path.split("."):
+        values = values[name]
+    return values
+
+
+def _apply(entries: dict[str, JournalEntry], record: dict[str, Any]) -> None:
+    op = record["op"]
+    if op == "propose":
+        if record["key"] not in entries:
+            entries[record["key"]] = JournalEntry(record["key"], record["values"])
+        return
+    entry = entries[record["key"]]
+    if op == "start":
+        entry.status = "running"
+    elif op == "result":
+        entry.status = "done"
+        entry.score = record["score"]
+        entry.info = record.get("info")
+    elif op == "fail":
+        entry.status = "failed"
+        entry.info = record.get("info")
+    else:
+        raise ValueError(f"Unknown journal record {op}")
+
+
+def _replay(path: str) -> tuple[dict[str, JournalEntry], int, int | None]:
+    # Entries, the number of log records, and the end of the last complete
+    # record when a cut one follows it. Only reads the files. The log is read
+    # before the snapshot: when a writer compacts in between, its records are
+    # replayed over the new snapshot, which gives the same state.
+    data = b""
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            data = file.read()
+    entries: dict[str, JournalEntry] = {}
+    snapshot_path = path + ".snapshot"
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, encoding="utf-8") as file:
+            snapshot = json.load(file)
+        if snapshot.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(
+                f"Unsupported journal snapshot format {snapshot.get('format')}"
+            )
+        for key, values, status, score, info in snapshot["entries"]:
+            entries[key] = JournalEntry(key, values, status, score, info)
+    # A record without its newline was cut when the driver died, or is still
+    # being written by another process
+    end = data.rfind(b"\n") + 1
+    lines = data[:end].splitlines()
+    try:
+        # One parser call for the whole log is much faster than one per line
+        records = json.loads(b"[" + b",".join(lines) + b"]") if lines else []
+    except ValueError:
+        records = []
+        for number, line in enumerate(lines, 1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                raise ValueError(
+                    f"Journal {path} is corrupted at line {number}"
+                ) from None
+    for record in records:
+        _apply(entries, record)
+    return entries, len(records), end if end < len(data) else None
+
+
+def read_journal(path: str | os.PathLike) -> list[JournalEntry]:
+    # Entries of a journal without opening it for writing, e.g. of a past
+    # sweep or of one another process still runs
+    entries, _, _ = _replay(os.fspath(path))
+    return list(entries.values())
+
+
+class SweepJournal:
+    # Append-only log of the proposed configs and their results, keyed by the
+    # config encoding. Records are written as JSON lines, flushed one by one,
+    # and fsynced in batches of sync_every records or at most sync_interval
+    # seconds after they are written. The log is compacted into a snapshot
+    # every compact_every records. Only the records of the last unsynced batch
+    # can be lost when the machine dies.
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        cls: type[Hyperparams],
+        *,
+        sync_every: int = 64,
+        sync_interval: float = 1.0,
+        compact_every: int | None = 100_000,
+    ) -> None:
+        if sync_every <= 0:
+            raise ValueError("sync_every must be positive")
+        if compact_every is not None and compact_every <= 0:
+            raise ValueError("compact_every must be positive")
+        self.path = os.fspath(path)
+        self.snapshot_path = self.path + ".snapshot"
+        self.cls = cls
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_every = compact_every
+
+        self._entries: dict[str, JournalEntry] = {}
+        self._lock = threading.RLock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        # Syncs the records written since the last sync when no more follow
+        self._timer: threading.Timer | None = None
+        self._log_records = 0
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self) -> None:
+        self._entries, self._log_records, end = _replay(self.path)
+        if end is not None:
+            with open(self.path, "r+b") as file:
+                file.truncate(end)
+
+    def _write(self, line: str) -> None:
+        # Flushed, a record survives the driver process dying
+        self._file.write(line + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        self._log_records += 1
+        if (
+            self._unsynced >= self.sync_every
+            or time.monotonic() - self._synced_at >= self.sync_interval
+        ):
+            self.sync()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.sync_interval, self._sync_pending)
+            self._timer.daemon = True
+            self._timer.start()
+        if self.compact_every is not None and self._log_records >= self.compact_every:
+            self.compact()
+
+    def _sync_pending(self) -> None:
+        with self._lock:
+            # A sync since then cancelled this timer, it may have started already
+            if self._timer is not threading.current_thread():
+                return
+            self._timer = None
+            if self._unsynced and not self._file.closed:
+                self.sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._synced_at = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def propose(self, params: Hyperparams) -> str:
+        return self.propose_many([params])[0]
+
+    def propose_many(self, params_list: Iterable[Hyperparams]) -> list[str]:
+        # Configs proposed before keep their entries and are not logged again
+        keys = []
+        with self._lock:
+            for params in params_list:
+                encoded = encode_values(params.view())
+                key = hash_encoded(encoded)
+                keys.append(key)
+                if key in self._entries:
+                    continue
+                self._entries[key] = JournalEntry(key, json.loads(encoded))
+                self._write(f'{{"op":"propose","key":"{key}","values":{encoded}}}')
+        return keys
+
+    def _record(self, op: str, key: str, **fields: Any) -> None:
+        with self._lock:
+            record = {"op": op, "key": key, **fields}
+            _apply(self._entries, record)
+            self._write(
+                json.dumps(record, separators=(",", ":"), default=_encode_default)
+            )
+
+    def start(self, key: str) -> None:
+        self._record("start", key)
+
+    def finish(self, key: str, score: float, info: Any = None) -> None:
+        if info is None:
+            self._record("result", key, score=score)
+        else:
+            self._record("result", key, score=score, info=info)
+
+    def fail(self, key: str, info: Any = None) -> None:
+        if info is None:
+            self._record("fail", key)
+        else:
+            self._record("fail", key, info=info)
+
+    def compact(self) -> None:
+        # The snapshot replaces the old one atomically before the log is cleared,
+        # replaying the log again over the new snapshot gives the same state
+        with self._lock:
+            self.sync()
+            snapshot = {
+                "format": SNAPSHOT_FORMAT,
+                "entries": [
+                    [entry.key, entry.values, entry.status, entry.score, entry.info]
+                    for entry in self._entries.values()
+                ],
+            }
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(
+                    snapshot, file, separators=(",", ":"), default=_encode_default
+                )
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+            self._log_records = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[JournalEntry]:
+        return iter(list(self._entries.values()))
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __getitem__(self, key: str) -> JournalEntry:
+        return self._entries[key]
+
+    def entries(self, *statuses: Status) -> list[JournalEntry]:
+        return [
+            entry
+            for entry in self._entries.values()
+            if not statuses or entry.status in statuses
+        ]
+
+    def unfinished(self) -> list[JournalEntry]:
+        # Configs to submit again after a restart
+        return self.entries("proposed", "running")
+
+    def instance(self, key: str) -> Hyperparams:
+        return self.cls(**self._entries[key].values)
+
+    def columns(
+        self, space: SearchSpace, statuses: Sequence[Status] = ("done",)
+    ) -> tuple[Columns, np.ndarray]:
+        # Columns of the search space fields and the scores, read from the JSON
+        # values directly without creating and validating an instance per config
+        entries = self.entries(*statuses)
+        columns = {
+            name: column(
+                [_get_path(entry.values, name) for entry in entries],
+                len(entries),
+                space.infos[name],
+            )
+            for name in space.order
+        }
+        scores = np.array(
+            [np.nan if entry.score is None else entry.score for entry in entries],
+            dtype=np.float64,
+        )
+        return columns, scores
+
+    def restore(self, search: Any) -> int:
+        # Feeds the finished trials to a TPESearch or GPSearch in one batch
+        columns, scores = self.columns(search.space)
+        if len(scores):
+            search.observe(columns, scores)
+        return len(scores)
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self.sync()
+                self._file.close()
+
+    def __enter__(self) -> "SweepJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,389 @@
+import copy
+import json
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Callable, Iterator, TypeVar
+
+from pydantic.fields import SHAPE_SINGLETON
+
+from hyperparameters.hyperparams import (
+    HyperparamInfo,
+    Hyperparams,
+    _adjust_relative_path,
+    _ensure_finalized,
+    _get_relative_paths_root,
+)
+
+SelfLightweight = TypeVar("SelfLightweight", bound="LightweightHyperparams")
+
+_MISSING = object()
+
+_IMMUTABLE_TYPES = (int, float, str, bool, bytes, type(None), tuple, frozenset)
+
+# The same sets pydantic uses to parse bools
+_BOOL_FALSE = {0, "0", "off", "f", "false", "n", "no"}
+_BOOL_TRUE = {1, "1", "on", "t", "true", "y", "yes"}
+
+# Limits the length of strings parsed as ints, the same way pydantic does
+_MAX_STR_INT = 4_300
+
+
+def _error(field_name: str, message: str) -> ValueError:
+    return ValueError(f"Param {field_name}: {message}")
+
+
+def _coerce_int(value: Any, field_name: str) -> int:
+    if isinstance(value, (str, bytes, bytearray)) and len(value) > _MAX_STR_INT:
+        raise _error(field_name, "value is not a valid integer")
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise _error(field_name, "value is not a valid integer")
+
+
+def _coerce_float(value: Any, field_name: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise _error(field_name, "value is not a valid float")
+
+
+def _coerce_str(value: Any, field_name: str) -> str:
+    if isinstance(value, str):
+        return value.value if isinstance(value, Enum) else value
+    if isinstance(value, (float, int, Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    raise _error(field_name, "str type expected")
+
+
+def _coerce_bool(value: Any, field_name: str) -> bool:
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str):
+        value = value.lower()
+    try:
+        if value in _BOOL_TRUE:
+            return True
+        if value in _BOOL_FALSE:
+            return False
+    except TypeError:
+        pass
+    raise _error(field_name, "value could not be parsed to a boolean")
+
+
+def _coerce_path(value: Any, field_name: str, type_: type) -> PurePath:
+    if isinstance(value, str):
+        return type_(value)
+    raise _error(field_name, "value is not a valid path")
+
+
+def _check_instance(value: Any, field_name: str, type_: type) -> Any:
+    if not isinstance(value, type_):
+        raise _error(field_name, f"instance of {type_.__name__} expected")
+    return value
+
+
+def _check_choices(value: Any, field_name: str, choices: list[Any]) -> Any:
+    if value not in choices:
+        raise _error(field_name, f"{value} must be one of {choices}")
+    return value
+
+
+def _validator_source(name: str, info: HyperparamInfo) -> list[str]:
+    lines = [f"def validate_{name}(value):"]
+    if info.can_be_none():
+        lines.append("    if value is None: return None")
+    else:
+        lines.append(
+            f"    if value is None: raise _error({name!r}, 'none is not an allowed value')"
+        )
+    type_ = info.type_
+    if type_ is int:
+        lines.append(
+            "    if type(value) is not int: "
+            f"value = value if isinstance(value, int) and not isinstance(value, bool) "
+            f"else _coerce_int(value, {name!r})"
+        )
+    elif type_ is float:
+        lines.append(
+            "    if not isinstance(value, float): "
+            f"value = _coerce_float(value, {name!r})"
+        )
+    elif type_ is str:
+        lines.append(
+            "    if type(value) is not str: " f"value = _coerce_str(value, {name!r})"
+        )
+    elif type_ is bool:
+        lines.append(
+            "    if value is not True and value is not False: "
+            f"value = _coerce_bool(value, {name!r})"
+        )
+    elif isinstance(type_, type) and issubclass(type_, PurePath):
+        lines.append(
+            f"    if not isinstance(value, type_{name}): "
+            f"value = _coerce_path(value, {name!r}, type_{name})"
+        )
+    elif isinstance(type_, type) and type_ not in (object, Any):
+        lines.append(f"    _check_instance(value, {name!r}, type_{name})")
+    if info.choices is not None:
+        lines.append(
+            f"    if value not in choices_{name}: "
+            f"_check_choices(value, {name!r}, choices_{name})"
+        )
+    lines.append("    return value")
+    return lines
+
+
+def _init_source(
+    names: list[str],
+    infos: dict[str, HyperparamInfo],
+    path_fields: list[str],
+) -> list[str]:
+    lines = ["def __init__(self, **data):"]
+    if path_fields:
+        # Read at call time like the generated methods of the pydantic class
+        lines.append("    relative_paths_root = _get_relative_paths_root(source_cls)")
+        lines.append("    if relative_paths_root:")
+        for name in path_fields:
+            lines.append(f"        if {name!r} in data:")
+            lines.append(
+                f"            data[{name!r}] = _adjust_relative_path("
+                f"data[{name!r}], relative_paths_root, field_name={name!r}, owner=cls, "
+                "cache=path_cache)"
+            )
+    lines.append("    get = data.get")
+    for name in names:
+        lines.append(f"    value = get({name!r}, _MISSING)")
+        lines.append("    if value is _MISSING:")
+        if infos[name].required:
+            lines.append(f"        raise _error({name!r}, 'field required')")
+        elif isinstance(infos[name].default, _IMMUTABLE_TYPES):
+            lines.append(f"        value = default_{name}")
+        else:
+            lines.append(f"        value = _deepcopy(default_{name})")
+        lines.append("    else:")
+        lines.append(f"        value = validate_{name}(value)")
+        lines.append(f"    _object_setattr(self, {name!r}, value)")
+    if not names:
+        lines.append("    pass")
+    return lines
+
+
+def _setattr_source(path_fields: list[str]) -> list[str]:
+    lines = ["def __setattr__(self, name, value):"]
+    lines.append("    validator = validators.get(name)")
+    lines.append("    if validator is None:")
+    lines.append(
+        '        raise ValueError(f\'"{cls.__name__}" object has no field "{name}"\')'
+    )
+    if path_fields:
+        lines.append(f"    if name in {set(path_fields)!r}:")
+        lines.append(
+            "        relative_paths_root = _get_relative_paths_root(source_cls)"
+        )
+        lines.append("        if relative_paths_root:")
+        lines.append(
+            "            value = _adjust_relative_path(value, relative_paths_root, "
+            "field_name=name, owner=cls, cache=path_cache)"
+        )
+    lines.append("    _object_setattr(self, name, validator(value))")
+    return lines
+
+
+class LightweightHyperparams:
+    __slots__ = ()
+
+    # Set on the generated classes
+    __hyperparams_class__: type[Hyperparams]
+    __field_names__: tuple[str, ...]
+    __validators__: dict[str, Callable[[Any], Any]]
+
+    def __init__(self, **data: Any) -> None:
+        raise TypeError("Use make_lightweight() to create a lightweight class")
+
+    @classmethod
+    def parameters(cls) -> dict[str, HyperparamInfo]:
+        return cls.__hyperparams_class__.parameters()
+
+    @classmethod
+    def from_hyperparams(
+        cls: type[SelfLightweight], params: Hyperparams
+    ) -> SelfLightweight:
+        # The values were validated by params already
+        lightweight = cls.__new__(cls)
+        values = params.__dict__
+        for name in cls.__field_names__:
+            object.__setattr__(lightweight, name, values[name])
+        return lightweight
+
+    def to_hyperparams(self) -> Hyperparams:
+        return self.__hyperparams_class__.construct(**self.dict())
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        for name in self.__field_names__:
+            yield name, getattr(self, name)
+
+    def dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__field_names__}
+
+    def json(self, **kwargs) -> str:
+        if "indent" not in kwargs:
+            kwargs["indent"] = 4
+        elif kwargs["indent"] == 0:
+            del kwargs["indent"]
+        return json.dumps(self.dict(), **kwargs)
+
+    def copy(
+        self: SelfLightweight, *, update: "dict[str, Any] | None" = None
+    ) -> SelfLightweight:
+        copied = self.__class__.__new__(self.__class__)
+        for name in self.__field_names__:
+            object.__setattr__(copied, name, getattr(self, name))
+        for name, value in (update or {}).items():
+            object.__setattr__(copied, name, value)
+        return copied
+
+    def diff(self, other: "LightweightHyperparams") -> "dict[str, Any]":
+        my_dict = self.dict()
+        other_dict = other.dict()
+        all_keys = set(my_dict) | set(other_dict)
+        return {
+            k: (my_dict.get(k), other_dict.get(k))
+            for k in all_keys
+            if my_dict.get(k) != other_dict.get(k)
+        }
+
+    def update(
+        self: SelfLightweight,
+        data: "dict[str, Any]",
+        *,
+        inplace: bool = False,
+        validate: bool = False,
+    ) -> SelfLightweight:
+        if validate:
+            unknown_keys = data.keys() - set(self.__field_names__)
+            if unknown_keys:
+                raise ValueError(
+                    f"Update data contains unknown keys: {' '.join(unknown_keys)}"
+                )
+            target = self if inplace else self.copy()
+            for name in data:
+                setattr(target, name, data[name])
+            return target
+        # Slots cannot hold unknown keys, they are ignored
+        data = {k: v for k, v in data.items() if k in self.__validators__}
+        if inplace:
+            for name, value in data.items():
+                object.__setattr__(self, name, value)
+            return self
+        return self.copy(update=data)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (LightweightHyperparams, Hyperparams)):
+            return self.dict() == other.dict()
+        return self.dict() == other
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={value!r}" for name, value in self)
+        return f"{self.__class__.__name__}({values})"
+
+    def __getstate__(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__field_names__)
+
+    def __setstate__(self, state: tuple[Any, ...]) -> None:
+        for name, value in zip(self.__field_names__, state):
+            object.__setattr__(self, name, value)
+
+
+def make_lightweight(
+    cls: type[Hyperparams],
+    *,
+    name: str | None = None,
+    qualname: str | None = None,
+) -> type[LightweightHyperparams]:
+    generated = cls.__dict__.get("__lightweight_class__")
+    if generated is not None and name is None and qualname is None:
+        return generated
+
+    _ensure_finalized(cls)
+    infos = cls.parameters()
+    names = list(infos)
+    for field_name, field in cls.__fields__.items():
+        if (
+            field.shape != SHAPE_SINGLETON
+            or field_name in cls.__sections__
+            or field_name in cls.__array_fields__
+        ):
+            raise TypeError(
+                f"Field {field_name} of type {field.outer_type_} is not supported "
+                "by the lightweight backend"
+            )
+        if field.type_ is not Any and not isinstance(field.type_, type):
+            # Union, Literal, and other annotations the validators cannot check
+            raise TypeError(
+                f"Field {field_name} of type {field.outer_type_} cannot be "
+                "validated by the lightweight backend"
+            )
+
+    name = name or f"Lightweight{cls.__name__}"
+    generated = type(
+        name,
+        (LightweightHyperparams,),
+        {
+            "__slots__": tuple(names),
+            "__module__": cls.__module__,
+            "__qualname__": qualname or name,
+            "__hyperparams_class__": cls,
+            "__field_names__": tuple(names),
+        },
+    )
+
+    path_fields = [n for n in names if infos[n].adjust_relative_path]
+    namespace: dict[str, Any] = {
+        "_MISSING": _MISSING,
+        "_error": _error,
+        "_coerce_int": _coerce_int,
+        "_coerce_float": _coerce_float,
+        "_coerce_str": _coerce_str,
+        "_coerce_bool": _coerce_bool,
+        "_check_instance": _check_instance,
+        "_coerce_path": _coerce_path,
+        "_check_choices": _check_choices,
+        "_adjust_relative_path": _adjust_relative_path,
+        "_deepcopy": copy.deepcopy,
+        "_object_setattr": object.__setattr__,
+        "_get_relative_paths_root": _get_relative_paths_root,
+        "source_cls": cls,
+        "path_cache": {},
+        "cls": generated,
+    }
+    source: list[str] = []
+    for field_name, info in infos.items():
+        namespace[f"type_{field_name}"] = info.type_
+        namespace[f"choices_{field_name}"] = (
+            set(info.choices)
+            if info.choices is not None and all(c.__hash__ for c in info.choices)
+            else info.choices
+        )
+        namespace[f"default_{field_name}"] = info.default
+        source.extend(_validator_source(field_name, info))
+    source.extend(_init_source(names, infos, path_fields))
+    source.extend(_setattr_source(path_fields))
+    exec("\n".join(source), namespace)
+
+    validators = {n: namespace[f"validate_{n}"] for n in names}
+    namespace["validators"] = validators
+    generated.__validators__ = validators
+    generated.__init__ = namespace["__init__"]
+    generated.__setattr__ = namespace["__setattr__"]
+    if name == f"Lightweight{cls.__name__}" and qualname is None:
+        type.__setattr__(cls, "__lightweight_class__", generated)
+    return generated
+
+
+def lightweight(cls: type[Hyperparams]) -> type[LightweightHyperparams]:
+    # Class decorator, the generated class replaces the decorated one
+    return make_lightweight(cls, name=cls.__name__, qualname=cls.__qualname__)
@@ -0,0 +1,356 @@
+import math
+from typing import Any, Literal, Sequence
+
+import numpy as np
+
+from hyperparameters.analysis import history_columns
+from hyperparameters.columnar import Columns
+from hyperparameters.encoding import Categorical, ConfigEncoder
+from hyperparameters.hyperparams import Hyperparams
+from hyperparameters.search import Constraint, SearchSpace
+from hyperparameters.spaces import Choice, IntUniform, LogUniform
+
+Mode = Literal["min", "max"]
+
+
+def _grow(array: np.ndarray, count: int) -> np.ndarray:
+    # Doubles the capacity of the first axis when it is exceeded
+    if count <= len(array):
+        return array
+    grown = np.empty((max(count, 2 * len(array)), *array.shape[1:]), array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class _ModelBasedSearch:
+    # Keeps the encoded trial history and proposes batches of configs,
+    # subclasses fit their model incrementally in _update()
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        categorical: Categorical,
+        mode: Mode = "min",
+        startup: int = 10,
+        constraints: Sequence[Constraint] = (),
+        base: Hyperparams | None = None,
+        seed: int | np.random.Generator | None = None,
+    ) -> None:
+        if mode not in ("min", "max"):
+            raise ValueError(f"Unknown mode {mode!r}, use min or max")
+        self.mode = mode
+        self.startup = startup
+        self.space = SearchSpace(cls, constraints=constraints, base=base)
+        self.encoder = ConfigEncoder(
+            cls, fields=self.space.order, categorical=categorical
+        )
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self._matrix = np.empty((16, self.encoder.width))
+        self._actives = np.empty((16, len(self.space.order)), dtype=np.bool_)
+        self._losses = np.empty(16)
+
+    def observe(
+        self, configs: Columns | Sequence[Hyperparams], scores: Sequence[float]
+    ) -> None:
+        # Trials without a finite score are skipped, e.g. the failed ones
+        columns = history_columns(self.space, configs)
+        losses = np.asarray(scores, dtype=np.float64)
+        if len(losses) != len(next(iter(columns.values()), ())):
+            raise ValueError("Every config needs a score")
+        if self.mode == "max":
+            losses = -losses
+        finite = np.isfinite(losses)
+        if not finite.all():
+            columns = {name: values[finite] for name, values in columns.items()}
+            losses = losses[finite]
+        if not len(losses):
+            return
+        actives = self.space.actives(columns)
+        start, self.count = self.count, self.count + len(losses)
+        self._matrix = _grow(self._matrix, self.count)
+        self._actives = _grow(self._actives, self.count)
+        self._losses = _grow(self._losses, self.count)
+        self._matrix[start : self.count] = self.encoder.encode(columns)
+        self._actives[start : self.count] = np.stack(
+            [actives[name] for name in self.space.order], axis=1
+        )
+        self._losses[start : self.count] = losses
+        self._update(start)
+
+    def suggest(self, count: int = 1) -> Columns:
+        # Configs for count parallel workers, random until startup trials are observed
+        if self.count < max(self.startup, 1):
+            return self.space.sample(count, seed=self.rng)
+        return self._suggest(count)
+
+    def suggest_instances(
+        self, count: int = 1, base: Hyperparams | None = None
+    ) -> list[Hyperparams]:
+        return self.space.instances(self.suggest(count), base)
+
+    def best(self) -> tuple[dict[str, Any], float]:
+        if not self.count:
+            raise ValueError("No trials are observed")
+        index = int(np.argmin(self._losses[: self.count]))
+        columns = self.encoder.decode(self._matrix[index : index + 1])
+        loss = float(self._losses[index])
+        return self.space.to_dicts(columns)[0], -loss if self.mode == "max" else loss
+
+    def _update(self, start: int) -> None:
+        raise NotImplementedError
+
+    def _suggest(self, count: int) -> Columns:
+        raise NotImplementedError
+
+
+class TPESearch(_ModelBasedSearch):
+    # Tree-structured Parzen Estimator: the best gamma fraction of the trials
+    # forms the density l(x), the rest g(x), and candidates drawn from l(x)
+    # with the highest l(x) / g(x) are proposed. Each field is split into cells,
+    # continuous ones into bins, and the cell counts of both sets are updated
+    # incrementally, so a suggestion costs the same for any history size.
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        gamma: float = 0.25,
+        candidates: int = 24,
+        bins: int = 64,
+        prior_weight: float = 1.0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(cls, categorical="ordinal", **kwargs)
+        if not 0 < gamma < 1:
+            raise ValueError(f"Gamma must be between 0 and 1, got {gamma}")
+        self.gamma = gamma
+        self.candidates = candidates
+        self.bins = bins
+        self.prior_weight = prior_weight
+        # Cells per field, whether neighbouring cells are close values,
+        # and whether the cells are bins of a range rather than values
+        self._sizes: list[int] = []
+        self._ordered: list[bool] = []
+        self._binned: list[bool] = []
+        for name in self.space.order:
+            domain = self.space.domains[name]
+            if isinstance(domain, Choice):
+                self._sizes.append(domain.size())
+                self._ordered.append(False)
+                self._binned.append(False)
+            elif isinstance(domain, IntUniform) and domain.size() <= bins:
+                self._sizes.append(domain.size())
+                self._ordered.append(True)
+                self._binned.append(False)
+            else:
+                self._sizes.append(bins)
+                self._ordered.append(True)
+                self._binned.append(True)
+        self._cells = np.empty((16, len(self.space.order)), dtype=np.int64)
+        # Trial -> 1 for the good set, 0 for the bad one
+        self._good = np.empty(16, dtype=np.int8)
+        # Set -> field -> trials per cell
+        self._counts = [
+            [np.zeros(size) for size in self._sizes],
+            [np.zeros(size) for size in self._sizes],
+        ]
+
+    def _to_cells(self, matrix: np.ndarray, actives: np.ndarray) -> np.ndarray:
+        # Cell of each field, -1 when inactive or None
+        cells = np.empty((len(matrix), len(self.space.order)), dtype=np.int64)
+        for index, feature in enumerate(self.encoder.features):
+            size = self._sizes[index]
+            units = matrix[:, self.encoder.slices[feature.name].start]
+            if self._binned[index]:
+                field_cells = np.floor(units * size)
+            else:
+                field_cells = np.rint(units * (size - 1))
+            field_cells = field_cells.clip(0, size - 1).astype(np.int64)
+            active = actives[:, index]
+            if feature.nullable:
+                null = matrix[:, self.encoder.slices[feature.name].stop - 1]
+                active = active & (null < 0.5)
+            cells[:, index] = np.where(active, field_cells, -1)
+        return cells
+
+    def _move(self, rows: np.ndarray, sign: float) -> None:
+        # Adds the trials to the counts of their sets, or removes them
+        cells = self._cells[rows]
+        sets = self._good[rows]
+        for index in range(cells.shape[1]):
+            field_cells = cells[:, index]
+            for good in (0, 1):
+                selected = field_cells[(sets == good) & (field_cells >= 0)]
+                np.add.at(self._counts[good][index], selected, sign)
+
+    def _update(self, start: int) -> None:
+        count = self.count
+        self._cells = _grow(self._cells, count)
+        self._good = _grow(self._good, count)
+        self._cells[start:count] = self._to_cells(
+            self._matrix[start:count], self._actives[start:count]
+        )
+        losses = self._losses[:count]
+        good_count = max(1, math.ceil(self.gamma * count))
+        good = np.zeros(count, dtype=np.int8)
+        good[np.argpartition(losses, good_count - 1)[:good_count]] = 1
+        # Only the trials that changed sets move between the counts
+        changed = np.flatnonzero(good[:start] != self._good[:start])
+        self._move(changed, -1.0)
+        self._good[:count] = good
+        self._move(changed, 1.0)
+        self._move(np.arange(start, count), 1.0)
+
+    def _densities(self, good: int) -> list[np.ndarray]:
+        densities = []
+        for index, counts in enumerate(self._counts[good]):
+            size = len(counts)
+            total = counts.sum()
+            if self._ordered[index] and total and size > 1:
+                # Gaussian kernels with Scott's bandwidth, at least one cell wide
+                centers = np.arange(size)
+                mean = (counts * centers).sum() / total
+                std = math.sqrt(max((counts * (centers - mean) ** 2).sum() / total, 0))
+                bandwidth = max(1.06 * std * total**-0.2, 1.0)
+                kernels = np.exp(
+                    -0.5 * ((centers[:, None] - centers[None, :]) / bandwidth) ** 2
+                )
+                kernels /= kernels.sum(axis=1, keepdims=True)
+                counts = counts @ kernels
+            densities.append(
+                (counts + self.prior_weight / size) / (total + self.prior_weight)
+            )
+        return densities
+
+    def _suggest(self, count: int) -> Columns:
+        good_densities = self._densities(1)
+        bad_densities = self._densities(0)
+        indices = {name: index for index, name in enumerate(self.space.order)}
+
+        def sampler(name: str, rng: np.random.Generator, size: int) -> np.ndarray:
+            index = indices[name]
+            density = good_densities[index]
+            cells = rng.choice(len(density), size=size, p=density / density.sum())
+            if not self._binned[index]:
+                return cells
+            domain = self.space.domains[name]
+            units = (cells + rng.random(size)) / len(density)
+            if isinstance(domain, IntUniform):
+                return np.minimum(units * domain.size(), domain.size() - 1).astype(
+                    np.int64
+                )
+            if isinstance(domain, LogUniform):
+                low, high = math.log(domain.low), math.log(domain.high)
+                return np.exp(low + units * (high - low))
+            return domain.low + units * (domain.high - domain.low)  # type: ignore
+
+        size = count * self.candidates
+        columns = self.space.sample(size, seed=self.rng, sampler=sampler)
+        actives = self.space.actives(columns)
+        cells = self._to_cells(
+            self.encoder.encode(columns),
+            np.stack([actives[name] for name in self.space.order], axis=1),
+        )
+        ratios = np.zeros(size)
+        for index in range(cells.shape[1]):
+            field_cells = cells[:, index]
+            active = field_cells >= 0
+            ratios[active] += np.log(
+                good_densities[index][field_cells[active]]
+                / bad_densities[index][field_cells[active]]
+            )
+        # The best candidate of each group, one group per worker
+        picks = (
+            ratios.reshape(count, self.candidates).argmax(axis=1)
+            + np.arange(count) * self.candidates
+        )
+        return {name: values[picks] for name, values in columns.items()}
+
+
+class GPSearch(_ModelBasedSearch):
+    # Gaussian process with an RBF kernel on the one-hot encoding, proposing
+    # the candidates with the lowest confidence bound. The inverse of the
+    # Cholesky factor of the kernel matrix is extended block-wise as trials
+    # arrive instead of refactored.
+    # A batch is picked greedily, conditioning the variance on the picks.
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        candidates: int = 512,
+        length_scale: float | None = None,
+        noise: float = 1e-4,
+        kappa: float = 2.0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(cls, categorical="onehot", **kwargs)
+        self.candidates = candidates
+        self.length_scale = (
+            length_scale
+            if length_scale is not None
+            else 0.3 * math.sqrt(max(self.encoder.width, 1))
+        )
+        self.noise = noise
+        self.kappa = kappa
+        self._factor = np.empty((0, 0))
+
+    def _kernel(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        distances = (
+            (left**2).sum(axis=1)[:, None]
+            + (right**2).sum(axis=1)[None, :]
+            - 2 * left @ right.T
+        )
+        return np.exp(-0.5 * np.maximum(distances, 0) / self.length_scale**2)
+
+    def _update(self, start: int) -> None:
+        old = self._matrix[:start]
+        new = self._matrix[start : self.count]
+        corner = self._kernel(new, new) + self.noise * np.eye(len(new))
+        if not start:
+            self._factor = np.linalg.inv(np.linalg.cholesky(corner))
+            return
+        # The Cholesky factor of [[K, B], [B.T, C]] is [[L, 0], [P.T, M]]
+        # with P = L^-1 B and M M.T = C - P.T P
+        projected = self._factor @ self._kernel(old, new)
+        corner_factor = np.linalg.inv(
+            np.linalg.cholesky(corner - projected.T @ projected)
+        )
+        self._factor = np.block(
+            [
+                [self._factor, np.zeros((start, len(new)))],
+                [-corner_factor @ projected.T @ self._factor, corner_factor],
+            ]
+        )
+
+    def _suggest(self, count: int) -> Columns:
+        losses = self._losses[: self.count]
+        scale = losses.std() or 1.0
+        targets = (losses - losses.mean()) / scale
+        columns = self.space.sample(max(self.candidates, 4 * count), seed=self.rng)
+        candidates = self.encoder.encode(columns)
+        projected = (
+            self._kernel(candidates, self._matrix[: self.count]) @ self._factor.T
+        )
+        means = projected @ (self._factor @ targets)
+        variances = np.maximum(1.0 - (projected**2).sum(axis=1), 1e-12)
+        picks: list[int] = []
+        factors: list[np.ndarray] = []
+        for _ in range(min(count, len(candidates))):
+            bounds = means - self.kappa * np.sqrt(variances)
+            bounds[picks] = np.inf
+            pick = int(np.argmin(bounds))
+            picks.append(pick)
+            # Posterior covariance with the pick, given the previous picks
+            covariance = (
+                self._kernel(candidates, candidates[pick : pick + 1])[:, 0]
+                - projected @ projected[pick]
+            )
+            for factor in factors:
+                covariance -= factor * factor[pick]
+            if covariance[pick] <= 1e-9:
+                # Already determined by the previous picks
+                continue
+            factor = covariance / math.sqrt(covariance[pick])
+            factors.append(factor)
+            variances = np.maximum(variances - factor**2, 1e-12)
+        return {name: values[picks] for name, values in columns.items()}
@@ -0,0 +1,160 @@
+from typing import Literal, NamedTuple, Sequence
+
+import numpy as np
+
+from hyperparameters.analysis import history_columns
+from hyperparameters.columnar import Columns
+from hyperparameters.hyperparams import Hyperparams
+from hyperparameters.search import Constraint, SearchSpace, _take
+from hyperparameters.spaces import Choice, IntUniform
+
+
+class PBTStep(NamedTuple):
+    # Configs of the whole population after the step
+    columns: Columns
+    # Member whose checkpoint each member continues from, itself when kept
+    sources: np.ndarray
+    # Members that copied a better member and explored its config
+    rows: np.ndarray
+    # New configs of those members, the other members keep theirs
+    instances: list[Hyperparams]
+
+
+class PopulationBasedTraining:
+    # Exploit and explore over a whole population at once: the worst quantile
+    # copies the configs of random members of the best quantile, then numeric
+    # fields are multiplied by one of the factors and clipped to their search
+    # space, and every field is resampled with resample_probability
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        quantile: float = 0.25,
+        factors: Sequence[float] = (0.8, 1.2),
+        resample_probability: float = 0.25,
+        mode: Literal["min", "max"] = "min",
+        constraints: Sequence[Constraint] = (),
+        base: Hyperparams | None = None,
+        max_rounds: int = 10,
+        seed: int | np.random.Generator | None = None,
+    ) -> None:
+        if not 0 < quantile <= 0.5:
+            raise ValueError(f"Quantile must be in (0, 0.5], got {quantile}")
+        if not factors:
+            raise ValueError("At least one perturbation factor is required")
+        if mode not in ("min", "max"):
+            raise ValueError(f"Unknown mode {mode!r}, use min or max")
+        self.space = SearchSpace(cls, constraints=constraints, base=base)
+        if not self.space.domains:
+            raise ValueError(f"{cls.__name__} has no params with a search space")
+        self.quantile = quantile
+        self.factors = np.asarray(factors, dtype=np.float64)
+        self.resample_probability = resample_probability
+        self.mode = mode
+        self.max_rounds = max_rounds
+        self.rng = np.random.default_rng(seed)
+
+    def _explore(self, columns: Columns, actives: dict[str, np.ndarray]) -> Columns:
+        count = len(next(iter(columns.values())))
+        explored: Columns = {}
+        explored_actives: dict[str, np.ndarray] = {}
+        for name in self.space.order:
+            domain = self.space.domains[name]
+            samples = self.space._decode(name, domain.sample(self.rng, count))
+            values = columns[name]
+            # Fields activated by the new values of their parents start afresh
+            resample = self.rng.random(count) < self.resample_probability
+            resample |= ~actives[name]
+            if not isinstance(domain, Choice):
+                factors = self.factors[self.rng.integers(len(self.factors), size=count)]
+                # Inactive values may be None, they are resampled anyway
+                numbers = np.where(actives[name], values, domain.low)  # type: ignore
+                perturbed = (numbers.astype(np.float64) * factors).clip(
+                    domain.low, domain.high  # type: ignore
+                )
+                if isinstance(domain, IntUniform):
+                    perturbed = np.rint(perturbed).astype(np.int64)
+                values = np.where(resample, samples, perturbed)
+            else:
+                values = self._merge(
+                    values, np.flatnonzero(resample), samples[resample]
+                )
+            active = self.space._active(name, explored, explored_actives, count)
+            explored[name] = self.space._apply_inactive(name, values, active)
+            explored_actives[name] = active
+        return explored
+
+    def step(
+        self, population: Columns | Sequence[Hyperparams], scores: Sequence[float]
+    ) -> PBTStep:
+        columns = history_columns(self.space, population)
+        losses = np.asarray(scores, dtype=np.float64)
+        count = len(losses)
+        if count != len(next(iter(columns.values()), ())):
+            raise ValueError("Every member needs a score")
+        if self.mode == "max":
+            losses = -losses
+        # Members without a finite score are the worst
+        losses = np.where(np.isfinite(losses), losses, np.inf)
+        size = min(int(count * self.quantile), count // 2)
+        order = np.argsort(losses, kind="stable")
+        rows = np.sort(order[count - size :]) if size else np.zeros(0, np.int64)
+        sources = np.arange(count)
+        sources[rows] = order[self.rng.integers(size, size=size)] if size else rows
+
+        copied = _take(columns, sources[rows])
+        actives = self.space.actives(copied)
+        explored = self._explore(copied, actives)
+        # Infeasible explored configs are explored again, then kept as copied
+        pending = np.flatnonzero(~self.space.feasible(explored))
+        for _ in range(self.max_rounds):
+            if not len(pending):
+                break
+            retry = self._explore(_take(copied, pending), _take(actives, pending))
+            feasible = self.space.feasible(retry)
+            for name, values in retry.items():
+                explored[name] = self._merge(
+                    explored[name], pending[feasible], values[feasible]
+                )
+            pending = pending[~feasible]
+        for name in explored:
+            explored[name] = self._merge(explored[name], pending, copied[name][pending])
+
+        new_columns = {}
+        for name, values in columns.items():
+            new_columns[name] = self._merge(values, rows, explored[name])
+        return PBTStep(
+            columns=new_columns,
+            sources=sources,
+            rows=rows,
+            instances=self._instances(population, sources[rows], explored),
+        )
+
+    @staticmethod
+    def _merge(values: np.ndarray, index: np.ndarray, update: np.ndarray) -> np.ndarray:
+        if not len(index):
+            return values
+        values = values.copy()
+        try:
+            values[index] = update
+        except (TypeError, ValueError):
+            values = values.astype(object)
+            values[index] = update
+        return values
+
+    def _instances(
+        self,
+        population: Columns | Sequence[Hyperparams],
+        sources: np.ndarray,
+        explored: Columns,
+    ) -> list[Hyperparams]:
+        # The values come from the search space, so the copies skip validation
+        if isinstance(population, dict):
+            base = self.space.base if self.space.base is not None else self.space.cls()
+            bases = [base] * len(sources)
+        else:
+            bases = [population[source] for source in sources.tolist()]
+        return [
+            params.update(data)
+            for params, data in zip(bases, self.space.to_dicts(explored))
+        ]
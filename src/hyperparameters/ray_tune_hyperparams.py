@@ -1,28 +1,53 @@
+from time import perf_counter
 from typing import Any
 
 from ray import tune
 
+from hyperparameters import instrumentation
 from hyperparameters.hyperparams import HyperparamsProtocol
+from hyperparameters.spaces import Choice, Domain, IntUniform, LogUniform, Uniform
+
+
+def _ray_tune_domain(domain: Domain) -> Any:
+    if isinstance(domain, Choice):
+        return tune.choice(domain.choices)
+    if isinstance(domain, IntUniform):
+        # The upper bound of randint is excluded
+        return tune.randint(domain.low, domain.high + 1)
+    if isinstance(domain, LogUniform):
+        return tune.loguniform(domain.low, domain.high)
+    if isinstance(domain, Uniform):
+        return tune.uniform(domain.low, domain.high)
+    raise ValueError(f"Search space {domain!r} is not supported by ray.tune")
 
 
 class RayTuneHyperparamsMixin(HyperparamsProtocol):
     def ray_tune_param_space(self, use_current_values: bool = True) -> dict[str, Any]:
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            start = perf_counter()
         param_space = {}
         for name, info in self._tunable_params():
-            if info.search_space is not None:
+            if isinstance(info.search_space, Domain):
+                param_space[name] = _ray_tune_domain(info.search_space)
+            elif info.search_space is not None:
                 param_space[name] = info.search_space
             elif info.choices is not None:
                 param_space[name] = tune.choice(info.choices)
             else:
                 if use_current_values:
-                    param_space[name] = getattr(self, name)
+                    param_space[name] = self.get_path(name)
                 else:
                     param_space[name] = info.default
+        if recorder is not None:
+            recorder.record(
+                self.__class__, "ray_tune_param_space", perf_counter() - start
+            )
         return param_space
 
     def ray_tune_best_values(self, use_current_values: bool = True) -> dict[str, Any]:
         if use_current_values:
-            return {name: getattr(self, name) for name, _ in self._tunable_params()}
+            return {name: self.get_path(name) for name, _ in self._tunable_params()}
         else:
             return {
                 name: info.default
@@ -0,0 +1,290 @@
+import ctypes
+import json
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+from hyperparameters.encoding import _leaf_infos
+from hyperparameters.hyperparams import Hyperparams
+from hyperparameters.schema import _flatten, _nest
+from hyperparameters.versioned import VersionedHyperparams
+
+# Takes the {name: (old value, new value)} of the applied changes
+Subscriber = Callable[[dict[str, tuple[Any, Any]]], None]
+# Takes the error of a failed reload, the old values stay
+ErrorHandler = Callable[[Exception], None]
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+# wd, mask, cookie, len of the name that follows
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    # Watches directories, so that files replaced by a rename are seen too
+    def __init__(self, directories: Iterable[Path]) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            init = libc.inotify_init1
+            self._add_watch = libc.inotify_add_watch
+        except AttributeError:
+            raise OSError("libc has no inotify") from None
+        self.fd = init(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: dict[int, Path] = {}
+        try:
+            for directory in directories:
+                wd = self._add_watch(
+                    self.fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO
+                )
+                if wd < 0:
+                    raise OSError(
+                        ctypes.get_errno(), f"Cannot watch {directory}", directory
+                    )
+                self._directories[wd] = directory
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def read(self, timeout: float) -> set[Path]:
+        # Paths written or moved into the watched directories
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if wd in self._directories and name:
+                paths.add(self._directories[wd] / os.fsdecode(name))
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _signature(path: Path) -> tuple[int, int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ConfigWatcher:
+    # Keeps a live instance in sync with config files, later files override
+    # earlier ones. Only a changed file is parsed again, and only the fields
+    # whose merged values changed are validated, on a copy, then written into
+    # the live instance at once. Invalid files leave the instance unchanged.
+    def __init__(
+        self,
+        params: Hyperparams | VersionedHyperparams,
+        paths: str | os.PathLike | Sequence[str | os.PathLike],
+        *,
+        interval: float = 1.0,
+        use_inotify: bool = True,
+        parse: Callable[[str], dict[str, Any]] = json.loads,
+        on_error: ErrorHandler | None = None,
+    ) -> None:
+        # Versioned configs get a new version per reload instead
+        current = params.get() if isinstance(params, VersionedHyperparams) else params
+        if current is params and params.is_frozen():
+            raise ValueError("Cannot watch a frozen instance, it never changes")
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        self.params = params
+        self.paths = [Path(path).absolute() for path in paths]
+        self.interval = interval
+        self.parse = parse
+        self.on_error = on_error
+        # Last error of the background thread when there is no on_error
+        self.error: Exception | None = None
+
+        self._leaves = dict(_leaf_infos(type(current)))
+        # Values the files do not set fall back to the values at the start
+        self._initial = {name: current.get_path(name) for name in self._leaves}
+        self._values: dict[Path, dict[str, Any]] = {path: {} for path in self.paths}
+        self._signatures: dict[Path, tuple[int, int, int] | None] = {}
+        self._merged = dict(self._initial)
+        self._subscribers: list[Subscriber] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._inotify: _Inotify | None = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify({path.parent for path in self.paths})
+            except OSError:
+                # Polling works everywhere, e.g. on macOS or network mounts
+                self._inotify = None
+        self.check()
+
+    @classmethod
+    def load(
+        cls,
+        hyperparams_cls: type[Hyperparams],
+        paths: str | os.PathLike | Sequence[str | os.PathLike],
+        **kwargs: Any,
+    ) -> "ConfigWatcher":
+        # Creates the instance from the files, e.g. when they set required fields
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        leaves = dict(_leaf_infos(hyperparams_cls))
+        parse = kwargs.get("parse", json.loads)
+        values: dict[str, Any] = {}
+        for path in paths:
+            values.update(_flatten(parse(Path(path).read_text()), leaves))
+        return cls(hyperparams_cls(**_nest(values)), paths, **kwargs)
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def subscribe(self, subscriber: Subscriber) -> Subscriber:
+        # Can be used as a decorator
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.remove(subscriber)
+
+    def check(
+        self, paths: Iterable[str | os.PathLike] | None = None
+    ) -> dict[str, tuple[Any, Any]]:
+        # Reloads the changed files and returns the applied changes. Raises
+        # when a changed file cannot be parsed or has invalid values.
+        with self._lock:
+            changed_files = []
+            if paths is not None:
+                paths = [Path(path).absolute() for path in paths]
+            for path in self.paths if paths is None else paths:
+                signature = _signature(path)
+                if signature == self._signatures.get(path, ()):
+                    continue
+                # A deleted file keeps its last values until it is written again
+                if signature is not None:
+                    changed_files.append(path)
+                self._signatures[path] = signature
+            if not changed_files:
+                return {}
+            values = dict(self._values)
+            for path in changed_files:
+                try:
+                    data = self.parse(path.read_text())
+                except Exception as error:
+                    # Parsed again once the file changes
+                    raise ValueError(f"Cannot parse {path}: {error}") from error
+                values[path] = _flatten(data, self._leaves)
+            return self._apply(values)
+
+    def _apply(self, values: dict[Path, dict[str, Any]]) -> dict[str, tuple[Any, Any]]:
+        merged = dict(self._initial)
+        for path in self.paths:
+            merged.update(values[path])
+        unknown = merged.keys() - self._leaves.keys()
+        if unknown:
+            raise ValueError(f"Config files contain unknown keys: {' '.join(unknown)}")
+        changed = {
+            name: value
+            for name, value in merged.items()
+            if name not in self._merged or self._merged[name] != value
+        }
+        if not changed:
+            self._values = values
+            self._merged = merged
+            return {}
+        if isinstance(self.params, VersionedHyperparams):
+            old = self.params.get()
+            old_values = {name: old.get_path(name) for name in changed}
+            self.params.update(changed, validate=True)
+            current = self.params.get()
+        else:
+            current = self.params
+            if current.is_frozen():
+                # Frozen after the watcher started, its values must not change
+                raise ValueError(
+                    f"Cannot reload into the frozen {type(current).__name__} "
+                    "instance, watch a VersionedHyperparams to publish new versions"
+                )
+            old_values = {name: current.get_path(name) for name in changed}
+            # Raises on unknown or invalid fields before the live instance changes
+            updated = current.update(changed, validate=True)
+            names = {name.split(".", 1)[0] for name in changed}
+            update = {name: updated.__dict__[name] for name in names}
+            # A single dict update, readers see all the changes or none of them
+            current.__dict__.update(update)
+            current.__fields_set__.update(names)
+            current._invalidate_cache_keys(names)
+        self._values = values
+        self._merged = merged
+        diff = {}
+        for name, old_value in old_values.items():
+            new_value = current.get_path(name)
+            if new_value != old_value:
+                diff[name] = (old_value, new_value)
+        if diff:
+            for subscriber in list(self._subscribers):
+                subscriber(diff)
+        return diff
+
+    def start(self) -> "ConfigWatcher":
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="ConfigWatcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            if self._inotify is not None:
+                written = self._inotify.read(self.interval)
+                paths = [path for path in self.paths if path in written]
+                if not paths:
+                    continue
+            else:
+                if self._stopped.wait(self.interval):
+                    break
+                paths = None
+            try:
+                self.check(paths)
+            except Exception as error:
+                if self.on_error is not None:
+                    self.on_error(error)
+                else:
+                    self.error = error
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "ConfigWatcher":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,209 @@
+import heapq
+import math
+from typing import Any, Iterator, Literal
+
+from hyperparameters.encoding import _leaf_infos
+from hyperparameters.hyperparams import Hyperparams
+
+Decision = Literal["promote", "pause", "stop", "complete"]
+Status = Literal["running", "paused", "stopped", "completed"]
+
+
+class Trial:
+    __slots__ = ("id", "params", "rung", "status", "scores")
+
+    def __init__(self, trial_id: int, params: Hyperparams) -> None:
+        self.id = trial_id
+        self.params = params
+        self.rung = 0
+        self.status: Status = "running"
+        # Score reported at each finished rung
+        self.scores: list[float] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(id={self.id}, rung={self.rung}, "
+            f"status={self.status!r}, scores={self.scores!r})"
+        )
+
+
+class _Rung:
+    # Losses reported at a rung, split into the best count / reduction_factor
+    # ones and the rest with two heaps. A loss is added in O(log n).
+    __slots__ = (
+        "reduction_factor",
+        "round_up",
+        "top",
+        "rest",
+        "in_top",
+        "paused",
+        "promotable",
+        "count",
+    )
+
+    def __init__(self, reduction_factor: int, round_up: bool) -> None:
+        self.reduction_factor = reduction_factor
+        self.round_up = round_up
+        # Max-heap of (-loss, sequence, trial id) and min-heap of (loss, ...)
+        self.top: list[tuple[float, int, int]] = []
+        self.rest: list[tuple[float, int, int]] = []
+        self.in_top: set[int] = set()
+        self.paused: set[int] = set()
+        # Min-heap of the paused trials that entered the top, checked when popped
+        self.promotable: list[tuple[float, int, int]] = []
+        self.count = 0
+
+    def add(self, loss: float, trial_id: int) -> None:
+        self.count += 1
+        sequence = self.count
+        # The worst of the top moves to the rest, then the top grows to its size
+        heapq.heappush(self.top, (-loss, sequence, trial_id))
+        self.in_top.add(trial_id)
+        worst, worst_sequence, worst_id = heapq.heappop(self.top)
+        self.in_top.discard(worst_id)
+        heapq.heappush(self.rest, (-worst, worst_sequence, worst_id))
+        if self.round_up:
+            size = -(-self.count // self.reduction_factor)
+        else:
+            size = self.count // self.reduction_factor
+        while len(self.top) < size:
+            best, best_sequence, best_id = heapq.heappop(self.rest)
+            heapq.heappush(self.top, (-best, best_sequence, best_id))
+            self.in_top.add(best_id)
+            if best_id in self.paused:
+                heapq.heappush(self.promotable, (best, best_sequence, best_id))
+
+    def pop_promotable(self) -> int | None:
+        while self.promotable:
+            _, _, trial_id = heapq.heappop(self.promotable)
+            # Trials pushed out of the top or promoted since are skipped
+            if trial_id in self.in_top and trial_id in self.paused:
+                self.paused.discard(trial_id)
+                return trial_id
+        return None
+
+
+class ASHAScheduler:
+    # Asynchronous successive halving. Trials start with the smallest budget,
+    # and a trial finishing a rung among the best 1 / reduction_factor of the
+    # trials reported there so far is promoted to the next rung right away.
+    # The others are paused, and promoted later by promotion() once enough
+    # worse trials report, or stopped when losers="stop".
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        budget_field: str,
+        min_budget: float,
+        max_budget: float,
+        reduction_factor: int = 3,
+        mode: Literal["min", "max"] = "min",
+        losers: Literal["pause", "stop"] = "pause",
+    ) -> None:
+        infos = dict(_leaf_infos(cls))
+        if budget_field not in infos:
+            raise ValueError(f"Unknown budget field {budget_field}")
+        if infos[budget_field].type_ not in (int, float):
+            raise ValueError(f"Budget field {budget_field} must be an int or a float")
+        if not 0 < min_budget <= max_budget:
+            raise ValueError(f"Invalid budgets [{min_budget}, {max_budget}]")
+        if reduction_factor < 2:
+            raise ValueError("Reduction factor must be at least 2")
+        if mode not in ("min", "max"):
+            raise ValueError(f"Unknown mode {mode!r}, use min or max")
+        if losers not in ("pause", "stop"):
+            raise ValueError(f"Unknown losers policy {losers!r}, use pause or stop")
+        self.cls = cls
+        self.budget_field = budget_field
+        self.mode = mode
+        self.losers = losers
+        self.reduction_factor = reduction_factor
+        rungs_num = int(math.log(max_budget / min_budget, reduction_factor) + 1e-9) + 1
+        integer = infos[budget_field].type_ is int
+        self.budgets: list[Any] = []
+        for rung in range(rungs_num):
+            budget = min(min_budget * reduction_factor**rung, max_budget)
+            self.budgets.append(round(budget) if integer else budget)
+        # The last rung always trains with the full budget
+        self.budgets[-1] = round(max_budget) if integer else max_budget
+        # Stopped trials cannot wait for their peers, so the first trials of a rung
+        # continue, as in the stopping variant of ASHA
+        self._rungs = [
+            _Rung(reduction_factor, round_up=losers == "stop")
+            for _ in self.budgets[:-1]
+        ]
+        self._trials: dict[int, Trial] = {}
+
+    def __len__(self) -> int:
+        return len(self._trials)
+
+    def __iter__(self) -> Iterator[Trial]:
+        return iter(self._trials.values())
+
+    def __getitem__(self, trial_id: int) -> Trial:
+        return self._trials[trial_id]
+
+    def rung_size(self, rung: int) -> int:
+        # Number of trials that reported at the rung
+        return self._rungs[rung].count
+
+    def _with_budget(self, params: Hyperparams, rung: int) -> Hyperparams:
+        return params.update({self.budget_field: self.budgets[rung]}, validate=True)
+
+    def add(self, params: Hyperparams) -> Trial:
+        # Starts a trial at the first rung, its params get the smallest budget
+        trial = Trial(len(self._trials), self._with_budget(params, 0))
+        self._trials[trial.id] = trial
+        return trial
+
+    def report(self, trial_id: int, score: float) -> Decision:
+        # Called when a running trial has trained with the budget of its rung
+        trial = self._trials[trial_id]
+        if trial.status != "running":
+            raise ValueError(f"Trial {trial_id} is {trial.status}, not running")
+        trial.scores.append(score)
+        if trial.rung == len(self._rungs):
+            trial.status = "completed"
+            return "complete"
+        loss = -score if self.mode == "max" else score
+        if math.isnan(loss):
+            # Failed trials never get promoted
+            trial.status = "stopped"
+            return "stop"
+        rung = self._rungs[trial.rung]
+        if self.losers == "pause":
+            rung.paused.add(trial_id)
+        rung.add(loss, trial_id)
+        if trial_id in rung.in_top:
+            rung.paused.discard(trial_id)
+            self._promote(trial)
+            return "promote"
+        if self.losers == "stop":
+            trial.status = "stopped"
+            return "stop"
+        trial.status = "paused"
+        return "pause"
+
+    def _promote(self, trial: Trial) -> None:
+        trial.rung += 1
+        trial.status = "running"
+        trial.params = self._with_budget(trial.params, trial.rung)
+
+    def promotion(self) -> Trial | None:
+        # A paused trial that now ranks among the best of its rung, taking the
+        # highest rung first. Call it when a worker is free, before add().
+        for rung in reversed(self._rungs):
+            trial_id = rung.pop_promotable()
+            if trial_id is not None:
+                trial = self._trials[trial_id]
+                self._promote(trial)
+                return trial
+        return None
+
+    def stop(self, trial_id: int) -> None:
+        # Stops a trial for good, e.g. when its worker fails
+        trial = self._trials[trial_id]
+        if trial.status == "paused":
+            self._rungs[trial.rung].paused.discard(trial_id)
+        if trial.status in ("running", "paused"):
+            trial.status = "stopped"
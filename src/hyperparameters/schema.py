@@ -0,0 +1,372 @@
+import hashlib
+import json
+from itertools import repeat
+from typing import Any, Callable, Iterable, Mapping, Sequence
+from weakref import WeakKeyDictionary
+
+import numpy as np
+
+from hyperparameters.cache import _encode_default, encode_values
+from hyperparameters.columnar import Columns, _hashable, _object_array, column
+from hyperparameters.encoding import _leaf_infos
+from hyperparameters.hyperparams import Hyperparams, _get_config_value
+from hyperparameters.search import _codes, _full, _rows_count
+from hyperparameters.spaces import Choice
+
+# Takes the columns of the stored configs, returns the migrated columns
+Transform = Callable[[Columns], Columns]
+
+# class -> fingerprint of its fields
+_fingerprints: WeakKeyDictionary = WeakKeyDictionary()
+# class -> migrator of its stored configs
+_migrators: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def _describe(cls: type[Hyperparams]) -> list[Any]:
+    # What a stored config depends on: names, types, defaults, and choices.
+    # Descriptions and search spaces do not change the stored values.
+    # Finalizes a deferred class before its sections are read
+    infos = cls.parameters()
+    sections = cls.__sections__  # type: ignore
+    fields = []
+    for name, info in infos.items():
+        if name in sections:
+            fields.append([name, _describe(sections[name])])
+            continue
+        fields.append(
+            [
+                name,
+                repr(info.annotation),
+                info.required,
+                # Relative path defaults are joined with the root of the machine
+                None if info.adjust_relative_path else info.default,
+                info.choices,
+            ]
+        )
+    return fields
+
+
+def schema_fingerprint(cls: type[Hyperparams]) -> str:
+    fingerprint = _fingerprints.get(cls)
+    if fingerprint is None:
+        encoded = json.dumps(
+            _describe(cls), separators=(",", ":"), default=_encode_default
+        )
+        fingerprint = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        _fingerprints[cls] = fingerprint
+    return fingerprint
+
+
+def schema_version(cls: type[Hyperparams]) -> int:
+    return _get_config_value(cls, "schema_version", 0)
+
+
+def to_record(params: Hyperparams) -> dict[str, Any]:
+    # JSON-compatible config stamped with the schema it was written with
+    cls = type(params)
+    return {
+        "version": schema_version(cls),
+        "fingerprint": schema_fingerprint(cls),
+        "values": json.loads(encode_values(params.view())),
+    }
+
+
+class Migration:
+    # Upgrades the configs stored with version - 1 to version. The steps run in
+    # the order rename, replace, remove, add, transform. Fields of sub-configs
+    # are dotted, and renaming or removing a sub-config covers all its fields.
+    __slots__ = ("version", "rename", "replace", "remove", "add", "transform")
+
+    def __init__(
+        self,
+        version: int,
+        *,
+        rename: Mapping[str, str] | None = None,
+        replace: Mapping[str, Mapping[Any, Any]] | None = None,
+        remove: Iterable[str] = (),
+        add: Mapping[str, Any] | None = None,
+        transform: Transform | None = None,
+    ) -> None:
+        if version < 1:
+            raise ValueError(f"Migration version must be positive, got {version}")
+        self.version = version
+        # old name -> new name
+        self.rename = dict(rename or {})
+        # field name -> old value -> new value
+        self.replace = {name: dict(values) for name, values in (replace or {}).items()}
+        self.remove = list(remove)
+        # field name -> value of the configs stored without it
+        self.add = dict(add or {})
+        self.transform = transform
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(version={self.version})"
+
+
+def _covers(name: str, key: str) -> bool:
+    return key == name or key.startswith(name + ".")
+
+
+class _Source:
+    # A stored column with the composed value replacements
+    __slots__ = ("key", "olds", "news")
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # _hashable(old value) -> old value, new value
+        self.olds: dict[Any, Any] = {}
+        self.news: dict[Any, Any] = {}
+
+    def replace(self, mapping: dict[Any, Any]) -> None:
+        # The new replacements apply to the results of the earlier ones
+        hashed_mapping = {_hashable(old): new for old, new in mapping.items()}
+        for hashed, new in self.news.items():
+            self.news[hashed] = hashed_mapping.get(_hashable(new), new)
+        for old, new in mapping.items():
+            hashed = _hashable(old)
+            if hashed not in self.olds:
+                self.olds[hashed] = old
+                self.news[hashed] = new
+
+    def values(self, columns: Columns) -> np.ndarray:
+        values = columns[self.key]
+        if not self.olds:
+            return values
+        hashed = list(self.olds)
+        index = _codes(Choice([self.olds[h] for h in hashed]), None, values)
+        hit = index >= 0
+        if not hit.any():
+            return values
+        result = values.astype(object)
+        result[hit] = _object_array((self.news[h] for h in hashed), len(hashed))[
+            index[hit]
+        ]
+        return result
+
+
+class _Constant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def replace(self, mapping: dict[Any, Any]) -> None:
+        for old, new in mapping.items():
+            if _hashable(old) == _hashable(self.value):
+                self.value = new
+                break
+
+    def values(self, columns: Columns) -> np.ndarray:
+        return _full(_rows_count(columns), self.value, object)
+
+
+def _flatten(
+    values: dict[str, Any], leaves: Mapping[str, Any], prefix: str = ""
+) -> dict[str, Any]:
+    # Dotted keys, dicts of the fields with a dict type are kept
+    flat = {}
+    for name, value in values.items():
+        path = prefix + name
+        if type(value) is dict and path not in leaves:
+            flat.update(_flatten(value, leaves, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+def _nest(values: dict[str, Any]) -> dict[str, Any]:
+    nested: dict[str, Any] = {}
+    for path, value in values.items():
+        *sections, name = path.split(".")
+        target = nested
+        for section in sections:
+            target = target.setdefault(section, {})
+        target[name] = value
+    return nested
+
+
+class SchemaMigrator:
+    # Brings stored configs of older schema versions to the current class.
+    # The declared migrations between a version and the current one are
+    # compiled into one mapping of the stored columns, composing the renames
+    # and value replacements, so each column is read and rewritten once for
+    # all the configs of that version. Only transform functions split it.
+    def __init__(self, cls: type[Hyperparams]) -> None:
+        self.cls = cls
+        self.version = schema_version(cls)
+        self.fingerprint = schema_fingerprint(cls)
+        self.infos = dict(_leaf_infos(cls))
+        migrations = sorted(
+            _get_config_value(cls, "migrations", ()), key=lambda m: m.version
+        )
+        versions = [migration.version for migration in migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError(f"{cls.__name__} declares several migrations per version")
+        if versions and versions[-1] > self.version:
+            raise ValueError(
+                f"{cls.__name__} declares a migration to version {versions[-1]} "
+                f"but its schema_version is {self.version}"
+            )
+        self.migrations: list[Migration] = migrations
+
+    @classmethod
+    def for_class(cls, hyperparams_cls: type[Hyperparams]) -> "SchemaMigrator":
+        migrator = _migrators.get(hyperparams_cls)
+        if migrator is None:
+            migrator = cls(hyperparams_cls)
+            _migrators[hyperparams_cls] = migrator
+        return migrator
+
+    def migrate_columns(self, columns: Mapping[str, Any], version: int) -> Columns:
+        # Columns of dotted field names stored with the version, returns
+        # typed columns of every leaf field of the current class
+        if version > self.version:
+            raise ValueError(
+                f"Configs of version {version} are newer than {self.cls.__name__} "
+                f"of version {self.version}"
+            )
+        columns = {
+            name: values
+            if isinstance(values, np.ndarray)
+            else column(values, len(values))
+            for name, values in columns.items()
+        }
+        count = _rows_count(columns)
+        state: dict[str, _Source | _Constant] = {k: _Source(k) for k in columns}
+        for migration in self.migrations:
+            if migration.version <= version:
+                continue
+            state = self._compile(migration, state)
+            if migration.transform is not None:
+                columns = self._materialize(state, columns, count)
+                columns = dict(migration.transform(columns))
+                state = {name: _Source(name) for name in columns}
+        return self._finish(self._materialize(state, columns, count), count, version)
+
+    @staticmethod
+    def _compile(
+        migration: Migration, state: dict[str, _Source | _Constant]
+    ) -> dict[str, _Source | _Constant]:
+        renamed: dict[str, _Source | _Constant] = {}
+        for key, value in state.items():
+            for old, new in migration.rename.items():
+                if _covers(old, key):
+                    key = new + key[len(old) :]
+                    break
+            if key in renamed:
+                raise ValueError(
+                    f"Migration to version {migration.version} renames two fields "
+                    f"to {key}"
+                )
+            renamed[key] = value
+        for name, mapping in migration.replace.items():
+            if name in renamed:
+                renamed[name].replace(mapping)
+        for name in migration.remove:
+            for key in [key for key in renamed if _covers(name, key)]:
+                del renamed[key]
+        for name, value in migration.add.items():
+            if not any(_covers(name, key) for key in renamed):
+                renamed[name] = _Constant(value)
+        return renamed
+
+    @staticmethod
+    def _materialize(
+        state: dict[str, _Source | _Constant], columns: Columns, count: int
+    ) -> Columns:
+        if not columns:
+            # Constants need the row count
+            columns = {"": np.empty(count, dtype=object)}
+        return {name: source.values(columns) for name, source in state.items()}
+
+    def _finish(self, columns: Columns, count: int, version: int) -> Columns:
+        unknown = columns.keys() - self.infos.keys()
+        if unknown:
+            raise ValueError(
+                f"Fields {', '.join(sorted(unknown))} of version {version} are not in "
+                f"{self.cls.__name__}, declare a migration that renames or removes them"
+            )
+        result = {}
+        for name, info in self.infos.items():
+            values = columns.get(name)
+            if values is None:
+                if info.required:
+                    raise ValueError(
+                        f"Required field {name} is missing in the configs of "
+                        f"version {version}, declare a migration that adds it"
+                    )
+                result[name] = column(repeat(info.default, count), count, info)
+            elif values.dtype == object:
+                result[name] = column(values.tolist(), count, info)
+            else:
+                result[name] = values
+        return result
+
+    def migrate_values(
+        self, values_list: Sequence[Mapping[str, Any]], version: int
+    ) -> Columns:
+        # Nested values of configs, e.g. the values of SweepJournal entries,
+        # all stored with the version
+        groups: dict[tuple[int, tuple[str, ...]], list[int]] = {}
+        flats = []
+        for row, values in enumerate(values_list):
+            flat = _flatten(dict(values), self.infos)
+            flats.append(flat)
+            groups.setdefault((version, tuple(flat)), []).append(row)
+        return self._merge(flats, groups)
+
+    def migrate_records(self, records: Iterable[Mapping[str, Any]]) -> Columns:
+        # Records written by to_record(), records without a version are the
+        # configs stored before the class declared a schema_version
+        groups: dict[tuple[int, tuple[str, ...]], list[int]] = {}
+        flats = []
+        for row, record in enumerate(records):
+            version = record.get("version", 0)
+            if (
+                version == self.version
+                and record.get("fingerprint", self.fingerprint) != self.fingerprint
+            ):
+                raise ValueError(
+                    f"{self.cls.__name__} changed since the config at row {row} was "
+                    f"stored, increase its schema_version and declare a migration"
+                )
+            flat = _flatten(record["values"], self.infos)
+            flats.append(flat)
+            groups.setdefault((version, tuple(flat)), []).append(row)
+        return self._merge(flats, groups)
+
+    def _merge(
+        self,
+        flats: list[dict[str, Any]],
+        groups: dict[tuple[int, tuple[str, ...]], list[int]],
+    ) -> Columns:
+        # Configs of the same version and stored fields are migrated together
+        count = len(flats)
+        if not count:
+            return {name: column([], 0, info) for name, info in self.infos.items()}
+        parts = []
+        for (version, keys), rows in groups.items():
+            columns = {
+                key: _object_array((flats[row][key] for row in rows), len(rows))
+                for key in keys
+            }
+            parts.append(self.migrate_columns(columns, version))
+        if len(parts) == 1:
+            return parts[0]
+        # Back to the order of the records
+        order = np.empty(count, dtype=np.int64)
+        order[np.concatenate(list(groups.values()))] = np.arange(count)
+        result = {}
+        for name, info in self.infos.items():
+            values = np.concatenate([part[name] for part in parts])[order]
+            if values.dtype == object:
+                values = column(values.tolist(), count, info)
+            result[name] = values
+        return result
+
+    def load(self, records: Iterable[Mapping[str, Any]]) -> list[Hyperparams]:
+        # Validated instances of the current class
+        columns = self.migrate_records(records)
+        names = list(columns)
+        lists = [columns[name].tolist() for name in names]
+        return [self.cls(**_nest(dict(zip(names, row)))) for row in zip(*lists)]
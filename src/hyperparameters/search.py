@@ -0,0 +1,438 @@
+import math
+from collections.abc import Mapping
+from itertools import repeat
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from hyperparameters.columnar import Columns, _hashable, column
+from hyperparameters.hyperparams import (
+    HyperparamInfo,
+    Hyperparams,
+    _get_config_value,
+)
+from hyperparameters.spaces import Domain, IntUniform, as_domain
+
+# Takes columns of configs, returns a bool mask of the feasible ones
+Constraint = Callable[[Mapping[str, np.ndarray]], np.ndarray]
+# Takes a field name, a generator, and a size, returns samples drawn like
+# Domain.sample(): indices for discrete domains, values for continuous ones
+Sampler = Callable[[str, np.random.Generator, int], np.ndarray]
+
+
+def _isin(values: np.ndarray, allowed: Sequence[Any]) -> np.ndarray:
+    if values.dtype != object:
+        return np.isin(values, allowed)
+    if all(type(value) is str for value in allowed):
+        # Strings never compare equal to other types, look them up in a set
+        try:
+            return np.fromiter(
+                map(frozenset(allowed).__contains__, values.tolist()),
+                dtype=np.bool_,
+                count=len(values),
+            )
+        except TypeError:
+            # Unhashable values
+            pass
+    return np.fromiter(
+        (value in allowed for value in values.tolist()),
+        dtype=np.bool_,
+        count=len(values),
+    )
+
+
+def _codes(
+    domain: Domain, choices: np.ndarray | None, values: np.ndarray
+) -> np.ndarray:
+    # Index of each value in a discrete domain, -1 when outside.
+    # The choices are the domain values as a column, None for IntUniform.
+    size = domain.size()
+    if isinstance(domain, IntUniform) and values.dtype.kind in "iu":
+        result = values.astype(np.int64) - domain.low
+        return np.where((result >= 0) & (result < size), result, -1)
+    lookup: dict[Any, int]
+    if choices is not None and choices.dtype != object and values.dtype != object:
+        sorter = np.argsort(choices, kind="stable")
+        positions = np.searchsorted(choices[sorter], values).clip(0, size - 1)
+        found = choices[sorter][positions] == values
+        return np.where(found, sorter[positions], -1)
+    if all(type(value) is str for value in domain.values()):
+        # Strings never compare equal to other types, look them up directly
+        lookup = {}
+        for index, value in enumerate(domain.values()):
+            lookup.setdefault(value, index)
+        try:
+            return np.fromiter(
+                map(lookup.get, values.tolist(), repeat(-1)),
+                dtype=np.int64,
+                count=len(values),
+            )
+        except TypeError:
+            # Unhashable values
+            pass
+    lookup = {}
+    for index, value in enumerate(domain.values()):
+        lookup.setdefault(_hashable(value), index)
+    return np.fromiter(
+        (lookup.get(_hashable(value), -1) for value in values.tolist()),
+        dtype=np.int64,
+        count=len(values),
+    )
+
+
+def _as_list(values: Any) -> list[Any]:
+    if isinstance(values, (list, tuple, set, frozenset)):
+        return list(values)
+    return [values]
+
+
+def _full(count: int, value: Any, dtype: Any) -> np.ndarray:
+    if dtype == object:
+        array = np.empty(count, dtype=object)
+        array.fill(value)
+        return array
+    return np.full(count, value, dtype=dtype)
+
+
+def _take(columns: Columns, index: np.ndarray) -> Columns:
+    return {name: values[index] for name, values in columns.items()}
+
+
+def _rows_count(columns: Mapping[str, np.ndarray]) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+class Forbidden:
+    # Rejects the configs in which every given field has one of the given values:
+    # Forbidden(tokenizer="char", model=["transformer", "lstm"])
+    __slots__ = ("conditions",)
+
+    def __init__(self, **conditions: Any) -> None:
+        if not conditions:
+            raise ValueError("Forbidden needs at least one field")
+        self.conditions = {
+            name: _as_list(values) for name, values in conditions.items()
+        }
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return tuple(self.conditions)
+
+    def __call__(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        rejected = np.ones(_rows_count(columns), dtype=np.bool_)
+        for name, values in self.conditions.items():
+            rejected &= _isin(columns[name], values)
+        return ~rejected
+
+    def __repr__(self) -> str:
+        conditions = ", ".join(f"{k}={v!r}" for k, v in self.conditions.items())
+        return f"{self.__class__.__name__}({conditions})"
+
+
+def constraint(*fields: str) -> Callable[[Constraint], Constraint]:
+    # Declares the fields a constraint reads, so that it prunes the grid
+    # as soon as they are enumerated
+    def decorator(func: Constraint) -> Constraint:
+        func.fields = fields  # type: ignore
+        return func
+
+    return decorator
+
+
+class _ColumnsWithBase(Mapping):
+    # Fields outside of the space read as constant columns of the base values
+    __slots__ = ("_columns", "_base_value", "_count")
+
+    def __init__(self, columns: Columns, base_value: Callable[[str], Any]) -> None:
+        self._columns = columns
+        self._base_value = base_value
+        self._count = _rows_count(columns)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        values = self._columns.get(name)
+        if values is None:
+            values = _full(self._count, self._base_value(name), object)
+            self._columns[name] = values
+        return values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+class SearchSpace:
+    # The tunable params of a class with their conditions and constraints,
+    # compiled once into vectorized predicates over columns of configs
+    def __init__(
+        self,
+        cls: type[Hyperparams],
+        *,
+        constraints: Iterable[Constraint] = (),
+        base: Hyperparams | None = None,
+    ) -> None:
+        self.cls = cls
+        self.base = base
+        self.infos: dict[str, HyperparamInfo] = {}
+        self.domains: dict[str, Domain] = {}
+        for name, info in cls._tunable_params():
+            domain = self._domain(name, info)
+            if domain is not None:
+                self.infos[name] = info
+                self.domains[name] = domain
+
+        # field name -> parent field name -> values making the field active
+        self.conditions: dict[str, dict[str, list[Any]]] = {}
+        for name, info in self.infos.items():
+            if not info.active_if:
+                continue
+            if info.required:
+                raise ValueError(
+                    f"Conditional field {name} needs a default for when it is inactive"
+                )
+            prefix = name.rpartition(".")[0]
+            parents = {}
+            for parent, values in info.active_if.items():
+                parent = f"{prefix}.{parent}" if prefix else parent
+                if parent not in self.domains:
+                    raise ValueError(
+                        f"Field {name} is conditioned on {parent} that is not tunable"
+                    )
+                parents[parent] = _as_list(values)
+            self.conditions[name] = parents
+        self.order = self._sort_fields()
+
+        self.constraints: list[Constraint] = [
+            *_get_config_value(cls, "constraints", ()),
+            *constraints,
+        ]
+        self._values = {
+            name: column(domain.values(), len(domain.values()), self.infos[name])
+            for name, domain in self.domains.items()
+            if domain.discrete and not isinstance(domain, IntUniform)
+        }
+
+    @staticmethod
+    def _domain(name: str, info: HyperparamInfo) -> Domain | None:
+        if info.search_space is not None:
+            domain = as_domain(info.search_space)
+            if domain is None:
+                raise ValueError(
+                    f"Search space {info.search_space!r} of {name} is not supported"
+                )
+            return domain
+        if info.choices is not None:
+            return as_domain(info.choices)
+        # Tunable params without a space keep their values
+        return None
+
+    def _sort_fields(self) -> list[str]:
+        # Parents come before the fields conditioned on them
+        order: list[str] = []
+        visiting: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Conditions of field {name} form a cycle")
+            visiting.add(name)
+            for parent in self.conditions.get(name, ()):
+                visit(parent)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.domains:
+            visit(name)
+        return order
+
+    def base_value(self, name: str) -> Any:
+        if self.base is None:
+            self.base = self.cls()
+        return self.base.get_path(name)
+
+    def _inactive_value(self, name: str) -> Any:
+        return self.infos[name].default
+
+    def _decode(self, name: str, codes: np.ndarray) -> np.ndarray:
+        domain = self.domains[name]
+        if isinstance(domain, IntUniform):
+            return codes.astype(np.int64) + domain.low
+        if domain.discrete:
+            return self._values[name][codes]
+        return codes
+
+    def _apply_inactive(
+        self, name: str, values: np.ndarray, active: np.ndarray
+    ) -> np.ndarray:
+        if active.all():
+            return values
+        value = self._inactive_value(name)
+        if value is None and values.dtype != object:
+            values = values.astype(object)
+        values = values.copy()
+        values[~active] = value
+        return values
+
+    def _active(
+        self, name: str, columns: Columns, actives: dict[str, np.ndarray], count: int
+    ) -> np.ndarray:
+        # A field is active when its conditions hold and its parents are active
+        active = np.ones(count, dtype=np.bool_)
+        for parent, values in self.conditions.get(name, {}).items():
+            active &= actives[parent] & _isin(columns[parent], values)
+        return active
+
+    def _prune(
+        self,
+        columns: Columns,
+        actives: dict[str, np.ndarray],
+        constraints: list[Constraint],
+    ) -> tuple[Columns, dict[str, np.ndarray]]:
+        mask = self._feasible(columns, constraints)
+        if mask.all():
+            return columns, actives
+        return _take(columns, mask), _take(actives, mask)
+
+    def _feasible(self, columns: Columns, constraints: list[Constraint]) -> np.ndarray:
+        mask = np.ones(_rows_count(columns), dtype=np.bool_)
+        view = _ColumnsWithBase(dict(columns), self.base_value)
+        for func in constraints:
+            mask &= np.asarray(func(view), dtype=np.bool_)
+        return mask
+
+    def feasible(self, columns: Columns) -> np.ndarray:
+        return self._feasible(columns, self.constraints)
+
+    def is_feasible(self, params: Hyperparams) -> bool:
+        columns = {
+            name: column([params.get_path(name)], 1, self.infos[name])
+            for name in self.domains
+        }
+        view = _ColumnsWithBase(columns, params.get_path)
+        return all(
+            bool(np.asarray(func(view), dtype=np.bool_)[0]) for func in self.constraints
+        )
+
+    def grid(self) -> Columns:
+        for name, domain in self.domains.items():
+            if not domain.discrete:
+                raise ValueError(f"Field {name} is continuous, use sample()")
+        return self._grid(self.order, self.constraints)
+
+    def _grid(self, names: list[str], constraints: list[Constraint]) -> Columns:
+        # Cartesian product of the active fields, inactive fields are not expanded
+        # and infeasible combinations are pruned as soon as their fields are known.
+        # The names are in self.order and include the parents of their conditions.
+        pending = list(constraints)
+        columns: Columns = {}
+        actives: dict[str, np.ndarray] = {}
+        count = 1
+        for name in names:
+            active = self._active(name, columns, actives, count)
+            size = self.domains[name].size()
+            repeats = np.where(active, size, 1)
+            index = np.repeat(np.arange(count), repeats)
+            # Position of each row within the rows expanded from the same row
+            positions = np.arange(len(index)) - np.repeat(
+                np.cumsum(repeats) - repeats, repeats
+            )
+            columns = _take(columns, index)
+            actives = _take(actives, index)
+            active = active[index]
+            columns[name] = self._apply_inactive(
+                name, self._decode(name, positions), active
+            )
+            actives[name] = active
+
+            ready = [
+                func
+                for func in pending
+                if getattr(func, "fields", None) is not None
+                and all(field in columns for field in func.fields)  # type: ignore
+            ]
+            if ready:
+                pending = [func for func in pending if func not in ready]
+                columns, actives = self._prune(columns, actives, ready)
+            count = _rows_count(columns)
+        if pending:
+            columns, actives = self._prune(columns, actives, pending)
+        return columns
+
+    def actives(self, columns: Columns) -> dict[str, np.ndarray]:
+        # field name -> mask of the configs in which the field is active
+        count = _rows_count(columns)
+        actives: dict[str, np.ndarray] = {}
+        for name in self.order:
+            actives[name] = self._active(name, columns, actives, count)
+        return actives
+
+    def _sample_batch(
+        self, rng: np.random.Generator, size: int, sampler: Sampler | None
+    ) -> Columns:
+        columns: Columns = {}
+        actives: dict[str, np.ndarray] = {}
+        for name in self.order:
+            if sampler is None:
+                samples = self.domains[name].sample(rng, size)
+            else:
+                samples = sampler(name, rng, size)
+            values = self._decode(name, samples)
+            active = self._active(name, columns, actives, size)
+            columns[name] = self._apply_inactive(name, values, active)
+            actives[name] = active
+        return columns
+
+    def sample(
+        self,
+        size: int,
+        *,
+        seed: int | np.random.Generator | None = None,
+        max_rounds: int = 100,
+        sampler: Sampler | None = None,
+    ) -> Columns:
+        # Rejection sampling in batches sized by the observed acceptance rate.
+        # The fields are drawn uniformly from their domains, or by the sampler.
+        rng = np.random.default_rng(seed)
+        parts: list[Columns] = []
+        found = 0
+        acceptance = 1.0
+        for _ in range(max_rounds):
+            batch_size = min(
+                max(math.ceil((size - found) / acceptance * 1.1), 16), 1 << 20
+            )
+            batch = self._sample_batch(rng, batch_size, sampler)
+            mask = self.feasible(batch)
+            accepted = int(mask.sum())
+            acceptance = max(accepted / batch_size, 1e-3)
+            if accepted:
+                parts.append(_take(batch, mask))
+                found += accepted
+            if found >= size:
+                break
+        else:
+            raise ValueError(
+                f"Found {found} feasible configs of {size} in {max_rounds} rounds, "
+                "the constraints reject almost every config"
+            )
+        if not parts:
+            # No config was asked for and every drawn one was rejected
+            return {name: column([], 0, self.infos[name]) for name in self.order}
+        return {
+            name: np.concatenate([part[name] for part in parts])[:size]
+            for name in self.order
+        }
+
+    def to_dicts(self, columns: Columns) -> list[dict[str, Any]]:
+        # Dotted keys, ready for Hyperparams.update()
+        names = list(columns)
+        lists = [columns[name].tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*lists)]
+
+    def instances(
+        self, columns: Columns, base: Hyperparams | None = None
+    ) -> list[Hyperparams]:
+        if base is None:
+            base = self.base if self.base is not None else self.cls()
+        return [base.update(data, validate=True) for data in self.to_dicts(columns)]
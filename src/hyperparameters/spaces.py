@@ -0,0 +1,126 @@
+import math
+from typing import Any, Sequence
+
+
+class Domain:
+    # Set of values of a tunable param. Discrete domains have a finite list
+    # of values, samples of those are drawn as indices into the list.
+    __slots__ = ()
+
+    discrete: bool = False
+
+    def values(self) -> list[Any]:
+        raise ValueError(f"{self!r} is continuous and cannot be enumerated")
+
+    def size(self) -> int:
+        raise ValueError(f"{self!r} is continuous and has no finite size")
+
+    def sample(self, rng: Any, size: int) -> Any:
+        raise NotImplementedError
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self) -> int:
+        return hash((type(self), *(repr(getattr(self, n)) for n in self.__slots__)))
+
+    def __repr__(self) -> str:
+        args = ", ".join(repr(getattr(self, name)) for name in self.__slots__)
+        return f"{self.__class__.__name__}({args})"
+
+
+class Choice(Domain):
+    __slots__ = ("choices",)
+
+    discrete = True
+
+    def __init__(self, choices: Sequence[Any]) -> None:
+        if not choices:
+            raise ValueError("Choice needs at least one value")
+        self.choices = list(choices)
+
+    def values(self) -> list[Any]:
+        return self.choices
+
+    def size(self) -> int:
+        return len(self.choices)
+
+    def sample(self, rng: Any, size: int) -> Any:
+        # Indices into the choices
+        return rng.integers(0, len(self.choices), size)
+
+
+class IntUniform(Domain):
+    # Both bounds are included
+    __slots__ = ("low", "high")
+
+    discrete = True
+
+    def __init__(self, low: int, high: int) -> None:
+        if low > high:
+            raise ValueError(f"Empty range [{low}, {high}]")
+        self.low = low
+        self.high = high
+
+    def values(self) -> list[Any]:
+        return list(range(self.low, self.high + 1))
+
+    def size(self) -> int:
+        return self.high - self.low + 1
+
+    def sample(self, rng: Any, size: int) -> Any:
+        return rng.integers(0, self.high - self.low + 1, size)
+
+
+class Uniform(Domain):
+    __slots__ = ("low", "high")
+
+    def __init__(self, low: float, high: float) -> None:
+        if low > high:
+            raise ValueError(f"Empty range [{low}, {high}]")
+        self.low = low
+        self.high = high
+
+    def sample(self, rng: Any, size: int) -> Any:
+        return rng.uniform(self.low, self.high, size)
+
+
+class LogUniform(Domain):
+    __slots__ = ("low", "high")
+
+    def __init__(self, low: float, high: float) -> None:
+        if not 0 < low <= high:
+            raise ValueError(f"Invalid log range [{low}, {high}]")
+        self.low = low
+        self.high = high
+
+    def sample(self, rng: Any, size: int) -> Any:
+        import numpy as np
+
+        return np.exp(rng.uniform(math.log(self.low), math.log(self.high), size))
+
+
+def as_domain(search_space: Any) -> Domain | None:
+    # Native domains, lists of values, and the ray.tune domains are understood
+    if isinstance(search_space, Domain):
+        return search_space
+    if isinstance(search_space, (list, tuple)):
+        return Choice(search_space)
+    categories = getattr(search_space, "categories", None)
+    if categories is not None:
+        return Choice(categories)
+    lower = getattr(search_space, "lower", None)
+    upper = getattr(search_space, "upper", None)
+    if lower is None or upper is None:
+        return None
+    sampler = type(getattr(search_space, "sampler", None)).__name__.lstrip("_")
+    if sampler == "Uniform" and type(search_space).__name__ == "Integer":
+        # ray.tune.randint excludes the upper bound
+        return IntUniform(lower, upper - 1)
+    if sampler == "LogUniform" and type(search_space).__name__ == "Float":
+        return LogUniform(lower, upper)
+    if sampler == "Uniform" and type(search_space).__name__ == "Float":
+        return Uniform(lower, upper)
+    return None
@@ -0,0 +1,79 @@
+import threading
+from typing import Any, Generic, TypeVar
+
+from hyperparameters.hyperparams import Hyperparams
+
+SelfHyperparams = TypeVar("SelfHyperparams", bound=Hyperparams)
+
+
+class VersionedHyperparams(Generic[SelfHyperparams]):
+    # One config shared between threads, read-copy-update style. Readers take
+    # the current version, a frozen instance that never changes, without a
+    # lock. Writers validate an updated copy under a lock and publish it by
+    # replacing a single reference, so readers see the old or the new version
+    # and never a partly applied update.
+    def __init__(self, params: SelfHyperparams) -> None:
+        if not params.is_frozen():
+            params = params.copy().freeze()
+        # Replaced as a whole, the version and the instance always match
+        self._current: tuple[int, SelfHyperparams] = (0, params)
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+
+    def get(self) -> SelfHyperparams:
+        # Read the fields of one get() result to see a consistent config
+        return self._current[1]
+
+    def snapshot(self) -> tuple[int, SelfHyperparams]:
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current[0]
+
+    def update(
+        self,
+        data: dict[str, Any],
+        *,
+        validate: bool = True,
+        expected_version: int | None = None,
+    ) -> int:
+        # Publishes an updated copy and returns its version. With
+        # expected_version, fails when another writer published first.
+        with self._lock:
+            version, params = self._current
+            if expected_version is not None and expected_version != version:
+                raise ValueError(
+                    f"Expected version {expected_version}, the current one is {version}"
+                )
+            self._publish(version + 1, params.update(data, validate=validate))
+            return version + 1
+
+    def publish(self, params: SelfHyperparams) -> int:
+        # Replaces the whole config, e.g. with one loaded from a file
+        with self._lock:
+            version, current = self._current
+            if type(params) is not type(current):
+                raise TypeError(
+                    f"Expected {type(current).__name__}, got {type(params).__name__}"
+                )
+            if not params.is_frozen():
+                params = params.copy()
+            self._publish(version + 1, params)
+            return version + 1
+
+    def _publish(self, version: int, params: SelfHyperparams) -> None:
+        self._current = (version, params.freeze())
+        self._published.notify_all()
+
+    def wait(
+        self, version: int, timeout: float | None = None
+    ) -> tuple[int, SelfHyperparams]:
+        # Blocks until a version newer than the given one is published
+        with self._lock:
+            self._published.wait_for(lambda: self._current[0] > version, timeout)
+            return self._current
+
+    def __repr__(self) -> str:
+        version, params = self._current
+        return f"{self.__class__.__name__}(version={version}, params={params!r})"
@@ -0,0 +1,187 @@
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Literal
+
+import numpy as np
+
+from hyperparameters.columnar import Columns, column, factorize
+from hyperparameters.hyperparams import Hyperparams
+from hyperparameters.journal import JournalEntry, _get_path, read_journal
+from hyperparameters.search import SearchSpace, _codes, _take
+
+
+def _schema_paths(
+    values: dict[str, Any], sections: dict[str, Any], prefix: str = ""
+) -> Iterator[str]:
+    # Dotted names of the values, descending into the sections of the class
+    for name, value in values.items():
+        section = sections.get(name)
+        if section is not None and isinstance(value, dict):
+            yield from _schema_paths(
+                value, section.__sections__, f"{prefix}{name}."  # type: ignore
+            )
+        else:
+            yield prefix + name
+
+
+def _journal_paths(
+    paths: str | os.PathLike | Iterable[str | os.PathLike],
+) -> list[Path]:
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    result = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            result.extend(sorted(path.glob("*.journal")))
+        else:
+            result.append(path)
+    return result
+
+
+def _to_numbers(values: np.ndarray) -> np.ndarray:
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        # Values of another type in the historical schema
+        return np.fromiter(
+            (
+                float(value)
+                if isinstance(value, (int, float)) and not isinstance(value, bool)
+                else np.nan
+                for value in values.tolist()
+            ),
+            dtype=np.float64,
+            count=len(values),
+        )
+
+
+class WarmStart:
+    # Historical configs that are valid for the current search space,
+    # best first, with their scores
+    def __init__(
+        self,
+        space: SearchSpace,
+        columns: Columns,
+        scores: np.ndarray,
+        skipped: int,
+    ) -> None:
+        self.space = space
+        self.columns = columns
+        self.scores = scores
+        # Historical results that do not fit the current class
+        self.skipped = skipped
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def top(self, k: int | None = None) -> Columns:
+        return {name: values[:k] for name, values in self.columns.items()}
+
+    def to_dicts(self, k: int | None = None) -> list[dict[str, Any]]:
+        # e.g. points_to_evaluate of ray.tune
+        return self.space.to_dicts(self.top(k))
+
+    def instances(
+        self, k: int | None = None, base: Hyperparams | None = None
+    ) -> list[Hyperparams]:
+        return self.space.instances(self.top(k), base)
+
+    def observe(self, search: Any) -> None:
+        # Prior data for a TPESearch or GPSearch
+        if len(self):
+            search.observe(self.columns, self.scores)
+
+
+def warm_start(
+    cls: type[Hyperparams],
+    paths: str | os.PathLike | Iterable[str | os.PathLike],
+    *,
+    mode: Literal["min", "max"] = "min",
+    space: SearchSpace | None = None,
+) -> WarmStart:
+    # Reads the finished trials of sweep journals, a directory means every
+    # *.journal file in it. The fields added to the class since get their
+    # defaults, and the configs with values outside of the current search
+    # space, e.g. removed choices, are skipped.
+    if mode not in ("min", "max"):
+        raise ValueError(f"Unknown mode {mode!r}, use min or max")
+    if space is None:
+        space = SearchSpace(cls)
+    sections = cls.__sections__  # type: ignore
+
+    # Historical schema -> its finished trials
+    groups: dict[frozenset[str], list[JournalEntry]] = {}
+    for path in _journal_paths(paths):
+        if not path.exists():
+            raise ValueError(f"Journal {path} does not exist")
+        # Never opened for writing, the sweep may still be running
+        for entry in read_journal(path):
+            if (
+                entry.status != "done"
+                or entry.score is None
+                or not np.isfinite(entry.score)
+            ):
+                continue
+            schema = frozenset(_schema_paths(entry.values, sections))
+            groups.setdefault(schema, []).append(entry)
+
+    parts: list[Columns] = []
+    scores: list[np.ndarray] = []
+    skipped = 0
+    for schema, entries in groups.items():
+        # Checked once per schema rather than per trial
+        missing = [name for name in space.order if name not in schema]
+        if any(space.infos[name].required for name in missing):
+            skipped += len(entries)
+            continue
+        count = len(entries)
+        part = {}
+        for name in space.order:
+            if name in missing:
+                values: Any = [space.infos[name].default] * count
+            else:
+                values = [_get_path(entry.values, name) for entry in entries]
+            part[name] = column(values, count, space.infos[name])
+        parts.append(part)
+        scores.append(np.array([entry.score for entry in entries], dtype=np.float64))
+
+    if not parts:
+        empty = {name: column([], 0, space.infos[name]) for name in space.order}
+        return WarmStart(space, empty, np.zeros(0), skipped)
+    columns = {
+        name: np.concatenate([part[name] for part in parts]) for name in space.order
+    }
+    all_scores = np.concatenate(scores)
+    losses = -all_scores if mode == "max" else all_scores
+    if not space.order:
+        # Without search space fields all the configs are the same one
+        return WarmStart(space, {}, all_scores[[np.argmin(losses)]], skipped)
+
+    # The values of active fields must be in the current search space
+    actives = space.actives(columns)
+    valid = np.ones(len(all_scores), dtype=np.bool_)
+    for name in space.order:
+        domain = space.domains[name]
+        values = columns[name]
+        if domain.discrete:
+            inside = _codes(domain, space._values.get(name), values) >= 0
+        else:
+            numbers = _to_numbers(values)
+            inside = (numbers >= domain.low) & (numbers <= domain.high)  # type: ignore
+            columns[name] = numbers
+        valid &= inside | ~actives[name]
+        columns[name] = space._apply_inactive(name, columns[name], actives[name])
+    rows = np.flatnonzero(valid)
+    valid[rows] = space.feasible(_take(columns, rows))
+    skipped += int((~valid).sum())
+
+    order = np.flatnonzero(valid)
+    order = order[np.argsort(losses[order], kind="stable")]
+    columns = _take(columns, order)
+    all_scores = all_scores[order]
+
+    # Configs tried in several sweeps keep their best score
+    field_codes = np.stack([factorize(columns[name]) for name in space.order], axis=1)
+    _, first = np.unique(field_codes, axis=0, return_index=True)
+    first.sort()
+    return WarmStart(space, _take(columns, first), all_scores[first], skipped)
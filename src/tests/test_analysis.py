@@ -0,0 +1,113 @@
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.analysis import (
+    cardinality,
+    codes,
+    explored_cells,
+    marginal_coverage,
+    unexplored_cells,
+)
+from hyperparameters.search import Forbidden, SearchSpace, constraint
+from hyperparameters.spaces import IntUniform, LogUniform
+from tests.test_search import ModelHyperparams, SampledHyperparams
+
+
+def test_cardinality() -> None:
+    space = SearchSpace(ModelHyperparams)
+    assert cardinality(space) == len(space.to_dicts(space.grid())) == 60
+    assert cardinality(space, feasible=False) == 72
+
+    @constraint("model", "layers")
+    def shallow_lstm(columns):
+        return ~((columns["model"] == "lstm") & (columns["layers"] > 2))
+
+    for constraints in ([shallow_lstm], [lambda c: shallow_lstm(c)]):
+        space = SearchSpace(ModelHyperparams, constraints=constraints)
+        assert cardinality(space) == len(space.to_dicts(space.grid())) == 52
+
+    # Continuous fields are not counted
+    assert cardinality(SearchSpace(SampledHyperparams)) == 60
+
+    class LargeHyperparams(Hyperparams):
+        first: int = HP(
+            "First",
+            default=0,
+            search_space=IntUniform(0, 10**9),
+        )
+        second: int = HP(
+            "Second",
+            default=0,
+            search_space=IntUniform(0, 10**9),
+        )
+
+    assert cardinality(SearchSpace(LargeHyperparams)) == (10**9 + 1) ** 2
+
+    class ContinuousParentHyperparams(Hyperparams):
+        class Config:
+            constraints = [Forbidden(lr=0.1)]
+
+        lr: float = HP(
+            "Learning rate",
+            default=0.1,
+            search_space=LogUniform(1e-4, 1e-1),
+        )
+
+    try:
+        cardinality(SearchSpace(ContinuousParentHyperparams))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_codes() -> None:
+    space = SearchSpace(ModelHyperparams)
+    values = np.array(["lstm", "cnn", "other", "lstm"], dtype=object)
+    assert codes(space, "model", values).tolist() == [2, 0, -1, 2]
+    assert codes(space, "layers", np.array([0, 1, 3, 4])).tolist() == [-1, 0, 2, -1]
+    assert codes(space, "dropout", np.array([0.3, 0.1, 0.5])).tolist() == [2, 0, -1]
+    assert codes(space, "use_dropout", np.array([True, False])).tolist() == [1, 0]
+
+
+def test_coverage() -> None:
+    space = SearchSpace(ModelHyperparams)
+    grid = space.grid()
+    assert explored_cells(space, grid) == 60
+    assert unexplored_cells(space, grid) == 0
+
+    history = [
+        ModelHyperparams(),
+        ModelHyperparams(),
+        # Inactive fields are ignored
+        ModelHyperparams(dropout=0.2),
+        ModelHyperparams(use_dropout=True, dropout=0.2),
+        # Outside of the space
+        ModelHyperparams(layers=7),
+        # Infeasible
+        ModelHyperparams(model="transformer", tokenizer="char"),
+    ]
+    assert explored_cells(space, history) == 2
+    assert unexplored_cells(space, history) == 58
+
+    report = marginal_coverage(space, history)
+    assert report["model"].values == ["cnn", "transformer", "lstm"]
+    assert report["model"].counts.tolist() == [5, 1, 0]
+    assert report["model"].coverage == 2 / 3
+    assert report["dropout"].counts.tolist() == [0, 1, 0]
+    assert report["layers"].outside == 1
+
+    space = SearchSpace(SampledHyperparams)
+    columns = space.sample(10000, seed=0)
+    report = marginal_coverage(space, columns, bins=5)
+    assert len(report["lr"].values) == 6
+    assert report["lr"].counts.sum() == 10000
+    assert report["lr"].coverage == 1.0
+    assert (
+        report["momentum"].counts.sum()
+        == (columns["use_dropout"] & (columns["model"] != "transformer")).sum()
+    )
+    try:
+        marginal_coverage(space, {"lr": columns["lr"]})
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,160 @@
+import argparse
+import copy
+import json
+import pickle
+from typing import Optional
+
+import numpy as np
+from pydantic import ValidationError
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.columnar import diff_many
+
+
+class ArrayHyperparams(Hyperparams):
+    weights: list[float] = HP(
+        "Per-class loss weights",
+        default=[1.0, 2.0, 3.0],
+        as_array=True,
+    )
+    milestones: Optional[list[int]] = HP(
+        "Schedule milestones",
+        default=None,
+        length=2,
+        as_array=True,
+    )
+
+
+class FlagsHyperparams(Hyperparams):
+    flags: list[bool] = HP(
+        "Per-layer flags",
+        default=[True, False],
+        as_array=True,
+    )
+
+
+class SectionedHyperparams(Hyperparams):
+    arrays: ArrayHyperparams = HP(
+        "Arrays",
+    )
+
+
+def test_storage() -> None:
+    p = ArrayHyperparams()
+    assert isinstance(p.weights, np.ndarray)
+    assert p.weights.dtype == np.float64
+    assert not p.weights.flags.writeable
+    # The default is shared, as are the arrays of copies
+    assert p.weights is ArrayHyperparams().weights
+    assert p.copy().weights is p.weights
+    assert p.update({"milestones": [1, 2]}).weights is p.weights
+    try:
+        p.weights[0] = 5.0
+        assert False
+    except ValueError:
+        pass
+
+    # Read-only arrays of the right type are not copied, others are
+    weights = np.arange(4.0)
+    assert ArrayHyperparams(weights=weights).weights is not weights
+    assert weights.flags.writeable
+    weights.setflags(write=False)
+    assert ArrayHyperparams(weights=weights).weights is weights
+
+    # None elements are rejected like by list[float] fields, NaN is a float
+    for value in ([None, 1.0], np.array([None, 1.0], dtype=object)):
+        try:
+            ArrayHyperparams(weights=value)
+            assert False
+        except ValidationError as e:
+            assert "none is not an allowed value" in str(e)
+    assert np.isnan(ArrayHyperparams(weights=[np.nan, 1.0]).weights[0])
+
+    p.milestones = ("3", 4)
+    assert p.milestones.tolist() == [3, 4]
+    assert p.milestones.dtype == np.int64
+    for value in (["x"], [1, 2, 3], [[1, 2]], "ab"):
+        try:
+            p.milestones = value
+            assert False
+        except ValidationError:
+            pass
+
+    # Bools are parsed like the elements of list[bool] fields
+    f = FlagsHyperparams(flags=["false", "true", 1, 0, np.int64(1)])
+    assert f.flags.dtype == np.bool_
+    assert f.flags.tolist() == [False, True, True, False, True]
+    for value in ([2, 0], ["maybe"], [[True]], np.array([0, 2])):
+        try:
+            FlagsHyperparams(flags=value)
+            assert False
+        except ValidationError:
+            pass
+
+    try:
+
+        class StrArrayHyperparams(Hyperparams):
+            names: list[str] = HP(
+                "Names",
+                default=["a"],
+                as_array=True,
+            )
+
+        assert False
+    except ValueError:
+        pass
+
+
+def test_comparison() -> None:
+    p = ArrayHyperparams()
+    other = p.update({"weights": [1.0, 2.0, 4.0]}, validate=True)
+    assert p == ArrayHyperparams(weights=[1, 2, 3])
+    assert p != other
+    assert list(p.diff(other)) == ["weights"]
+    assert p.diff(p.copy()) == {}
+    assert diff_many(p, [p, other]).mask[:, 0].tolist() == [False, True]
+
+    s = SectionedHyperparams()
+    assert s == SectionedHyperparams()
+    assert s != s.update({"arrays.weights": [0.0]})
+    assert list(s.diff(s.update({"arrays.weights": [0.0]}))) == ["arrays.weights"]
+
+
+def test_serialization() -> None:
+    p = ArrayHyperparams(milestones=[1, 2])
+    assert json.loads(p.json()) == {"weights": [1.0, 2.0, 3.0], "milestones": [1, 2]}
+    for copied in (
+        pickle.loads(pickle.dumps(p)),
+        copy.deepcopy(p),
+        p.copy(deep=True),
+    ):
+        assert copied == p
+        assert not copied.weights.flags.writeable
+        assert not copied.milestones.flags.writeable
+
+
+def test_arguments() -> None:
+    parser = argparse.ArgumentParser()
+    ArrayHyperparams.add_arguments(parser)
+    p = ArrayHyperparams.from_arguments(parser.parse_args([]))
+    assert p.weights is ArrayHyperparams().weights
+    p = ArrayHyperparams.from_arguments(
+        parser.parse_args("--weights 0.5 1.5 --milestones 3 4".split())
+    )
+    assert p.weights.tolist() == [0.5, 1.5]
+    assert p.milestones.tolist() == [3, 4]
+
+    # Array fields of sub-configs
+    parser = argparse.ArgumentParser()
+    SectionedHyperparams.add_arguments(parser)
+    s = SectionedHyperparams.from_arguments(parser.parse_args([]))
+    assert s.arrays is SectionedHyperparams().arrays
+    s = SectionedHyperparams.from_arguments(
+        parser.parse_args("--arrays-weights 0.5".split())
+    )
+    assert s.arrays.weights.tolist() == [0.5]
+
+    parser = argparse.ArgumentParser()
+    FlagsHyperparams.add_arguments(parser)
+    f = FlagsHyperparams.from_arguments(parser.parse_args("--flags false true".split()))
+    assert f.flags.tolist() == [False, True]
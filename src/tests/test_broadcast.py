@@ -0,0 +1,84 @@
+import multiprocessing
+
+from pydantic import ValidationError
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.broadcast import SharedHyperparams
+
+
+class BroadcastHyperparams(Hyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=1e-3,
+    )
+    layers_num: int = HP(
+        "Number of layers",
+        default=4,
+        choices=[2, 4, 8],
+    )
+    name: str = HP(
+        "Experiment name",
+    )
+
+
+def _worker(name: str, index: int, queue: multiprocessing.Queue) -> None:
+    shared = SharedHyperparams.attach(name)
+    params = shared.with_overrides({"lr": index / 10})
+    queue.put((params.name, params.lr, params.layers_num, params.is_frozen()))
+    shared.close()
+
+
+def test_broadcast() -> None:
+    base = BroadcastHyperparams(name="base", layers_num=8)
+    with SharedHyperparams.publish(base) as shared:
+        # A frozen copy is published, the caller's instance stays mutable
+        assert not base.is_frozen()
+        assert shared.get() == base
+        assert shared.get().is_frozen()
+
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        workers = [
+            ctx.Process(target=_worker, args=(shared.name, index, queue))
+            for index in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        results = sorted(queue.get(timeout=30) for _ in workers)
+        for worker in workers:
+            worker.join()
+        assert results == [
+            ("base", 0.0, 8, False),
+            ("base", 0.1, 8, False),
+            ("base", 0.2, 8, False),
+        ]
+
+        attached = SharedHyperparams.attach(shared.name)
+        params = attached.get()
+        assert params == base
+        assert params.is_frozen()
+        try:
+            params.lr = 0.5
+            assert False
+        except TypeError:
+            pass
+        try:
+            params.update({"lr": 0.5}, inplace=True)
+            assert False
+        except TypeError:
+            pass
+        try:
+            attached.with_overrides({"layers_num": 3})
+            assert False
+        except ValidationError:
+            pass
+        assert attached.with_overrides({"layers_num": 2}).layers_num == 2
+        try:
+            attached.unlink()
+            assert False
+        except RuntimeError:
+            pass
+        attached.close()
+
+        base.layers_num = 4
+        assert shared.get().layers_num == 8
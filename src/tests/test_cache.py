@@ -0,0 +1,141 @@
+import time
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.cache import ResultCache, config_key, hash_values, memoize
+
+
+class CachedHyperparams(Hyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=1e-3,
+    )
+    epochs: int = HP(
+        "Number of epochs",
+        default=5,
+    )
+    tokenizer: str = HP(
+        "Tokenizer",
+        default="BPE",
+        choices=["BPE", "WordPiece"],
+    )
+
+
+def test_config_key() -> None:
+    p1 = CachedHyperparams()
+    p2 = CachedHyperparams()
+    assert config_key(p1) == config_key(p2)
+
+    p2.lr = 0.1
+    assert config_key(p1) != config_key(p2)
+    assert config_key(p1, ["epochs", "tokenizer"]) == config_key(
+        p2, ["tokenizer", "epochs"]
+    )
+
+    try:
+        config_key(p1, ["unknown"])
+        assert False
+    except ValueError as e:
+        assert "unknown" in str(e)
+
+
+def test_stable_encoding() -> None:
+    class Color(Enum):
+        RED = "red"
+
+    values = {
+        "path": Path("/data"),
+        "color": Color.RED,
+        "tags": {"b", "a"},
+        "array": np.arange(3),
+        "scalar": np.float32(0.5),
+        "params": CachedHyperparams(),
+    }
+    assert hash_values(values) == hash_values(
+        {
+            "path": "/data",
+            "color": "red",
+            "tags": ["a", "b"],
+            "array": [0, 1, 2],
+            "scalar": 0.5,
+            "params": CachedHyperparams().dict(),
+        }
+    )
+
+    # repr() of arbitrary objects differs between processes
+    try:
+        hash_values({"value": object()})
+        assert False
+    except TypeError as e:
+        assert "object" in str(e)
+
+
+def test_memory_cache_lru() -> None:
+    cache = ResultCache(max_memory_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.get("b", "missing") == "missing"
+
+
+def test_disk_cache(tmp_path) -> None:
+    path = tmp_path / "results.sqlite"
+    with ResultCache(path, max_memory_entries=0, max_disk_entries=2) as cache:
+        cache.set("a", {"loss": 0.1})
+        cache.set("b", None)
+        assert "b" in cache
+        time.sleep(0.01)
+        assert cache.get("a") == {"loss": 0.1}
+        cache.set("c", 3)
+        # "b" was accessed least recently
+        assert "b" not in cache
+
+    with ResultCache(path) as cache:
+        assert cache.get("a") == {"loss": 0.1}
+        assert cache.get("c") == 3
+
+    with ResultCache(path, namespace="other") as cache:
+        assert "a" not in cache
+
+
+def test_cache_ttl(tmp_path) -> None:
+    with ResultCache(tmp_path / "results.sqlite", ttl=0.05) as cache:
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        time.sleep(0.1)
+        assert "a" not in cache
+
+
+def test_memoize(tmp_path) -> None:
+    calls = []
+
+    def objective(params: CachedHyperparams) -> float:
+        calls.append(params.lr)
+        return params.lr * params.epochs
+
+    path = tmp_path / "results.sqlite"
+    with ResultCache(path) as cache:
+        cached_objective = memoize(cache)(objective)
+        assert cached_objective(CachedHyperparams()) == 5e-3
+        assert cached_objective(CachedHyperparams()) == 5e-3
+        assert cached_objective(CachedHyperparams(lr=0.1)) == 0.5
+        assert len(calls) == 2
+
+    # Results survive across cache instances (runs and processes)
+    with ResultCache(path) as cache:
+        cached_objective = memoize(cache)(objective)
+        assert cached_objective(CachedHyperparams(lr=0.1)) == 0.5
+        assert len(calls) == 2
+
+    with ResultCache() as cache:
+        cached_objective = memoize(cache, fields=["epochs"])(objective)
+        assert cached_objective(CachedHyperparams()) == 5e-3
+        assert cached_objective(CachedHyperparams(lr=0.1)) == 5e-3
+        assert len(calls) == 3
@@ -0,0 +1,141 @@
+from typing import Optional
+
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.columnar import (
+    codes,
+    diff_many,
+    from_columns,
+    pairwise_changed,
+    pairwise_hamming,
+    to_columns,
+)
+
+
+class ColumnarHyperparams(Hyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+    )
+    epochs: int = HP(
+        "Number of epochs",
+        default=10,
+    )
+    optimizer: str = HP(
+        "Optimizer",
+        default="adam",
+        choices=["sgd", "adam", "rmsprop"],
+    )
+    shuffle: bool = HP(
+        "Shuffle the data",
+        default=True,
+    )
+    name: Optional[str] = HP(
+        "Run name",
+        default=None,
+    )
+
+
+def _instances() -> list[ColumnarHyperparams]:
+    base = ColumnarHyperparams()
+    return [
+        base,
+        base.update({"lr": 0.01}),
+        base.update({"optimizer": "sgd", "epochs": 20}),
+        base.update({"name": "run", "shuffle": False, "lr": 0.01}),
+    ]
+
+
+def test_to_columns() -> None:
+    columns = to_columns(_instances())
+    assert list(columns) == list(ColumnarHyperparams.__fields__)
+    assert columns["lr"].dtype == np.float64
+    assert columns["epochs"].dtype == np.int64
+    assert columns["shuffle"].dtype == np.bool_
+    assert columns["optimizer"].dtype == object
+    assert columns["name"].tolist() == [None, None, None, "run"]
+
+    assert list(to_columns(_instances(), ["epochs"])) == ["epochs"]
+    try:
+        to_columns(_instances(), ["unknown"])
+        assert False
+    except ValueError:
+        pass
+    try:
+        to_columns([])
+        assert False
+    except ValueError:
+        pass
+
+    # Values stored without validation fall back to object columns
+    unvalidated = ColumnarHyperparams().update({"epochs": "many"})
+    assert to_columns([unvalidated])["epochs"].dtype == object
+
+
+def test_from_columns() -> None:
+    instances = _instances()
+    restored = from_columns(ColumnarHyperparams, to_columns(instances))
+    assert restored == instances
+    assert all(type(p.lr) is float for p in restored)
+
+    base = ColumnarHyperparams(epochs=5)
+    columns = {"lr": np.array([0.5, 0.25])}
+    restored = from_columns(ColumnarHyperparams, columns, [1], base=base)
+    assert restored == [base.update({"lr": 0.25})]
+
+    try:
+        from_columns(
+            ColumnarHyperparams,
+            {"optimizer": np.array(["x"], dtype=object)},
+            validate=True,
+        )
+        assert False
+    except ValueError:
+        pass
+
+
+def test_diff_many() -> None:
+    instances = _instances()
+    base = instances[0]
+    changes = diff_many(base, instances)
+    fields = list(ColumnarHyperparams.__fields__)
+    assert changes.fields == fields
+    assert changes.mask.shape == (len(instances), len(fields))
+    for row, instance in enumerate(instances):
+        assert changes.diff(row) == base.diff(instance)
+        assert set(changes.changed_fields(row)) == set(base.diff(instance))
+    assert changes.mask.sum(axis=0).tolist() == [2, 1, 1, 1, 1]
+    assert type(changes.diff(1)["lr"][1]) is float
+
+    changes = diff_many(base, to_columns(instances), ["optimizer"])
+    assert changes.fields == ["optimizer"]
+    assert changes.mask[:, 0].tolist() == [False, False, True, False]
+
+
+def test_pairwise() -> None:
+    instances = _instances()
+    distances = pairwise_hamming(instances)
+    assert distances.shape == (4, 4)
+    for i, first in enumerate(instances):
+        for j, second in enumerate(instances):
+            assert distances[i, j] == len(first.diff(second))
+    assert (distances == distances.T).all()
+
+    changed = pairwise_changed(instances)
+    assert changed.shape == (4, 4, 5)
+    assert (changed.sum(axis=2) == distances).all()
+
+    # Small blocks give the same result
+    assert (pairwise_hamming(instances, block_size=3) == distances).all()
+    assert pairwise_hamming(instances, ["optimizer"]).tolist() == [
+        [0, 0, 1, 0],
+        [0, 0, 1, 0],
+        [1, 1, 0, 1],
+        [0, 0, 1, 0],
+    ]
+
+    matrix = codes(ColumnarHyperparams, to_columns(instances))
+    # Choice fields are coded by the index of the choice
+    assert matrix[:, 2].tolist() == [1, 1, 0, 1]
+    assert (pairwise_hamming(matrix) == distances).all()
@@ -0,0 +1,129 @@
+from typing import Optional
+
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.encoding import ConfigEncoder
+from hyperparameters.search import SearchSpace
+from hyperparameters.spaces import LogUniform
+from tests.test_search import ModelHyperparams, SampledHyperparams
+
+
+class OptionalHyperparams(Hyperparams):
+    weight_decay: Optional[float] = HP(
+        "Weight decay",
+        default=None,
+        search_space=LogUniform(1e-5, 1e-1),
+    )
+    epochs: int = HP(
+        "Epochs",
+        default=3,
+        tunable=True,
+    )
+    name: str = HP(
+        "Run name",
+        default="run",
+    )
+
+
+def test_encode() -> None:
+    encoder = ConfigEncoder.for_class(SampledHyperparams)
+    assert encoder is ConfigEncoder.for_class(SampledHyperparams)
+    assert encoder.names == [
+        "model=cnn",
+        "model=transformer",
+        "model=lstm",
+        "tokenizer=bpe",
+        "tokenizer=char",
+        "use_dropout",
+        "dropout=0.1",
+        "dropout=0.2",
+        "dropout=0.3",
+        "layers",
+        "lr",
+        "momentum",
+    ]
+    matrix = encoder.encode(
+        [
+            SampledHyperparams(model="lstm", lr=1e-4, layers=3),
+            SampledHyperparams(use_dropout=True, dropout=0.2, momentum=0.7, lr=1e-1),
+        ]
+    )
+    assert matrix.shape == (2, encoder.width)
+    assert matrix[0].tolist() == [0, 0, 1, 1, 0, 0, 0, 0, 0, 1, 0, 0]
+    assert np.allclose(matrix[1], [1, 0, 0, 1, 0, 1, 0, 1, 0, 0.5, 1, 0.5])
+    assert (encoder.bounds() == [0.0, 1.0]).all()
+
+    ordinal = ConfigEncoder(SampledHyperparams, categorical="ordinal")
+    assert ordinal.width == 7
+    assert ordinal.encode([SampledHyperparams(model="transformer")])[0, 0] == 0.5
+
+    columns = SearchSpace(SampledHyperparams).sample(10, seed=0)
+    columns["dropout"] = np.full(10, 0.15)
+    columns["use_dropout"] = np.ones(10, dtype=np.bool_)
+    try:
+        encoder.encode(columns)
+        assert False
+    except ValueError:
+        pass
+    try:
+        ConfigEncoder(ModelHyperparams, fields=["dropout"])
+        assert False
+    except ValueError:
+        pass
+    try:
+        ConfigEncoder(OptionalHyperparams, fields=["name"])
+        assert False
+    except ValueError:
+        pass
+
+
+def test_decode() -> None:
+    space = SearchSpace(SampledHyperparams)
+    columns = space.sample(1000, seed=0)
+    for categorical in ("onehot", "ordinal"):
+        encoder = ConfigEncoder.for_class(SampledHyperparams, categorical)
+        matrix = encoder.encode(columns)
+        decoded = encoder.decode(matrix)
+        for name, values in columns.items():
+            assert decoded[name].dtype == values.dtype
+            if values.dtype.kind == "f":
+                assert np.allclose(decoded[name], values)
+            else:
+                assert (decoded[name] == values).all()
+        params = encoder.instances(matrix[:10])
+        assert np.array_equal(encoder.encode(params), matrix[:10])
+
+    # Proposals between and outside of the values are rounded into the space
+    encoder = ConfigEncoder.for_class(SampledHyperparams)
+    params = encoder.instances(
+        np.array([[0.2, 0.9, 0.1, 0, 0, 0.7, 0.2, 0.3, 0.1, 0.8, 1.5, -1.0]])
+    )[0]
+    assert params == SampledHyperparams(
+        model="transformer",
+        use_dropout=True,
+        dropout=0.2,
+        layers=3,
+        lr=1e-1,
+        momentum=0.0,
+    )
+
+    try:
+        encoder.decode(np.zeros((1, 3)))
+        assert False
+    except ValueError:
+        pass
+
+
+def test_optional() -> None:
+    encoder = ConfigEncoder(OptionalHyperparams)
+    assert encoder.names == ["weight_decay", "weight_decay:null", "epochs"]
+    assert encoder.bounds().tolist() == [[0, 1], [0, 1], [-np.inf, np.inf]]
+    matrix = encoder.encode(
+        [OptionalHyperparams(), OptionalHyperparams(weight_decay=1e-3, epochs=5)]
+    )
+    assert matrix.tolist() == [[0, 1, 3], [0.5, 0, 5]]
+    first, second = encoder.instances(matrix)
+    assert first == OptionalHyperparams()
+    assert np.isclose(second.weight_decay, 1e-3)
+    assert second.epochs == 5
@@ -1,12 +1,22 @@
 import argparse
+import copy
 import os
+import pickle
+import sys
+from collections.abc import Mapping
+from pathlib import Path
 from typing import Optional
 
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 from pytest import approx
 
 from hyperparameters import HP, Hyperparams
-from hyperparameters.hyperparams import HyperparamInfo
+from hyperparameters.hyperparams import (
+    HyperparamInfo,
+    _adjust_relative_path,
+    finalize_classes,
+    rebase_paths,
+)
 
 
 def test_parameters() -> None:
@@ -272,6 +282,102 @@ def test_adjust_relative_paths() -> None:
     assert p4.not_a_path == "Some/string"
 
 
+def test_path_fields() -> None:
+    class TestHyperparamsPaths(Hyperparams):
+        class Config:
+            relative_paths_root = "/rootdir"
+
+        data: Path = HP(
+            "Data path",
+            default="data/../train",
+            adjust_relative_path=True,
+        )
+        output: str = HP(
+            "Output path",
+            default="/out//runs/",
+            adjust_relative_path=True,
+        )
+        cache: Optional[Path] = HP(
+            "Cache path",
+            default=None,
+            adjust_relative_path=True,
+        )
+
+    p = TestHyperparamsPaths()
+    # Resolved paths are normalized and keep their type
+    assert p.data == Path("/rootdir/train")
+    assert p.output == "/out/runs"
+    assert p.cache is None
+    p.data = "other"
+    assert p.data == Path("/rootdir/other")
+    p.cache = Path("./cache")
+    assert p.cache == Path("/rootdir/cache")
+    assert TestHyperparamsPaths(data=Path("/abs/data")).data == Path("/abs/data")
+    path_cache = TestHyperparamsPaths.__path_cache__
+    assert path_cache["/rootdir", str, "other"] == "/rootdir/other"
+    assert path_cache["/rootdir", type(Path()), Path("./cache")] == Path(
+        "/rootdir/cache"
+    )
+
+    # The cached paths of one root are not returned for another
+    class PathStr(str):
+        pass
+
+    cache: dict = {}
+    for root in ["/root1", "/root2"]:
+        for value in ["x", PathStr("x"), Path("x")]:
+            resolved = _adjust_relative_path(
+                value, root, field_name="data", owner=TestHyperparamsPaths, cache=cache
+            )
+            if isinstance(value, Path):
+                assert resolved == Path(f"{root}/x")
+            else:
+                assert resolved == f"{root}/x"
+    assert len(cache) == 6
+    assert '"data": "/rootdir/other"' in p.json()
+
+    from hyperparameters.lightweight import make_lightweight
+
+    lightweight_p = make_lightweight(TestHyperparamsPaths)(data="a/b/..")
+    assert lightweight_p.data == Path("/rootdir/a")
+    try:
+        lightweight_p.data = 5
+        assert False
+    except ValueError:
+        pass
+
+
+def test_rebase_paths() -> None:
+    instances = [
+        TrainingHyperparams(
+            optimizer=OptimizerHyperparams(),
+            data=DataHyperparams(path=path),
+        )
+        for path in ["a", "b", "/other/c"]
+    ]
+    instances.append(TrainingHyperparams(optimizer=OptimizerHyperparams()))
+    instances.append(instances[0].update({"epochs": 1}).freeze())
+    rebased = rebase_paths(instances, "/rootdir", "/mnt/new")
+    assert [params.data.path for params in rebased] == [
+        "/mnt/new/a",
+        "/mnt/new/b",
+        "/other/c",
+        "/mnt/new/other",
+        "/mnt/new/a",
+    ]
+    # Unchanged configs and other fields stay as they are
+    assert rebased[2] is instances[2]
+    assert rebased[4].epochs == 1 and rebased[4].is_frozen()
+    assert rebased[0].optimizer is instances[0].optimizer
+    assert instances[0].data.path == "/rootdir/a"
+    # Shared sub-configs stay shared
+    assert rebased[0].data is rebased[4].data
+    assert rebased[3].data is not instances[3].data
+
+    rebase_paths(instances[:2], "/rootdir/", "/mnt/new", inplace=True)
+    assert instances[1].data.path == "/mnt/new/b"
+
+
 def test_argparse_basic_fields() -> None:
     class TestHyperparams(Hyperparams):
         field1: int = HP(
@@ -1027,3 +1133,569 @@ def test_tunable_params() -> None:
             required=False,
         ),
     }
+
+
+def test_cache_key() -> None:
+    class TestHyperparams(Hyperparams):
+        data_path: str = HP(
+            "Data path",
+            default="data/",
+            cache_group="data",
+        )
+        tokenizer: str = HP(
+            "Tokenizer",
+            default="BPE",
+            choices=["BPE", "WordPiece"],
+            cache_group=["data", "model"],
+        )
+        layers_num: int = HP(
+            "Number of layers",
+            default=4,
+            cache_group="model",
+        )
+        lr: float = HP(
+            "Learning rate",
+            default=1e-3,
+        )
+
+    assert TestHyperparams.parameters()["tokenizer"].cache_groups == ["data", "model"]
+    assert TestHyperparams.parameters()["lr"].cache_groups is None
+
+    p1 = TestHyperparams()
+    p2 = TestHyperparams(lr=0.1)
+    assert p1.cache_key("data") == p2.cache_key("data")
+    assert p1.cache_key("model") == p2.cache_key("model")
+
+    data_key = p1.cache_key("data")
+    model_key = p1.cache_key("model")
+    p1.layers_num = 8
+    assert p1.cache_key("data") == data_key
+    assert p1.cache_key("model") != model_key
+
+    p1.tokenizer = "WordPiece"
+    assert p1.cache_key("data") != data_key
+
+    p3 = p2.update({"data_path": "other/"})
+    assert p3.cache_key("data") != p2.cache_key("data")
+    assert p3.cache_key("model") == p2.cache_key("model")
+
+    p2.update({"data_path": "other/"}, inplace=True)
+    assert p2.cache_key("data") == p3.cache_key("data")
+
+    try:
+        p1.cache_key("unknown")
+        assert False
+    except ValueError as e:
+        assert "unknown" in str(e)
+
+
+class PickledHyperparams(Hyperparams):
+    field1: int = HP(
+        "Int field",
+        default=5,
+    )
+    field2: str = HP(
+        "Choices field",
+        default="first",
+        choices=["first", "second"],
+    )
+    field3: Optional[str] = HP(
+        "Optional field",
+        default=None,
+    )
+    field4: float = HP(
+        "Required field",
+    )
+
+
+def test_pickle() -> None:
+    p1 = PickledHyperparams(field2="second", field4=0.5)
+    data = pickle.dumps(p1)
+    # Only the values are stored, not the field names
+    assert b"field1" not in data
+
+    p2 = pickle.loads(data)
+    assert p2 == p1
+    assert p2.__fields_set__ == {"field2", "field4"}
+    assert p2._cache_keys == {}
+
+    # The restored instance is fully functional
+    p2.field1 = 7
+    assert p2.field1 == 7
+    try:
+        p2.field2 = "third"
+        assert False
+    except ValidationError:
+        pass
+    assert p1.field1 == 5
+
+    p3 = copy.deepcopy(p1)
+    assert p3 == p1
+    assert p3 is not p1
+
+    # The frozen state is kept
+    assert pickle.loads(pickle.dumps(p1.copy().freeze())).is_frozen()
+    assert not pickle.loads(data).is_frozen()
+
+    # Pickles of another version of the class are rejected
+    module = sys.modules[__name__]
+    try:
+        for fields in (["a", "b"], ["b", "a"], ["a"]):
+            module.VersionedPickleHyperparams = type(  # type: ignore
+                "VersionedPickleHyperparams",
+                (Hyperparams,),
+                {
+                    "__module__": __name__,
+                    "__annotations__": {name: int for name in fields},
+                    **{name: HP(f"Field {name}", default=1) for name in fields},
+                },
+            )
+            if fields == ["a", "b"]:
+                data = pickle.dumps(module.VersionedPickleHyperparams(a=2))
+                continue
+            try:
+                pickle.loads(data)
+                assert False
+            except ValueError as e:
+                assert "VersionedPickleHyperparams" in str(e)
+    finally:
+        del module.VersionedPickleHyperparams  # type: ignore
+
+
+def test_deferred_finalization() -> None:
+    class TestHyperparams(Hyperparams):
+        class Config:
+            defer_finalization = True
+
+        field: str = HP(
+            "Invalid default is only detected on first use",
+            default="other",
+            choices=["first", "second"],
+        )
+
+    try:
+        TestHyperparams()
+        assert False
+    except ValueError as e:
+        assert "field" in str(e)
+
+    class TestHyperparams2(Hyperparams):
+        class Config:
+            defer_finalization = True
+
+        field: str = HP(
+            "Choices field",
+            default="first",
+            choices=["first", "second"],
+        )
+
+    assert TestHyperparams2.__fields__["field"].field_info.extra["info"].type_ is None
+    finalize_classes(TestHyperparams2)
+    assert TestHyperparams2.parameters()["field"].type_ is str
+
+    p = TestHyperparams2()
+    try:
+        p.field = "third"
+        assert False
+    except ValidationError as e:
+        assert len(e.errors()) == 1
+
+
+def test_inherited_choices() -> None:
+    class BaseHyperparams(Hyperparams):
+        field1: str = HP(
+            "Choices field",
+            default="first",
+            choices=["first", "second"],
+        )
+
+    class TestHyperparams(BaseHyperparams):
+        field2: int = HP(
+            "Other choices field",
+            default=1,
+            choices=[1, 2],
+        )
+
+    p = TestHyperparams(field1="second", field2=2)
+    assert p.field1 == "second"
+    try:
+        p.field1 = "third"
+        assert False
+    except ValidationError as e:
+        assert len(e.errors()) == 1
+        assert e.errors()[0]["loc"][0] == "field1"
+    try:
+        TestHyperparams(field2=3)
+        assert False
+    except ValidationError as e:
+        assert len(e.errors()) == 1
+        assert e.errors()[0]["loc"][0] == "field2"
+    assert len(TestHyperparams.__fields__["field1"].post_validators) == 1
+
+
+def test_generated_methods() -> None:
+    class TestHyperparams(Hyperparams):
+        class Config:
+            relative_paths_root = "/rootdir"
+
+        path: str = HP(
+            "Path field",
+            default="data",
+            adjust_relative_path=True,
+        )
+
+    class TestHyperparams2(TestHyperparams):
+        other_path: str = HP(
+            "Other path field",
+            default="other",
+            adjust_relative_path=True,
+        )
+
+    assert TestHyperparams.__init__ is not Hyperparams.__init__
+    assert TestHyperparams2.__init__ is not TestHyperparams.__init__
+    assert "path" in TestHyperparams2.__init__.__code__.co_consts
+    assert "other_path" in TestHyperparams2.__init__.__code__.co_consts
+    assert "other_path" not in TestHyperparams.__init__.__code__.co_consts
+    p = TestHyperparams2(path="a", other_path="b")
+    assert p.path == "/rootdir/a"
+    assert p.other_path == "/rootdir/b"
+    p.other_path = "c"
+    assert p.other_path == "/rootdir/c"
+    try:
+        p.unknown = 5
+        assert False
+    except ValueError:
+        pass
+
+    class TestHyperparams3(Hyperparams):
+        field: int = HP(
+            "Int field",
+            default=5,
+        )
+
+        def __init__(self, **data) -> None:
+            data["field"] = data.get("field", 5) * 2
+            super().__init__(**data)
+
+    class TestHyperparams4(TestHyperparams3):
+        pass
+
+    assert TestHyperparams3(field=3).field == 6
+    assert TestHyperparams4(field=3).field == 6
+
+    # Subclasses with their own methods still adjust their path fields
+    class TestHyperparams5(TestHyperparams):
+        other_path: str = HP(
+            "Other path field",
+            default="other",
+            adjust_relative_path=True,
+        )
+
+        def __init__(self, **data) -> None:
+            super().__init__(**data)
+
+        def __setattr__(self, name, value) -> None:
+            super().__setattr__(name, value)
+
+    p = TestHyperparams5(path="a", other_path="b")
+    assert p.path == "/rootdir/a"
+    assert p.other_path == "/rootdir/b"
+    p.other_path = "c"
+    assert p.other_path == "/rootdir/c"
+
+
+def test_relative_paths_root_change() -> None:
+    class TestHyperparams(Hyperparams):
+        class Config:
+            relative_paths_root = "/root1"
+
+        path: str = HP(
+            "Path field",
+            default="data",
+            adjust_relative_path=True,
+        )
+
+    assert TestHyperparams(path="x").path == "/root1/x"
+    TestHyperparams.Config.relative_paths_root = "/root2"
+    p = TestHyperparams(path="x")
+    assert p.path == "/root2/x"
+    p.path = "y"
+    assert p.path == "/root2/y"
+    # Defaults are resolved when the class is finalized
+    assert TestHyperparams().path == "/root1/data"
+
+
+def test_view() -> None:
+    class TestHyperparams(Hyperparams):
+        field1: int = HP(
+            "Int field",
+            default=5,
+        )
+        field2: str = HP(
+            "Choices field",
+            default="first",
+            choices=["first", "second"],
+        )
+
+    p = TestHyperparams()
+    view = p.view()
+    assert isinstance(view, Mapping)
+    assert list(view) == ["field1", "field2"]
+    assert len(view) == 2
+    assert view["field1"] == 5
+    assert "field2" in view
+    assert "other" not in view
+    assert dict(view) == p.dict()
+    try:
+        view["other"]
+        assert False
+    except KeyError:
+        pass
+    try:
+        view["field1"] = 6  # type: ignore
+        assert False
+    except TypeError:
+        pass
+
+    # The view is live
+    p.field1 = 7
+    p.update({"field2": "second"}, inplace=True)
+    assert dict(view) == {"field1": 7, "field2": "second"}
+
+    other = p.update({"field1": 3})
+    assert p.diff(other) == {"field1": (7, 3)}
+    assert other.diff(p) == {"field1": (3, 7)}
+    assert p.diff(p) == {}
+
+
+class OptimizerHyperparams(Hyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+        tunable=True,
+    )
+    nesterov: bool = HP(
+        "Use Nesterov momentum",
+        default=False,
+    )
+
+
+class DataHyperparams(Hyperparams):
+    class Config:
+        relative_paths_root = "/rootdir"
+
+    path: str = HP(
+        "Data path",
+        default="data",
+        adjust_relative_path=True,
+    )
+
+
+class TrainingHyperparams(Hyperparams):
+    epochs: int = HP(
+        "Number of epochs",
+        default=10,
+    )
+    optimizer: OptimizerHyperparams = HP(
+        "Optimizer settings",
+    )
+    data: DataHyperparams = HP(
+        "Data settings",
+        default=DataHyperparams(path="other"),
+    )
+
+
+def test_sections() -> None:
+    p = TrainingHyperparams()
+    # Default sections are shared and frozen
+    assert p.optimizer is TrainingHyperparams().optimizer
+    assert p.optimizer.is_frozen()
+    assert p.data.path == "/rootdir/other"
+    try:
+        p.optimizer.lr = 0.5
+        assert False
+    except TypeError:
+        pass
+
+    for validate in (False, True):
+        other = p.update({"optimizer.lr": 0.5, "epochs": 3}, validate=validate)
+        assert other.optimizer.lr == 0.5
+        assert other.optimizer.is_frozen()
+        assert other.data is p.data
+        assert p.optimizer.lr == 0.1
+        assert p.diff(other) == {"epochs": (10, 3), "optimizer.lr": (0.1, 0.5)}
+        assert other.get_path("optimizer.lr") == 0.5
+
+    p.update({"optimizer.nesterov": "yes"}, inplace=True, validate=True)
+    assert p.optimizer.nesterov is True
+    # Unknown keys are reported with their whole path
+    for key in ("optimizer.unknown", "unknown.lr", "epochs.lr", "optimizer.lr.x"):
+        try:
+            p.update({key: 1}, validate=True)
+            assert False
+        except ValueError as e:
+            assert str(e) == f"Update data contains unknown keys: {key}"
+
+    # Assigned sections are copied unless frozen
+    optimizer = OptimizerHyperparams(lr=0.2)
+    p = TrainingHyperparams(optimizer=optimizer)
+    assert p.optimizer == optimizer
+    assert p.optimizer is not optimizer
+    assert not optimizer.is_frozen()
+    optimizer.freeze()
+    p.optimizer = optimizer
+    assert p.optimizer is optimizer
+    p = TrainingHyperparams(data={"path": "dict"})
+    assert p.data.path == "/rootdir/dict"
+    assert p.data.is_frozen()
+
+    # Only sections are shared, plain models copy their fields as before
+    class PlainModel(BaseModel):
+        optimizer: OptimizerHyperparams
+
+    assert PlainModel(optimizer=optimizer).optimizer is not optimizer
+    assert PlainModel(optimizer=optimizer).optimizer == optimizer
+
+    assert p.dict() == {
+        "epochs": 10,
+        "optimizer": {"lr": 0.1, "nesterov": False},
+        "data": {"path": "/rootdir/dict"},
+    }
+    copied = copy.deepcopy(p)
+    assert copied == p
+    assert copied.data.is_frozen()
+    restored = pickle.loads(pickle.dumps(p))
+    assert restored == p
+    assert restored.data.is_frozen()
+
+    assert [name for name, _ in TrainingHyperparams._tunable_params()] == [
+        "optimizer.lr"
+    ]
+
+    try:
+
+        class OptionalSectionHyperparams(Hyperparams):
+            optimizer: Optional[OptimizerHyperparams] = HP(
+                "Optimizer settings",
+            )
+
+        assert False
+    except ValueError:
+        pass
+
+
+def test_section_arguments() -> None:
+    parser = argparse.ArgumentParser()
+    TrainingHyperparams.add_arguments(parser)
+    args = parser.parse_args([])
+    assert vars(args) == {
+        "epochs": 10,
+        "optimizer.lr": 0.1,
+        "optimizer.nesterov": False,
+        "data.path": "/rootdir/other",
+    }
+    p = TrainingHyperparams.from_arguments(args)
+    # Sections left at their defaults are shared
+    assert p.optimizer is TrainingHyperparams().optimizer
+    assert p.data is TrainingHyperparams().data
+
+    args = parser.parse_args(["--optimizer-lr", "0.5", "--optimizer-nesterov"])
+    p = TrainingHyperparams.from_arguments(args, **{"data.path": "override"})
+    assert p.optimizer == OptimizerHyperparams(lr=0.5, nesterov=True)
+    assert p.data.path == "/rootdir/override"
+
+
+def test_sequences() -> None:
+    class TestHyperparams(Hyperparams):
+        widths: list[int] = HP(
+            "Layer widths",
+            default=[64, 32],
+        )
+        milestones: list[int] = HP(
+            "Schedule milestones",
+            default=[10, 20, 30],
+            length=3,
+        )
+        flags: list[bool] = HP(
+            "Flags",
+            default=[True],
+        )
+        names: Optional[list[str]] = HP(
+            "Names",
+            default=None,
+        )
+
+    p = TestHyperparams()
+    assert p.widths == [64, 32]
+    assert TestHyperparams(widths=("1", 2)).widths == [1, 2]
+    assert TestHyperparams.parameters()["milestones"].sequence
+    try:
+        TestHyperparams(widths=["x"])
+        assert False
+    except ValidationError:
+        pass
+    try:
+        TestHyperparams(milestones=[1, 2])
+        assert False
+    except ValidationError:
+        pass
+    try:
+        p.milestones = [1, 2, 3, 4]
+        assert False
+    except ValidationError:
+        pass
+
+    parser = argparse.ArgumentParser()
+    TestHyperparams.add_arguments(parser)
+    args = parser.parse_args([])
+    assert TestHyperparams.from_arguments(args) == p
+    args = parser.parse_args(
+        "--widths 1 2 3 --milestones 4 5 6 --flags false true --names a".split()
+    )
+    assert TestHyperparams.from_arguments(args).dict() == {
+        "widths": [1, 2, 3],
+        "milestones": [4, 5, 6],
+        "flags": [False, True],
+        "names": ["a"],
+    }
+    try:
+        parser.parse_args("--milestones 1 2".split())
+        assert False
+    except SystemExit:
+        pass
+
+    try:
+
+        class WrongLengthHyperparams(Hyperparams):
+            milestones: list[int] = HP(
+                "Schedule milestones",
+                default=[10],
+                length=3,
+            )
+
+        assert False
+    except ValueError:
+        pass
+    try:
+
+        class WrongDefaultHyperparams(Hyperparams):
+            milestones: list[int] = HP(
+                "Schedule milestones",
+                default=["10"],
+            )
+
+        assert False
+    except ValueError:
+        pass
+    try:
+
+        class NotSequenceHyperparams(Hyperparams):
+            milestone: int = HP(
+                "Schedule milestone",
+                default=10,
+                length=3,
+            )
+
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,81 @@
+import argparse
+import pickle
+
+from hyperparameters import HP, Hyperparams, instrumentation
+
+
+class InstrumentedHyperparams(Hyperparams):
+    class Config:
+        relative_paths_root = "/rootdir"
+
+    data_path: str = HP(
+        "Data path",
+        default="data",
+        adjust_relative_path=True,
+    )
+    tokenizer: str = HP(
+        "Tokenizer",
+        default="BPE",
+        choices=["BPE", "WordPiece"],
+    )
+
+
+def test_disabled_by_default() -> None:
+    assert instrumentation.recorder is None
+    InstrumentedHyperparams()
+
+
+def test_recorder(tmp_path) -> None:
+    recorder = instrumentation.enable()
+    try:
+        p = InstrumentedHyperparams(data_path="other")
+        p.tokenizer = "WordPiece"
+        p.json()
+        p.dict()
+        pickle.dumps(p)
+
+        parser = argparse.ArgumentParser()
+        InstrumentedHyperparams.add_arguments(parser)
+        InstrumentedHyperparams.from_arguments(parser.parse_args([]))
+    finally:
+        assert instrumentation.disable() is recorder
+
+    # Not recorded anymore
+    InstrumentedHyperparams()
+
+    stats = recorder.to_dict()["tests.test_instrumentation.InstrumentedHyperparams"]
+    assert stats["construct"]["count"] == 2
+    assert stats["from_arguments"]["count"] == 1
+    assert stats["json"]["count"] == 1
+    assert stats["dict"]["count"] == 1
+    assert stats["pickle"]["count"] == 1
+    assert stats["assign"]["tokenizer"]["count"] == 1
+    assert stats["adjust_path"]["data_path"]["count"] == 2
+    assert stats["choices"]["tokenizer"]["count"] == 3
+    # Fields left at their defaults are not validated
+    assert stats["validate"]["data_path"]["count"] == 2
+    assert stats["validate"]["tokenizer"]["count"] == 3
+    for key in ("total", "mean", "min", "max", "p50", "p90", "p99"):
+        assert stats["construct"][key] >= 0
+
+    path = tmp_path / "metrics.prom"
+    recorder.dump_prometheus(path)
+    text = path.read_text()
+    assert "# TYPE hyperparams_operation_seconds summary" in text
+    assert (
+        'hyperparams_operation_seconds_count{class="tests.test_instrumentation.'
+        'InstrumentedHyperparams",operation="construct",field=""} 2'
+    ) in text
+    assert (
+        'hyperparams_operation_seconds{class="tests.test_instrumentation.'
+        'InstrumentedHyperparams",operation="assign",field="tokenizer",quantile="0.5"}'
+    ) in text
+
+    # Classes of the same name in different modules are kept apart
+    recorder.reset()
+    for module in ("first", "second"):
+        recorder.record(type("Params", (), {"__module__": module}), "construct", 1.0)
+    assert sorted(recorder.to_dict()) == ["first.Params", "second.Params"]
+
+    recorder.reset()
+    assert recorder.to_dict() == {}
@@ -0,0 +1,122 @@
+import time
+
+import numpy as np
+
+from hyperparameters.cache import hash_values
+from hyperparameters.journal import SweepJournal
+from hyperparameters.optimizers import TPESearch
+from hyperparameters.search import SearchSpace
+from tests.test_hyperparams import TrainingHyperparams
+from tests.test_search import SampledHyperparams
+
+
+def test_journal(tmp_path) -> None:
+    path = tmp_path / "sweep.journal"
+    space = SearchSpace(SampledHyperparams)
+    params = space.instances(space.sample(20, seed=0))
+    with SweepJournal(path, SampledHyperparams, sync_every=5) as journal:
+        keys = journal.propose_many(params)
+        assert journal.propose(params[0]) == keys[0]
+        assert len(journal) == 20
+        for key, config in zip(keys[:10], params):
+            journal.start(key)
+            journal.finish(key, config.lr, info={"epochs": 3})
+        journal.start(keys[10])
+        journal.fail(keys[11], info="out of memory")
+
+    with SweepJournal(path, SampledHyperparams) as journal:
+        assert len(journal) == 20
+        assert journal[keys[0]].status == "done"
+        assert journal[keys[0]].score == params[0].lr
+        assert journal[keys[0]].info == {"epochs": 3}
+        assert journal[keys[11]].status == "failed"
+        assert journal[keys[11]].info == "out of memory"
+        assert [entry.key for entry in journal.unfinished()] == keys[10:11] + keys[12:]
+        assert journal.instance(keys[3]) == params[3]
+
+        columns, scores = journal.columns(space)
+        assert scores.tolist() == [config.lr for config in params[:10]]
+        assert columns["model"].tolist() == [config.model for config in params[:10]]
+        search = TPESearch(SampledHyperparams, seed=0)
+        assert journal.restore(search) == 10
+        assert search.count == 10
+
+        try:
+            journal.finish("unknown", 1.0)
+            assert False
+        except KeyError:
+            pass
+
+
+def test_recovery(tmp_path) -> None:
+    path = tmp_path / "sweep.journal"
+    params = [TrainingHyperparams(), TrainingHyperparams(epochs=5)]
+    with SweepJournal(path, TrainingHyperparams) as journal:
+        first, second = journal.propose_many(params)
+        journal.finish(first, 0.5)
+    assert journal[first].values["optimizer"] == {"lr": 0.1, "nesterov": False}
+
+    # The driver died while writing a record
+    with open(path, "a") as file:
+        file.write('{"op":"result","key":"')
+    with SweepJournal(path, TrainingHyperparams) as journal:
+        assert journal[first].status == "done"
+        assert journal[second].status == "proposed"
+        assert journal.instance(second) == params[1]
+        journal.finish(second, 0.25)
+    with SweepJournal(path, TrainingHyperparams) as journal:
+        assert journal[second].score == 0.25
+
+    with open(path, "a") as file:
+        file.write("garbage\n")
+    try:
+        SweepJournal(path, TrainingHyperparams)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_compaction(tmp_path) -> None:
+    path = tmp_path / "sweep.journal"
+    space = SearchSpace(SampledHyperparams)
+    params = space.instances(space.sample(30, seed=0))
+    with SweepJournal(path, SampledHyperparams, compact_every=25) as journal:
+        keys = journal.propose_many(params)
+        for index, key in enumerate(keys):
+            journal.finish(key, float(index))
+        assert (tmp_path / "sweep.journal.snapshot").exists()
+        # 60 records, compacted after the 25th and the 50th
+        journal.sync()
+        assert len(path.read_text().splitlines()) == 10
+
+    with SweepJournal(path, SampledHyperparams) as journal:
+        assert [entry.score for entry in journal] == list(range(30))
+        journal.compact()
+        assert path.read_text() == ""
+    with SweepJournal(path, SampledHyperparams) as journal:
+        _, scores = journal.columns(space)
+        assert np.array_equal(scores, np.arange(30.0))
+
+
+def test_sync(tmp_path) -> None:
+    path = tmp_path / "sweep.journal"
+    params = TrainingHyperparams()
+    journal = SweepJournal(
+        path, TrainingHyperparams, sync_every=100, sync_interval=0.05
+    )
+    key = journal.propose(params)
+    assert key == hash_values(params.view())
+    # Flushed right away, synced once the interval passes without more writes
+    assert path.read_text().count("\n") == 1
+    assert journal._unsynced == 1
+    deadline = time.monotonic() + 5.0
+    while journal._unsynced and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal._unsynced == 0
+    assert journal._timer is None
+
+    journal.finish(key, 0.5)
+    assert journal._timer is not None
+    journal.close()
+    assert journal._unsynced == 0
+    assert journal._timer is None
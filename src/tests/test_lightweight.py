@@ -0,0 +1,271 @@
+import pickle
+from decimal import Decimal
+from typing import Any, Optional, Union
+
+import pytest
+from pydantic import ValidationError
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.lightweight import (
+    LightweightHyperparams,
+    lightweight,
+    make_lightweight,
+)
+
+
+class ConformanceHyperparams(Hyperparams):
+    class Config:
+        relative_paths_root = "/rootdir"
+
+    int_field: int = HP(
+        "Int field",
+        default=5,
+    )
+    float_field: float = HP(
+        "Float field",
+        default=0.5,
+    )
+    str_field: str = HP(
+        "Str field",
+        default="value",
+    )
+    bool_field: bool = HP(
+        "Bool field",
+        default=True,
+    )
+    optional_field: Optional[str] = HP(
+        "Optional field",
+        default=None,
+    )
+    int_choices: int = HP(
+        "Int choices",
+        default=3,
+        choices=[1, 3, 5],
+    )
+    str_choices: str = HP(
+        "Str choices",
+        default="b",
+        choices=["a", "b", "c"],
+    )
+    path_field: str = HP(
+        "Path field",
+        default="data",
+        adjust_relative_path=True,
+    )
+    required_field: float = HP(
+        "Required field",
+    )
+    any_field: Any = HP(
+        "Any field",
+        default=None,
+    )
+
+
+LightweightConformanceHyperparams = make_lightweight(ConformanceHyperparams)
+
+
+@lightweight
+class DecoratedHyperparams(Hyperparams):
+    field: int = HP(
+        "Int field",
+        default=1,
+    )
+
+
+INPUTS = [
+    0,
+    1,
+    3,
+    -7,
+    2.7,
+    1.0,
+    True,
+    False,
+    None,
+    "5",
+    "5.5",
+    "abc",
+    "true",
+    "off",
+    "/abs/path",
+    "rel/path",
+    b"bytes",
+    Decimal("1.5"),
+    [1],
+    {"a": 1},
+    "9" * 5000,
+    float("inf"),
+]
+
+FIELDS = [
+    name for name in ConformanceHyperparams.__fields__ if name != "required_field"
+]
+
+
+def _result(func) -> tuple[str, Any]:
+    try:
+        value = func()
+    except (ValueError, TypeError) as e:
+        return "error", isinstance(e, ValueError)
+    return "ok", (type(value), value)
+
+
+@pytest.mark.parametrize("field", FIELDS)
+@pytest.mark.parametrize("value", INPUTS, ids=lambda value: repr(value)[:20])
+def test_init_conformance(field: str, value: Any) -> None:
+    expected = _result(
+        lambda: getattr(
+            ConformanceHyperparams(**{field: value, "required_field": 1.0}), field
+        )
+    )
+    actual = _result(
+        lambda: getattr(
+            LightweightConformanceHyperparams(**{field: value, "required_field": 1.0}),
+            field,
+        )
+    )
+    assert actual == expected
+
+
+@pytest.mark.parametrize("field", FIELDS)
+@pytest.mark.parametrize("value", INPUTS, ids=lambda value: repr(value)[:20])
+def test_setattr_conformance(field: str, value: Any) -> None:
+    p = ConformanceHyperparams(required_field=1.0)
+    lp = LightweightConformanceHyperparams(required_field=1.0)
+
+    def assign(params):
+        setattr(params, field, value)
+        return getattr(params, field)
+
+    assert _result(lambda: assign(lp)) == _result(lambda: assign(p))
+    assert lp.dict() == p.dict()
+
+
+def test_defaults_and_required() -> None:
+    p = ConformanceHyperparams(required_field=2)
+    lp = LightweightConformanceHyperparams(required_field=2)
+    assert lp.dict() == p.dict()
+    assert lp == p
+    assert lp.path_field == "/rootdir/data"
+    assert lp.required_field == 2.0
+    assert type(lp.required_field) is float
+
+    try:
+        ConformanceHyperparams()
+        assert False
+    except ValidationError:
+        pass
+    try:
+        LightweightConformanceHyperparams()
+        assert False
+    except ValueError as e:
+        assert "required_field" in str(e)
+
+    # Unknown keys are ignored by both
+    assert LightweightConformanceHyperparams(
+        required_field=1, unknown=5
+    ) == ConformanceHyperparams(required_field=1, unknown=5)
+
+    try:
+        lp.unknown = 5
+        assert False
+    except ValueError:
+        pass
+    try:
+        lp.__dict__
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_update_conformance() -> None:
+    for inplace in (False, True):
+        for validate in (False, True):
+            for data in (
+                {"int_field": 7, "str_choices": "c"},
+                {"int_field": "7", "path_field": "other"},
+                {"int_field": "x"},
+                {"str_choices": "d"},
+            ):
+                p = ConformanceHyperparams(required_field=1)
+                lp = LightweightConformanceHyperparams(required_field=1)
+                expected = _result(
+                    lambda: p.update(data, inplace=inplace, validate=validate).dict()
+                )
+                actual = _result(
+                    lambda: lp.update(data, inplace=inplace, validate=validate).dict()
+                )
+                assert actual == expected
+                assert lp.dict() == p.dict()
+
+    lp = LightweightConformanceHyperparams(required_field=1)
+    try:
+        lp.update({"unknown": 1}, validate=True)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_conversions() -> None:
+    p = ConformanceHyperparams(required_field=1, str_choices="a")
+    lp = LightweightConformanceHyperparams.from_hyperparams(p)
+    assert lp.dict() == p.dict()
+    assert lp.to_hyperparams() == p
+    assert isinstance(lp.to_hyperparams(), ConformanceHyperparams)
+
+    other = lp.update({"int_field": 8})
+    assert other.diff(lp) == p.update({"int_field": 8}).diff(p)
+
+    assert pickle.loads(pickle.dumps(lp)) == lp
+    assert make_lightweight(ConformanceHyperparams) is LightweightConformanceHyperparams
+    assert LightweightConformanceHyperparams.parameters() == (
+        ConformanceHyperparams.parameters()
+    )
+
+
+def test_decorator() -> None:
+    assert issubclass(DecoratedHyperparams, LightweightHyperparams)
+    p = DecoratedHyperparams(field="3")
+    assert p.field == 3
+    assert pickle.loads(pickle.dumps(p)) == p
+    assert repr(p) == "DecoratedHyperparams(field=3)"
+
+
+def test_relative_paths_root_change() -> None:
+    class RootHyperparams(Hyperparams):
+        class Config:
+            relative_paths_root = "/root1"
+
+        path_field: str = HP(
+            "Path field",
+            default="data",
+            adjust_relative_path=True,
+        )
+
+    LightweightRootHyperparams = make_lightweight(RootHyperparams)
+    assert LightweightRootHyperparams(path_field="x").path_field == "/root1/x"
+    RootHyperparams.Config.relative_paths_root = "/root2"
+    lp = LightweightRootHyperparams(path_field="x")
+    assert lp.path_field == RootHyperparams(path_field="x").path_field == "/root2/x"
+    lp.path_field = "y"
+    assert lp.path_field == "/root2/y"
+
+
+def test_unsupported_annotations() -> None:
+    class UnionHyperparams(ConformanceHyperparams):
+        union_field: Union[int, str] = HP(
+            "Union field",
+            default=1,
+        )
+
+    # Accepting unchecked values would differ from the pydantic class
+    try:
+        UnionHyperparams(required_field=1, union_field=[1, 2])
+        assert False
+    except ValidationError:
+        pass
+    try:
+        make_lightweight(UnionHyperparams)
+        assert False
+    except TypeError as e:
+        assert "union_field" in str(e)
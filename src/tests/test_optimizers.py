@@ -0,0 +1,107 @@
+import numpy as np
+
+from hyperparameters.optimizers import GPSearch, TPESearch
+from hyperparameters.search import SearchSpace
+from tests.test_search import SampledHyperparams
+
+
+def objective(columns) -> np.ndarray:
+    # The best configs use lstm with 2 layers, lr 1e-2, and momentum 0.8
+    return (
+        (np.log10(columns["lr"]) + 2) ** 2
+        + (columns["model"] != "lstm")
+        + (columns["layers"] != 2) * 0.5
+        + np.where(columns["use_dropout"], (columns["momentum"] - 0.8) ** 2, 0.3)
+    )
+
+
+def run(search, rounds: int = 25, workers: int = 4) -> float:
+    space = SearchSpace(SampledHyperparams)
+    for _ in range(rounds):
+        columns = search.suggest(workers)
+        assert len(columns["lr"]) == workers
+        assert space.feasible(columns).all()
+        search.observe(columns, objective(columns))
+    return search.best()[1]
+
+
+def test_tpe() -> None:
+    space = SearchSpace(SampledHyperparams)
+    random_best = np.median(
+        [objective(space.sample(100, seed=seed)).min() for seed in range(5)]
+    )
+    tpe_best = np.median(
+        [run(TPESearch(SampledHyperparams, seed=seed)) for seed in range(5)]
+    )
+    assert tpe_best < random_best
+
+    # Incremental counts match the counts of the same history observed at once
+    columns = space.sample(500, seed=0)
+    scores = objective(columns)
+    incremental = TPESearch(SampledHyperparams, seed=0)
+    for start in range(0, 500, 37):
+        incremental.observe(
+            {name: values[start : start + 37] for name, values in columns.items()},
+            scores[start : start + 37],
+        )
+    at_once = TPESearch(SampledHyperparams, seed=0)
+    at_once.observe(columns, scores)
+    for good in (0, 1):
+        for counts, expected in zip(incremental._counts[good], at_once._counts[good]):
+            assert np.array_equal(counts, expected)
+
+    try:
+        TPESearch(SampledHyperparams, gamma=1.5)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_gp() -> None:
+    space = SearchSpace(SampledHyperparams)
+    random_best = np.median(
+        [objective(space.sample(100, seed=seed)).min() for seed in range(5)]
+    )
+    gp_best = np.median(
+        [run(GPSearch(SampledHyperparams, seed=seed)) for seed in range(5)]
+    )
+    assert gp_best < random_best
+
+    search = GPSearch(SampledHyperparams, seed=0)
+    for seed in range(5):
+        columns = space.sample(40, seed=seed)
+        search.observe(columns, objective(columns))
+    matrix = search._matrix[: search.count]
+    kernel = search._kernel(matrix, matrix) + search.noise * np.eye(search.count)
+    inverse = search._factor.T @ search._factor
+    assert np.allclose(inverse @ kernel, np.eye(search.count), atol=1e-6)
+    # A batch does not repeat a config
+    proposals = search.encoder.encode(search.suggest(8))
+    assert len({tuple(row) for row in proposals.tolist()}) == 8
+
+
+def test_history() -> None:
+    search = TPESearch(SampledHyperparams, mode="max", startup=2, seed=0)
+    try:
+        search.best()
+        assert False
+    except ValueError:
+        pass
+    params = search.suggest_instances(3)
+    assert all(isinstance(p, SampledHyperparams) for p in params)
+    search.observe(params, [1.0, float("nan"), 3.0])
+    assert search.count == 2
+    config, score = search.best()
+    assert score == 3.0
+    assert config["model"] == params[2].model
+    assert np.isclose(config["lr"], params[2].lr)
+    try:
+        search.observe(params, [1.0])
+        assert False
+    except ValueError:
+        pass
+    try:
+        TPESearch(SampledHyperparams, mode="lowest")
+        assert False
+    except ValueError:
+        pass
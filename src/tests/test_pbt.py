@@ -0,0 +1,72 @@
+import numpy as np
+
+from hyperparameters.pbt import PopulationBasedTraining
+from hyperparameters.search import SearchSpace
+from tests.test_search import ModelHyperparams, SampledHyperparams
+
+
+def test_step() -> None:
+    space = SearchSpace(SampledHyperparams)
+    population = space.sample(1000, seed=0)
+    scores = np.arange(1000.0)
+    pbt = PopulationBasedTraining(SampledHyperparams, seed=0)
+    step = pbt.step(population, scores)
+
+    # The worst quarter continues from the best quarter
+    assert step.rows.tolist() == list(range(750, 1000))
+    assert (step.sources[:750] == np.arange(750)).all()
+    assert (step.sources[750:] < 250).all()
+    assert len(step.instances) == 250
+    for name, values in population.items():
+        assert (step.columns[name][:750] == values[:750]).all()
+    assert space.feasible(step.columns).all()
+
+    lr = step.columns["lr"]
+    assert ((lr >= 1e-4) & (lr <= 1e-1)).all()
+    # Most learning rates are the source ones times a factor
+    ratios = lr[750:] / population["lr"][step.sources[750:]]
+    perturbed = np.isclose(ratios, 0.8) | np.isclose(ratios, 1.2)
+    assert 0.6 < perturbed.mean() < 0.8
+    layers = step.columns["layers"]
+    assert layers.dtype == np.int64
+    assert ((layers >= 1) & (layers <= 3)).all()
+
+    # Inactive fields keep their defaults
+    actives = space.actives(step.columns)
+    assert (step.columns["momentum"][~actives["momentum"]] == 0.0).all()
+    assert (step.columns["momentum"][actives["momentum"]] >= 0.5).all()
+
+    for row, params in zip(step.rows.tolist(), step.instances):
+        assert params.lr == lr[row]
+        assert params.model == step.columns["model"][row]
+
+
+def test_instances() -> None:
+    space = SearchSpace(ModelHyperparams)
+    population = space.instances(space.grid())
+    scores = [float(params.layers) for params in population]
+    scores[0] = float("nan")
+    pbt = PopulationBasedTraining(
+        ModelHyperparams, mode="max", quantile=0.5, resample_probability=1.0, seed=0
+    )
+    step = pbt.step(population, scores)
+    assert 0 in step.rows.tolist()
+    assert len(step.rows) == len(population) // 2
+    for row, params in zip(step.rows.tolist(), step.instances):
+        source = population[step.sources[row]]
+        assert source.layers >= 2
+        assert type(params) is ModelHyperparams
+        assert space.is_feasible(params)
+        # Fields outside of the search space are copied from the source
+        assert params.lr == source.lr
+
+    try:
+        pbt.step(population, scores[:-1])
+        assert False
+    except ValueError:
+        pass
+    try:
+        PopulationBasedTraining(ModelHyperparams, quantile=0.9)
+        assert False
+    except ValueError:
+        pass
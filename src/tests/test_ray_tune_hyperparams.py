@@ -4,6 +4,7 @@ from ray import tune
 
 from hyperparameters import HP, Hyperparams
 from hyperparameters.ray_tune_hyperparams import RayTuneHyperparamsMixin
+from hyperparameters.spaces import Choice, IntUniform, LogUniform, Uniform, as_domain
 
 
 @pytest.fixture
@@ -108,3 +109,41 @@ def test_ray_tune_best_value(
         "field5": "up",
         "field6": "full",
     }
+
+
+def test_native_domains() -> None:
+    class TestHyperparams(Hyperparams, RayTuneHyperparamsMixin):
+        layers: int = HP(
+            "Layers",
+            default=2,
+            search_space=IntUniform(1, 4),
+        )
+        lr: float = HP(
+            "Learning rate",
+            default=0.1,
+            search_space=LogUniform(1e-4, 1e-1),
+        )
+        momentum: float = HP(
+            "Momentum",
+            default=0.9,
+            search_space=Uniform(0.5, 0.99),
+        )
+        activation: str = HP(
+            "Activation",
+            default="relu",
+            search_space=Choice(["relu", "gelu"]),
+        )
+
+    param_space = TestHyperparams().ray_tune_param_space()
+    assert isinstance(param_space["layers"], tune.search.sample.Integer)
+    assert (param_space["layers"].lower, param_space["layers"].upper) == (1, 5)
+    assert param_space["lr"].lower == 1e-4
+    assert param_space["momentum"].upper == 0.99
+    assert param_space["activation"].categories == ["relu", "gelu"]
+    # ray.tune domains convert back to the native ones
+    assert {name: as_domain(domain) for name, domain in param_space.items()} == {
+        "layers": IntUniform(1, 4),
+        "lr": LogUniform(1e-4, 1e-1),
+        "momentum": Uniform(0.5, 0.99),
+        "activation": Choice(["relu", "gelu"]),
+    }
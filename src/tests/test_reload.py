@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+from pydantic import ValidationError
+
+from hyperparameters.reload import ConfigWatcher
+from hyperparameters.versioned import VersionedHyperparams
+from tests.test_hyperparams import OptimizerHyperparams, TrainingHyperparams
+
+
+def _write(path, values) -> None:
+    # Replaced atomically like most editors and deployment tools do
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(values))
+    os.replace(temp_path, path)
+
+
+def test_config_watcher(tmp_path) -> None:
+    base_path = tmp_path / "base.json"
+    override_path = tmp_path / "override.json"
+    _write(base_path, {"epochs": 5, "optimizer": {"lr": 0.5}})
+    params = TrainingHyperparams(optimizer=OptimizerHyperparams())
+    watcher = ConfigWatcher(params, [base_path, override_path], use_inotify=False)
+    assert not watcher.uses_inotify
+    assert params.epochs == 5
+    assert params.optimizer.lr == 0.5
+
+    changes = []
+    watcher.subscribe(changes.append)
+    assert watcher.check() == {}
+    _write(override_path, {"optimizer": {"nesterov": True}})
+    diff = watcher.check()
+    assert diff == {"optimizer.nesterov": (False, True)}
+    assert changes == [diff]
+    assert params.optimizer == OptimizerHyperparams(lr=0.5, nesterov=True)
+
+    # Fields removed from the files go back to their values at the start
+    _write(base_path, {"epochs": 7})
+    assert watcher.check() == {"epochs": (5, 7), "optimizer.lr": (0.5, 0.1)}
+    assert len(changes) == 2
+
+    # Invalid files leave the instance unchanged
+    _write(override_path, {"epochs": "many"})
+    try:
+        watcher.check()
+        assert False
+    except ValidationError:
+        pass
+    _write(override_path, {"epoch": 1})
+    try:
+        watcher.check()
+        assert False
+    except ValueError:
+        pass
+    override_path.write_text("{")
+    try:
+        watcher.check()
+        assert False
+    except ValueError:
+        pass
+    assert params.epochs == 7
+    assert params.optimizer.nesterov is True
+    assert len(changes) == 2
+
+    # A deleted file keeps its values
+    _write(override_path, {"epochs": 8})
+    assert watcher.check() == {"epochs": (7, 8), "optimizer.nesterov": (True, False)}
+    override_path.unlink()
+    assert watcher.check() == {}
+    assert params.epochs == 8
+
+    # Frozen after the watcher started
+    params.freeze()
+    _write(base_path, {"epochs": 7, "optimizer": {"lr": 0.5}})
+    try:
+        watcher.check()
+        assert False
+    except ValueError as e:
+        assert "frozen" in str(e)
+    assert params.optimizer.lr == 0.1
+
+    watcher = ConfigWatcher.load(TrainingHyperparams, base_path, use_inotify=False)
+    assert watcher.params.epochs == 7
+    try:
+        ConfigWatcher(params.copy().freeze(), base_path)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_config_watcher_thread(tmp_path) -> None:
+    path = tmp_path / "config.json"
+    _write(path, {"epochs": 1})
+    params = TrainingHyperparams(optimizer=OptimizerHyperparams())
+    for use_inotify in (True, False):
+        changed = threading.Event()
+        errors = []
+        with ConfigWatcher(
+            params, path, interval=0.01, use_inotify=use_inotify, on_error=errors.append
+        ) as watcher:
+            watcher.subscribe(lambda diff: changed.set())
+            path.write_text("{")
+            _write(path, {"epochs": params.epochs + 1})
+            assert changed.wait(5)
+        assert not errors or isinstance(errors[0], ValueError)
+    assert params.epochs == 3
+
+
+def test_config_watcher_versioned(tmp_path) -> None:
+    path = tmp_path / "config.json"
+    _write(path, {"epochs": 1})
+    shared = VersionedHyperparams(TrainingHyperparams(optimizer=OptimizerHyperparams()))
+    watcher = ConfigWatcher(shared, path, use_inotify=False)
+    assert shared.snapshot()[0] == 1
+    old = shared.get()
+    _write(path, {"epochs": 2, "optimizer": {"lr": 0.5}})
+    assert watcher.check() == {"epochs": (1, 2), "optimizer.lr": (0.1, 0.5)}
+    assert shared.version == 2
+    assert (old.epochs, shared.get().optimizer.lr) == (1, 0.5)
@@ -0,0 +1,133 @@
+import random
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.schedulers import ASHAScheduler
+
+
+class TrainingHyperparams(Hyperparams):
+    epochs: int = HP(
+        "Number of epochs",
+        default=100,
+    )
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+    )
+
+
+def make_scheduler(**kwargs) -> ASHAScheduler:
+    return ASHAScheduler(
+        TrainingHyperparams,
+        budget_field="epochs",
+        min_budget=1,
+        max_budget=27,
+        **kwargs,
+    )
+
+
+def test_budgets() -> None:
+    assert make_scheduler().budgets == [1, 3, 9, 27]
+    assert make_scheduler(reduction_factor=2).budgets == [1, 2, 4, 8, 27]
+    for kwargs in (
+        {"budget_field": "lr", "min_budget": 0.5, "max_budget": 4.0},
+        {"budget_field": "epochs", "min_budget": 1, "max_budget": 1},
+    ):
+        scheduler = ASHAScheduler(TrainingHyperparams, **kwargs)
+        assert len(scheduler.budgets) == len(scheduler._rungs) + 1
+    for kwargs in (
+        {"budget_field": "steps", "min_budget": 1, "max_budget": 9},
+        {"budget_field": "epochs", "min_budget": 9, "max_budget": 1},
+        {"budget_field": "epochs", "min_budget": 1, "max_budget": 9, "mode": "mean"},
+    ):
+        try:
+            ASHAScheduler(TrainingHyperparams, **kwargs)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_promotions() -> None:
+    scheduler = make_scheduler()
+    trials = [scheduler.add(TrainingHyperparams(lr=lr)) for lr in (0.3, 0.2, 0.1)]
+    assert [trial.params.epochs for trial in trials] == [1, 1, 1]
+    assert scheduler.promotion() is None
+
+    # The first trials cannot be promoted until 3 trials report
+    assert scheduler.report(trials[0].id, 0.3) == "pause"
+    assert scheduler.report(trials[1].id, 0.2) == "pause"
+    assert trials[1].status == "paused"
+    # The best one of 3 is promoted
+    assert scheduler.report(trials[2].id, 0.1) == "promote"
+    assert trials[2].rung == 1
+    assert trials[2].params.epochs == 3
+    assert trials[2].status == "running"
+    assert scheduler.promotion() is None
+
+    # 3 worse trials make room for the second best
+    for lr in (0.4, 0.5, 0.6):
+        trial = scheduler.add(TrainingHyperparams(lr=lr))
+        assert scheduler.report(trial.id, lr) == "pause"
+    promoted = scheduler.promotion()
+    assert promoted is trials[1]
+    assert promoted.params.epochs == 3
+    assert scheduler.promotion() is None
+    assert scheduler.rung_size(0) == 6
+
+    # Stopped paused trials are never promoted
+    scheduler.stop(trials[0].id)
+    for lr in (0.7, 0.8, 0.9):
+        trial = scheduler.add(TrainingHyperparams(lr=lr))
+        scheduler.report(trial.id, lr)
+    assert scheduler.promotion() is None
+    assert trials[0].status == "stopped"
+
+    try:
+        scheduler.report(trials[0].id, 0.1)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_losers() -> None:
+    scheduler = make_scheduler(mode="max", losers="stop")
+    trials = [scheduler.add(TrainingHyperparams()) for _ in range(4)]
+    # The first trial of a rung continues, the next ones must be in the top third
+    assert scheduler.report(trials[0].id, 0.2) == "promote"
+    assert scheduler.report(trials[1].id, 0.1) == "stop"
+    assert scheduler.report(trials[2].id, 0.3) == "promote"
+    assert scheduler.report(trials[3].id, float("nan")) == "stop"
+    assert scheduler.promotion() is None
+    assert scheduler.report(trials[0].id, 0.2) == "promote"
+    for _ in range(2):
+        assert scheduler.report(trials[2].id, 0.3) == "promote"
+    assert scheduler.report(trials[2].id, 0.3) == "complete"
+    assert trials[2].status == "completed"
+    assert trials[2].scores == [0.3] * 4
+
+
+def test_asynchronous() -> None:
+    # Trials report in random order, the best of each rung stay in the top
+    rng = random.Random(0)
+    scheduler = make_scheduler()
+    running: list[int] = []
+    for _ in range(2000):
+        trial = scheduler.promotion() or scheduler.add(
+            TrainingHyperparams(lr=rng.random())
+        )
+        running.append(trial.id)
+        while len(running) > 50:
+            trial = scheduler[running.pop(rng.randrange(len(running)))]
+            if scheduler.report(trial.id, trial.params.lr) == "promote":
+                running.append(trial.id)
+
+    for rung in scheduler._rungs:
+        losses = sorted([(-loss, *rest) for loss, *rest in rung.top] + rung.rest)
+        best = {trial_id for _, _, trial_id in losses[: rung.count // 3]}
+        assert best == rung.in_top
+        # Every paused trial in the top has been promoted
+        assert not best & rung.paused
+    assert [scheduler.rung_size(rung) for rung in range(3)] == [1926, 678, 238]
+    completed = [trial for trial in scheduler if trial.status == "completed"]
+    assert len(completed) == 81
+    # Only good configs train with the full budget
+    assert max(trial.params.lr for trial in completed) < 0.1
@@ -0,0 +1,278 @@
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.schema import (
+    Migration,
+    SchemaMigrator,
+    schema_fingerprint,
+    schema_version,
+    to_record,
+)
+from tests.test_hyperparams import TrainingHyperparams
+
+
+class OldOptimizerHyperparams(Hyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+    )
+    momentum: float = HP(
+        "Momentum",
+        default=0.9,
+    )
+
+
+class OldHyperparams(Hyperparams):
+    # Stored before the class declared a schema_version
+    model: str = HP(
+        "Model",
+        default="resnet",
+        choices=["resnet", "vit"],
+    )
+    epochs: int = HP(
+        "Number of epochs",
+        default=10,
+    )
+    legacy: bool = HP(
+        "Legacy flag",
+        default=False,
+    )
+    optimizer: OldOptimizerHyperparams = HP(
+        "Optimizer settings",
+        default=OldOptimizerHyperparams(),
+    )
+
+
+class OptimHyperparams(Hyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+    )
+    momentum: float = HP(
+        "Momentum",
+        default=0.9,
+    )
+    nesterov: bool = HP(
+        "Use Nesterov momentum",
+        default=False,
+    )
+
+
+def _steps(columns):
+    return {**columns, "steps": columns["epochs"] * 1000}
+
+
+class MigratedHyperparams(Hyperparams):
+    class Config:
+        schema_version = 3
+        migrations = [
+            Migration(3, transform=_steps),
+            Migration(
+                1,
+                rename={"optimizer": "optim"},
+                replace={"model": {"resnet": "resnet50"}},
+            ),
+            Migration(2, remove=["legacy"], add={"warmup": 0}),
+        ]
+
+    model: str = HP(
+        "Model",
+        default="resnet50",
+        choices=["resnet50", "vit"],
+    )
+    epochs: int = HP(
+        "Number of epochs",
+        default=10,
+    )
+    steps: int = HP(
+        "Number of steps",
+        default=10_000,
+    )
+    warmup: int = HP(
+        "Warmup steps",
+        default=100,
+    )
+    optim: OptimHyperparams = HP(
+        "Optimizer settings",
+        default=OptimHyperparams(),
+    )
+
+
+def test_fingerprint() -> None:
+    fingerprint = schema_fingerprint(OptimHyperparams)
+    assert fingerprint == schema_fingerprint(OptimHyperparams)
+    assert schema_version(OptimHyperparams) == 0
+    assert schema_version(MigratedHyperparams) == 3
+
+    class DescribedHyperparams(OptimHyperparams):
+        nesterov: bool = HP(
+            "Another description",
+            default=False,
+            tunable=True,
+        )
+
+    class DefaultHyperparams(OptimHyperparams):
+        nesterov: bool = HP(
+            "Use Nesterov momentum",
+            default=True,
+        )
+
+    assert schema_fingerprint(DescribedHyperparams) == fingerprint
+    assert schema_fingerprint(DefaultHyperparams) != fingerprint
+    # Sub-configs are part of the schema
+    assert schema_fingerprint(MigratedHyperparams) != schema_fingerprint(OldHyperparams)
+
+    def deferred_class() -> type[Hyperparams]:
+        class DeferredHyperparams(Hyperparams):
+            class Config:
+                defer_finalization = True
+
+            epochs: int = HP(
+                "Number of epochs",
+                default=10,
+            )
+            optim: OptimHyperparams = HP(
+                "Optimizer settings",
+                default=OptimHyperparams(),
+            )
+
+        return DeferredHyperparams
+
+    # The same before and after the first use of a deferred class
+    fresh = schema_fingerprint(deferred_class())
+    used = deferred_class()
+    used()
+    assert schema_fingerprint(used) == fresh
+
+    record = to_record(TrainingHyperparams())
+    assert record["version"] == 0
+    assert record["fingerprint"] == schema_fingerprint(TrainingHyperparams)
+    assert record["values"]["optimizer"] == {"lr": 0.1, "nesterov": False}
+
+
+def test_migrate_records() -> None:
+    migrator = SchemaMigrator.for_class(MigratedHyperparams)
+    assert migrator is SchemaMigrator.for_class(MigratedHyperparams)
+    assert [m.version for m in migrator.migrations] == [1, 2, 3]
+
+    records = [
+        to_record(OldHyperparams(epochs=5, optimizer=OldOptimizerHyperparams(lr=1.0))),
+        {
+            "version": 2,
+            "values": {
+                "model": "vit",
+                "epochs": 2,
+                "warmup": 50,
+                "optim": {"lr": 0.5, "momentum": 0.0, "nesterov": True},
+            },
+        },
+        to_record(OldHyperparams(model="vit", legacy=True)),
+        to_record(MigratedHyperparams(steps=7)),
+    ]
+    columns = migrator.migrate_records(records)
+    assert columns["model"].tolist() == ["resnet50", "vit", "vit", "resnet50"]
+    assert columns["epochs"].dtype == np.int64
+    assert columns["steps"].tolist() == [5000, 2000, 10_000, 7]
+    assert columns["warmup"].tolist() == [0, 50, 0, 100]
+    assert columns["optim.lr"].tolist() == [1.0, 0.5, 0.1, 0.1]
+    # Added since the old configs were stored
+    assert columns["optim.nesterov"].tolist() == [False, True, False, False]
+
+    instances = migrator.load(records)
+    assert instances[0] == MigratedHyperparams(
+        epochs=5, steps=5000, warmup=0, optim=OptimHyperparams(lr=1.0)
+    )
+    assert instances[3] == MigratedHyperparams(steps=7)
+
+    # Bulk values of a single version, e.g. journal entries
+    columns = migrator.migrate_values(
+        [
+            {"model": "resnet", "epochs": 1, "legacy": False},
+            {"model": "vit", "epochs": 3, "legacy": False},
+        ],
+        version=0,
+    )
+    assert columns["model"].tolist() == ["resnet50", "vit"]
+    assert columns["steps"].tolist() == [1000, 3000]
+    assert len(migrator.migrate_records([])["model"]) == 0
+
+
+def test_composed_migrations() -> None:
+    class ComposedHyperparams(Hyperparams):
+        class Config:
+            schema_version = 2
+            migrations = [
+                Migration(
+                    1,
+                    rename={"size": "layers"},
+                    replace={"layers": {1: 2, 2: 3}},
+                ),
+                Migration(2, replace={"layers": {3: 4}}),
+            ]
+
+        layers: int = HP(
+            "Number of layers",
+            default=4,
+            choices=[2, 4],
+        )
+
+    migrator = SchemaMigrator(ComposedHyperparams)
+    columns = migrator.migrate_columns({"size": np.array([1, 2, 3])}, version=0)
+    # 1 -> 2, 2 -> 3 -> 4, and 3 -> 4
+    assert columns["layers"].tolist() == [2, 4, 4]
+    assert columns["layers"].dtype == np.int64
+    columns = migrator.migrate_columns({"layers": [2, 3]}, version=1)
+    assert columns["layers"].tolist() == [2, 4]
+
+
+def test_migration_errors() -> None:
+    migrator = SchemaMigrator(MigratedHyperparams)
+    # Changed without increasing the version
+    record = to_record(MigratedHyperparams())
+    record["fingerprint"] = schema_fingerprint(OldHyperparams)
+    try:
+        migrator.migrate_records([record])
+        assert False
+    except ValueError:
+        pass
+    try:
+        migrator.migrate_records([{"version": 4, "values": {}}])
+        assert False
+    except ValueError:
+        pass
+    # Fields that no migration removes
+    try:
+        migrator.migrate_values([{"model": "vit", "dropout": 0.1}], version=3)
+        assert False
+    except ValueError:
+        pass
+
+    class RequiredHyperparams(Hyperparams):
+        class Config:
+            schema_version = 1
+
+        seed: int = HP(
+            "Seed",
+        )
+
+    try:
+        SchemaMigrator(RequiredHyperparams).migrate_values([{}], version=0)
+        assert False
+    except ValueError:
+        pass
+
+    class InvalidHyperparams(Hyperparams):
+        class Config:
+            schema_version = 1
+            migrations = [Migration(2)]
+
+    try:
+        SchemaMigrator(InvalidHyperparams)
+        assert False
+    except ValueError:
+        pass
+    try:
+        Migration(0)
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,209 @@
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.search import Forbidden, SearchSpace, constraint
+from hyperparameters.spaces import Choice, IntUniform, LogUniform, Uniform, as_domain
+
+
+class ModelHyperparams(Hyperparams):
+    class Config:
+        constraints = [Forbidden(tokenizer="char", model=["transformer"])]
+
+    model: str = HP(
+        "Model",
+        default="cnn",
+        tunable=True,
+        choices=["cnn", "transformer", "lstm"],
+    )
+    tokenizer: str = HP(
+        "Tokenizer",
+        default="bpe",
+        tunable=True,
+        choices=["bpe", "char"],
+    )
+    use_dropout: bool = HP(
+        "Use dropout",
+        default=False,
+        tunable=True,
+    )
+    dropout: float = HP(
+        "Dropout rate",
+        default=0.0,
+        search_space=[0.1, 0.2, 0.3],
+        active_if={"use_dropout": True},
+    )
+    layers: int = HP(
+        "Number of layers",
+        default=2,
+        search_space=IntUniform(1, 3),
+    )
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+        tunable=True,
+    )
+
+
+class SampledHyperparams(ModelHyperparams):
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+        search_space=LogUniform(1e-4, 1e-1),
+    )
+    momentum: float = HP(
+        "Momentum",
+        default=0.0,
+        search_space=Uniform(0.5, 0.9),
+        active_if={"model": ["cnn", "lstm"], "use_dropout": True},
+    )
+
+
+def test_domains() -> None:
+    assert as_domain([1, 2]) == Choice([1, 2])
+    assert as_domain(IntUniform(1, 3)).values() == [1, 2, 3]
+    assert IntUniform(1, 3).size() == 3
+    assert as_domain(object()) is None
+    rng = np.random.default_rng(0)
+    samples = LogUniform(1e-4, 1e-1).sample(rng, 1000)
+    assert ((samples >= 1e-4) & (samples <= 1e-1)).all()
+    try:
+        Uniform(0.0, 1.0).values()
+        assert False
+    except ValueError:
+        pass
+    try:
+        LogUniform(0.0, 1.0)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_grid() -> None:
+    space = SearchSpace(ModelHyperparams)
+    # lr has no search space and keeps its value
+    assert list(space.domains) == [
+        "model",
+        "tokenizer",
+        "use_dropout",
+        "dropout",
+        "layers",
+    ]
+    columns = space.grid()
+    configs = space.to_dicts(columns)
+    # 5 feasible model and tokenizer pairs, 4 dropout settings, 3 layers
+    assert len(configs) == 5 * 4 * 3
+    assert len({tuple(config.items()) for config in configs}) == len(configs)
+    assert {"model": "transformer", "tokenizer": "char"}.items() not in [
+        {k: c[k] for k in ("model", "tokenizer")}.items() for c in configs
+    ]
+    # Inactive fields keep their default and are not expanded
+    assert all(c["dropout"] == 0.0 for c in configs if not c["use_dropout"])
+    assert columns["layers"].dtype == np.int64
+
+    @constraint("model", "layers")
+    def shallow_lstm(columns):
+        return ~((columns["model"] == "lstm") & (columns["layers"] > 2))
+
+    space = SearchSpace(
+        ModelHyperparams, constraints=[shallow_lstm, lambda c: c["lr"] < 1.0]
+    )
+    assert len(space.to_dicts(space.grid())) == 5 * 4 * 3 - 2 * 4
+
+    try:
+        SearchSpace(SampledHyperparams).grid()
+        assert False
+    except ValueError:
+        pass
+
+
+def test_sample() -> None:
+    space = SearchSpace(SampledHyperparams)
+    columns = space.sample(2000, seed=0)
+    assert all(len(values) == 2000 for values in columns.values())
+    assert not (
+        (columns["tokenizer"] == "char") & (columns["model"] == "transformer")
+    ).any()
+    assert (columns["dropout"][~columns["use_dropout"]] == 0.0).all()
+    inactive = ~columns["use_dropout"] | (columns["model"] == "transformer")
+    assert (columns["momentum"][inactive] == 0.0).all()
+    active = columns["momentum"][~inactive]
+    assert ((active >= 0.5) & (active <= 0.9)).all()
+    assert space.feasible(columns).all()
+
+    same = space.sample(2000, seed=0)
+    assert all((same[name] == columns[name]).all() for name in columns)
+
+    instances = space.instances({name: values[:3] for name, values in columns.items()})
+    assert all(isinstance(p, SampledHyperparams) for p in instances)
+    assert space.is_feasible(instances[0])
+    assert not space.is_feasible(
+        SampledHyperparams(model="transformer", tokenizer="char")
+    )
+
+    space = SearchSpace(SampledHyperparams, constraints=[lambda c: c["layers"] > 5])
+    try:
+        space.sample(10, max_rounds=3)
+        assert False
+    except ValueError:
+        pass
+    # Nothing asked for, every drawn config rejected
+    columns = space.sample(0, seed=0)
+    assert list(columns) == space.order
+    assert all(len(values) == 0 for values in columns.values())
+    assert columns["dropout"].dtype == np.float64
+
+
+def test_conditions() -> None:
+    try:
+
+        class UnknownConditionHyperparams(Hyperparams):
+            rate: float = HP(
+                "Rate",
+                default=0.1,
+                search_space=[0.1, 0.2],
+                active_if={"unknown": True},
+            )
+
+        assert False
+    except ValueError:
+        pass
+
+    class NotTunableConditionHyperparams(Hyperparams):
+        flag: bool = HP(
+            "Flag",
+            default=True,
+        )
+        rate: float = HP(
+            "Rate",
+            default=0.1,
+            search_space=[0.1, 0.2],
+            active_if={"flag": True},
+        )
+
+    try:
+        SearchSpace(NotTunableConditionHyperparams)
+        assert False
+    except ValueError:
+        pass
+
+    class CycleHyperparams(Hyperparams):
+        first: int = HP(
+            "First",
+            default=1,
+            choices=[1, 2],
+            tunable=True,
+            active_if={"second": 1},
+        )
+        second: int = HP(
+            "Second",
+            default=1,
+            choices=[1, 2],
+            tunable=True,
+            active_if={"first": 1},
+        )
+
+    try:
+        SearchSpace(CycleHyperparams)
+        assert False
+    except ValueError:
+        pass
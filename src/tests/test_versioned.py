@@ -0,0 +1,108 @@
+import threading
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.versioned import VersionedHyperparams
+from tests.test_hyperparams import OptimizerHyperparams, TrainingHyperparams
+
+
+class CounterHyperparams(Hyperparams):
+    # Every update sets all the fields to the new version
+    first: int = HP(
+        "First counter",
+        default=0,
+    )
+    second: int = HP(
+        "Second counter",
+        default=0,
+    )
+    third: int = HP(
+        "Third counter",
+        default=0,
+    )
+
+
+def test_versioned() -> None:
+    params = TrainingHyperparams(optimizer=OptimizerHyperparams())
+    shared = VersionedHyperparams(params)
+    # The original instance stays mutable
+    assert not params.is_frozen()
+    assert shared.get() == params and shared.get().is_frozen()
+    assert shared.version == 0
+
+    old = shared.get()
+    assert shared.update({"epochs": 5, "optimizer.lr": 0.5}) == 1
+    version, current = shared.snapshot()
+    assert version == 1
+    assert (current.epochs, current.optimizer.lr) == (5, 0.5)
+    # Readers holding the old version are not affected
+    assert (old.epochs, old.optimizer.lr) == (10, 0.1)
+    try:
+        current.epochs = 6
+        assert False
+    except TypeError:
+        pass
+
+    try:
+        shared.update({"epochs": "many"})
+        assert False
+    except ValueError:
+        pass
+    try:
+        shared.update({"epochs": 6}, expected_version=0)
+        assert False
+    except ValueError:
+        pass
+    assert shared.version == 1
+
+    assert shared.publish(TrainingHyperparams(epochs=3)) == 2
+    assert shared.get().epochs == 3
+    try:
+        shared.publish(OptimizerHyperparams())
+        assert False
+    except TypeError:
+        pass
+    assert shared.wait(1, timeout=0) == shared.snapshot()
+    assert shared.wait(2, timeout=0.01)[0] == 2
+
+
+def test_versioned_stress() -> None:
+    shared = VersionedHyperparams(CounterHyperparams())
+    stop = threading.Event()
+    errors = []
+
+    def read() -> None:
+        last_version = 0
+        while not stop.is_set():
+            version, params = shared.snapshot()
+            if not params.first == params.second == params.third == version:
+                errors.append(f"Inconsistent version {version}: {params!r}")
+            if version < last_version:
+                errors.append(f"Version {version} after {last_version}")
+            last_version = version
+
+    def write(updates_num: int) -> None:
+        for index in range(updates_num):
+            while True:
+                version = shared.version
+                values = dict.fromkeys(("first", "second", "third"), version + 1)
+                try:
+                    shared.update(
+                        values, validate=index % 2 == 0, expected_version=version
+                    )
+                    break
+                except ValueError:
+                    # Another writer published first
+                    pass
+
+    readers = [threading.Thread(target=read) for _ in range(8)]
+    writers = [threading.Thread(target=write, args=(500,)) for _ in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert errors == []
+    assert shared.version == 2000
+    assert shared.get().third == 2000
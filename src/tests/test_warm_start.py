@@ -0,0 +1,114 @@
+import numpy as np
+
+from hyperparameters import HP, Hyperparams
+from hyperparameters.journal import SweepJournal
+from hyperparameters.optimizers import TPESearch
+from hyperparameters.search import SearchSpace
+from hyperparameters.spaces import LogUniform
+from hyperparameters.warm_start import warm_start
+from tests.test_search import SampledHyperparams
+
+
+class OldHyperparams(Hyperparams):
+    # The schema of a past sweep
+    model: str = HP(
+        "Model",
+        default="cnn",
+        tunable=True,
+        choices=["cnn", "transformer", "lstm", "rnn"],
+    )
+    tokenizer: str = HP(
+        "Tokenizer",
+        default="bpe",
+        tunable=True,
+        choices=["bpe", "char"],
+    )
+    lr: float = HP(
+        "Learning rate",
+        default=0.1,
+        search_space=LogUniform(1e-5, 1.0),
+    )
+    warmup: int = HP(
+        "Warmup steps",
+        default=0,
+    )
+
+
+class RequiredHyperparams(SampledHyperparams):
+    seed: int = HP(
+        "Seed",
+        tunable=True,
+        search_space=[1, 2, 3],
+    )
+
+
+def test_warm_start(tmp_path) -> None:
+    old_params = [
+        OldHyperparams(model="lstm", lr=1e-2),
+        OldHyperparams(model="rnn", lr=1e-3),  # rnn was removed
+        OldHyperparams(model="cnn", lr=0.5),  # lr is out of the range now
+        OldHyperparams(model="transformer", tokenizer="char", lr=1e-3),  # forbidden
+        OldHyperparams(model="cnn", lr=1e-3, warmup=5),
+    ]
+    with SweepJournal(tmp_path / "old.journal", OldHyperparams) as journal:
+        for score, params in zip([0.5, 0.1, 0.2, 0.3, 0.4], old_params):
+            journal.finish(journal.propose(params), score)
+
+    space = SearchSpace(SampledHyperparams)
+    new_params = space.instances(space.sample(10, seed=0))
+    with SweepJournal(tmp_path / "new.journal", SampledHyperparams) as journal:
+        keys = journal.propose_many(new_params)
+        for index, key in enumerate(keys[:8]):
+            journal.finish(key, 1.0 + index)
+        journal.fail(keys[8])
+        # The same config as in the old sweep, only the removed field differs
+        journal.finish(journal.propose(SampledHyperparams(model="cnn", lr=1e-3)), 0.3)
+
+    result = warm_start(SampledHyperparams, tmp_path)
+    assert result.skipped == 3
+    assert len(result) == 10
+    assert result.scores.tolist() == [0.3, 0.5, *range(1, 9)]
+    assert result.to_dicts(2) == [
+        SampledHyperparams(model="cnn", lr=1e-3).dict(),
+        SampledHyperparams(model="lstm", lr=1e-2).dict(),
+    ]
+    assert result.instances(1) == [SampledHyperparams(model="cnn", lr=1e-3)]
+    assert result.columns["momentum"].dtype == np.float64
+
+    search = TPESearch(SampledHyperparams)
+    result.observe(search)
+    assert search.count == 10
+
+    result = warm_start(SampledHyperparams, tmp_path / "new.journal", mode="max")
+    assert result.scores.tolist() == [*range(8, 0, -1), 0.3]
+
+    # Old trials miss a required field
+    result = warm_start(RequiredHyperparams, tmp_path / "old.journal")
+    assert len(result) == 0
+    assert result.skipped == 5
+
+    try:
+        warm_start(SampledHyperparams, tmp_path / "missing.journal")
+        assert False
+    except ValueError:
+        pass
+
+    # Journals are only read, even with a cut last record
+    path = tmp_path / "new.journal"
+    with open(path, "a") as file:
+        file.write('{"op":"start","ke')
+    data = path.read_bytes()
+    result = warm_start(SampledHyperparams, path)
+    assert len(result) == 9
+    assert path.read_bytes() == data
+
+    class FixedHyperparams(Hyperparams):
+        warmup: int = HP(
+            "Warmup steps",
+            default=0,
+        )
+
+    # Without search space fields the best score is kept
+    result = warm_start(FixedHyperparams, tmp_path / "old.journal")
+    assert result.scores.tolist() == [0.1]
+    assert result.columns == {}